@@ -0,0 +1,118 @@
+"""
+Benchmark of the node loading of the Neo4j ingestion with the CodeEntity label
+assigned at creation against the former post-load labelling pass.
+
+The former flow created nodes with their type label only, then scanned the whole
+database to add the CodeEntity label to every Class, Function and Method node,
+and created the vector index on the loaded nodes. Neo4jClient now creates the
+vector index first and every node with both labels in the same statement.
+
+WARNING: every run wipes the configured Neo4j database. Use a disposable instance.
+
+Usage:
+    uv run python -m benchmarks.common_label --project test/skforecast --wipe
+"""
+import argparse
+import time
+from src.utils.config import config
+from src.graph.graph_builder import GraphBuilder
+from src.neo4j_integration.neo4j_client import CODE_LABELS, COMMON_LABEL, Neo4jClient
+
+VECTOR_INDEX_NAME = "code_embedding_benchmark"
+
+# Labelling pass run by process_graph after the push before the label was assigned at creation
+COMMON_LABEL_SCAN_QUERY = f"""
+    WITH $target_labels AS targetLabels
+    MATCH (n)
+    WHERE ANY(label IN labels(n) WHERE label IN targetLabels)
+    SET n:{COMMON_LABEL}
+"""
+
+
+def reset_database(client: Neo4jClient) -> None:
+    with client.driver.session() as session:
+        session.run("MATCH (n) DETACH DELETE n").consume()
+        session.run(f"DROP INDEX `{VECTOR_INDEX_NAME}` IF EXISTS").consume()
+
+
+def create_vector_index(client: Neo4jClient, dimensions: int) -> float:
+    start = time.time()
+    client.create_vector_index(index_name=VECTOR_INDEX_NAME, node_label=COMMON_LABEL,
+                               embedding_dimensions=dimensions)
+    return time.time() - start
+
+
+def time_scan_flow(client: Neo4jClient, graph: object, dimensions: int) -> dict:
+    """
+    Load the nodes with their type label only, then add the common label with the
+    database scan and create the vector index.
+
+    Returns:
+        dict: Seconds spent loading the nodes, labelling them and creating the index.
+    """
+    reset_database(client)
+    start = time.time()
+    with client.driver.session() as session:
+        for label, rows in client._node_rows(graph).items():
+            client._write_batches(session, f"UNWIND $rows AS row CREATE (n:{label}) SET n = row",
+                                  rows, description=f"Created {label} nodes")
+    load = time.time() - start
+
+    start = time.time()
+    with client.driver.session() as session:
+        session.run(COMMON_LABEL_SCAN_QUERY, target_labels=CODE_LABELS).consume()
+    scan = time.time() - start
+
+    return {"load": load, "scan": scan, "index": create_vector_index(client, dimensions)}
+
+
+def time_creation_flow(client: Neo4jClient, graph: object, dimensions: int) -> dict:
+    """
+    Create the vector index, then load the nodes with both labels as `Neo4jClient` does.
+
+    Returns:
+        dict: Seconds spent creating the index, loading the nodes and labelling them.
+    """
+    reset_database(client)
+    index = create_vector_index(client, dimensions)
+    start = time.time()
+    with client.driver.session() as session:
+        for label, rows in client._node_rows(graph).items():
+            client._write_batches(session, client.node_create_query(label),
+                                  rows, description=f"Created {label} nodes")
+    return {"load": time.time() - start, "scan": 0.0, "index": index}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Common label assignment benchmark (wipes the database)")
+    parser.add_argument("--project", default="test/skforecast", help="Root folder of the project to build")
+    parser.add_argument("--jobs", type=int, default=1)
+    parser.add_argument("--dimensions", type=int, default=1536, help="Dimensions of the vector index")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs of each flow, the fastest is reported")
+    parser.add_argument("--wipe", action="store_true",
+                        help="Confirm that the configured database can be wiped")
+    args = parser.parse_args()
+
+    if not args.wipe:
+        parser.error("This benchmark wipes the configured Neo4j database, pass --wipe to confirm.")
+
+    graph = GraphBuilder(args.project, jobs=args.jobs, graph_format="compact").build()
+    client = Neo4jClient(uri=config.get("NEO4J_URI"),
+                         user=config.get("NEO4J_USER"),
+                         password=config.get("NEO4J_PASSWORD"),
+                         batch_size=config.get("NEO4J_BATCH_SIZE", 1000))
+
+    print(f"{graph.number_of_nodes()} nodes")
+    print(f"{'flow':>18} {'load (s)':>9} {'label scan (s)':>15} {'index (s)':>10} {'total (s)':>10}")
+    for name, flow in (("post-load scan", time_scan_flow), ("label at creation", time_creation_flow)):
+        runs = [flow(client, graph, args.dimensions) for _ in range(args.repeat)]
+        best = min(runs, key=lambda run: sum(run.values()))
+        print(f"{name:>18} {best['load']:>9.2f} {best['scan']:>15.2f} {best['index']:>10.2f} "
+              f"{sum(best.values()):>10.2f}")
+
+    reset_database(client)
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark of the edge loading phase of the Neo4j ingestion against graph size.
+
+Compares label-less edge matching without an index with matching through the
+indexed CodeEntity label used by Neo4jClient.
+
+WARNING: every run wipes the configured Neo4j database. Use a disposable instance.
+
+Usage:
+    uv run python -m benchmarks.edge_load --sizes 1000 5000 20000 --wipe
+"""
+import argparse
+import random
+import time
+import networkx as nx
+from src.utils.config import config
+from src.neo4j_integration.neo4j_client import (
+    Neo4jClient, COMMON_LABEL, ID_CONSTRAINT_NAME, ID_INDEX_NAME, LEGACY_ID_CONSTRAINT_NAME
+)
+
+UNINDEXED_EDGE_QUERY = """
+    UNWIND $rows AS row
+    MATCH (a {id: row.source}), (b {id: row.target})
+    CREATE (a)-[:CALL]->(b)
+"""
+
+INDEXED_EDGE_QUERY = f"""
+    UNWIND $rows AS row
+    MATCH (a:{COMMON_LABEL} {{id: row.source}})
+    MATCH (b:{COMMON_LABEL} {{id: row.target}})
+    CREATE (a)-[:CALL]->(b)
+"""
+
+
+def make_synthetic_graph(n_nodes: int, edges_per_node: int = 2, seed: int = 0) -> nx.DiGraph:
+    """
+    Create a random code-like graph with `n_nodes` function nodes.
+
+    Args:
+        n_nodes (int): Number of nodes.
+        edges_per_node (int): Average number of outgoing call edges per node.
+        seed (int): Random seed.
+
+    Returns:
+        nx.DiGraph: The synthetic graph.
+    """
+    rng = random.Random(seed)
+    graph = nx.DiGraph()
+    for i in range(n_nodes):
+        graph.add_node(f"pkg.module_{i // 50}.function_{i}", name=f"function_{i}", type="function",
+                       file=f"pkg/module_{i // 50}.py", line=i % 50, code=f"def function_{i}(): pass",
+                       docstring="")
+    node_ids = list(graph.nodes)
+    for source in node_ids:
+        for target in rng.sample(node_ids, min(edges_per_node, n_nodes)):
+            graph.add_edge(source, target, relation="call")
+    return graph
+
+
+def time_edge_load(client: Neo4jClient, graph: nx.DiGraph, indexed: bool) -> float:
+    """
+    Load the nodes of the graph into an empty database and time the loading of its edges.
+
+    Args:
+        client (Neo4jClient): Client connected to the benchmark database.
+        graph (nx.DiGraph): Graph to load.
+        indexed (bool): Whether to create the id constraint and match edges through the indexed label.
+
+    Returns:
+        float: Seconds spent loading the edges.
+    """
+    with client.driver.session() as session:
+        session.run("MATCH (n) DETACH DELETE n").consume()
+        session.run(f"DROP CONSTRAINT {ID_CONSTRAINT_NAME} IF EXISTS").consume()
+        session.run(f"DROP CONSTRAINT {LEGACY_ID_CONSTRAINT_NAME} IF EXISTS").consume()
+        session.run(f"DROP INDEX {ID_INDEX_NAME} IF EXISTS").consume()
+
+    if indexed:
+        client.create_constraints()
+
+    edge_rows = [{"source": source, "target": target} for source, target in graph.edges]
+    with client.driver.session() as session:
+        for label, rows in client._node_rows(graph).items():
+            client._write_batches(session, f"UNWIND $rows AS row CREATE (n:{label}:{COMMON_LABEL}) SET n = row",
+                                  rows, description=f"Created {label} nodes")
+
+        start = time.time()
+        client._write_batches(session, INDEXED_EDGE_QUERY if indexed else UNINDEXED_EDGE_QUERY,
+                              edge_rows, description="Created CALL edges")
+        return time.time() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Edge loading benchmark (wipes the database)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000],
+                        help="Node counts to benchmark")
+    parser.add_argument("--edges_per_node", type=int, default=2)
+    parser.add_argument("--max_unindexed_size", type=int, default=5000,
+                        help="Skip the unindexed baseline above this node count, it grows quadratically")
+    parser.add_argument("--wipe", action="store_true",
+                        help="Confirm that the configured database can be wiped")
+    args = parser.parse_args()
+
+    if not args.wipe:
+        parser.error("This benchmark wipes the configured Neo4j database, pass --wipe to confirm.")
+
+    client = Neo4jClient(uri=config.get("NEO4J_URI"),
+                         user=config.get("NEO4J_USER"),
+                         password=config.get("NEO4J_PASSWORD"),
+                         batch_size=config.get("NEO4J_BATCH_SIZE", 1000))
+
+    print(f"{'nodes':>8} {'edges':>8} {'unindexed (s)':>14} {'indexed (s)':>12}")
+    for size in args.sizes:
+        graph = make_synthetic_graph(size, edges_per_node=args.edges_per_node)
+        unindexed = (time_edge_load(client, graph, indexed=False)
+                     if size <= args.max_unindexed_size else float("nan"))
+        indexed = time_edge_load(client, graph, indexed=True)
+        print(f"{size:>8} {graph.number_of_edges():>8} {unindexed:>14.2f} {indexed:>12.2f}")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Benchmark of the client-side embedding pipeline against the local embeddings stub.
+
+The legacy in-database approach embedded one node per HTTP call, which
+corresponds to `--batch_sizes 1 --concurrency 1`.
+
+Usage:
+    uv run python -m benchmarks.embedding_pipeline --texts 2000 --latency 0.2
+"""
+import argparse
+import time
+from src.embeddings import OpenAIEmbeddingProvider, embed_in_batches
+from benchmarks.embedding_stub_server import start_stub_server
+
+
+def time_pipeline(provider: object, n_texts: int, batch_size: int, max_concurrency: int) -> float:
+    """
+    Embed `n_texts` synthetic code snippets and return the elapsed seconds.
+    """
+    pairs = ((f"pkg.module.function_{i}", f"def function_{i}(x):\n    return x + {i}") for i in range(n_texts))
+    start = time.time()
+    for _ in embed_in_batches(pairs, provider, batch_size=batch_size, max_concurrency=max_concurrency):
+        pass
+    return time.time() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Embedding pipeline benchmark against a local stub endpoint")
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub seconds per request")
+    parser.add_argument("--batch_sizes", type=int, nargs="+", default=[1, 16, 100])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    server, url = start_stub_server(latency=args.latency)
+    provider = OpenAIEmbeddingProvider(api_key="stub", endpoint=url)
+
+    print(f"{'batch':>6} {'concurrency':>12} {'seconds':>8} {'texts/s':>9}")
+    for batch_size in args.batch_sizes:
+        for max_concurrency in args.concurrency:
+            # One request per text is too slow to run in full, extrapolate from a sample
+            n_texts = min(args.texts, 50) if batch_size == 1 and max_concurrency == 1 else args.texts
+            elapsed = time_pipeline(provider, n_texts, batch_size, max_concurrency)
+            print(f"{batch_size:>6} {max_concurrency:>12} {elapsed * args.texts / n_texts:>8.2f} {args.texts / (elapsed * args.texts / n_texts):>9.0f}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Local stand-in for the OpenAI embeddings endpoint.
+
+Answers `POST /v1/embeddings` with deterministic pseudo-random vectors after a
+configurable latency, so the embedding pipeline can be benchmarked without
+network access or API costs.
+
+Usage:
+    uv run python -m benchmarks.embedding_stub_server --port 8765 --latency 0.2
+    EMBEDDING_ENDPOINT=http://127.0.0.1:8765/v1 uv run python -m src.database.graph_database_builder ...
+"""
+import argparse
+import base64
+import hashlib
+import json
+import random
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Tuple
+
+
+def stub_vector(text: str, dimensions: int) -> List[float]:
+    """
+    Deterministic unit vector derived from the hash of the text.
+    """
+    rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+    vector = [rng.uniform(-1, 1) for _ in range(dimensions)]
+    norm = sum(value * value for value in vector) ** 0.5
+    return [value / norm for value in vector]
+
+
+class EmbeddingStubHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        dimensions = body.get("dimensions") or self.server.dimensions
+
+        time.sleep(self.server.latency)
+        self.server.requests += 1
+
+        data = []
+        for index, text in enumerate(inputs):
+            vector = stub_vector(str(text), dimensions)
+            if body.get("encoding_format") == "base64":
+                vector = base64.b64encode(struct.pack(f"<{dimensions}f", *vector)).decode("ascii")
+            data.append({"object": "embedding", "index": index, "embedding": vector})
+
+        tokens = sum(len(str(text).split()) for text in inputs)
+        payload = json.dumps({
+            "object": "list",
+            "data": data,
+            "model": body.get("model"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(port: int = 0, latency: float = 0.1, dimensions: int = 1536) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Start the stub server in a background thread.
+
+    Args:
+        port (int): Port to listen on, 0 picks a free one.
+        latency (float): Seconds to wait before answering each request.
+        dimensions (int): Default vector dimensions.
+
+    Returns:
+        Tuple[ThreadingHTTPServer, str]: The server and the base URL to use as embedding endpoint.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), EmbeddingStubHandler)
+    server.latency = latency
+    server.dimensions = dimensions
+    server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible embeddings stub server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.1, help="Seconds per request")
+    parser.add_argument("--dimensions", type=int, default=1536)
+    args = parser.parse_args()
+
+    server, url = start_stub_server(port=args.port, latency=args.latency, dimensions=args.dimensions)
+    print(f"Embedding stub listening on {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
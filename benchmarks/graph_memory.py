@@ -0,0 +1,95 @@
+"""
+Memory benchmark of the graph build on a local project.
+
+Builds the graph in a fresh process and reports its peak resident set size
+(`ru_maxrss`) before and after the build, together with the memory retained by
+the definition records, by the graph and by the parse trees jedi keeps in parso's
+module cache once the build returns, for the networkx and the compact graph formats.
+
+Usage:
+    uv run python -m benchmarks.graph_memory --project test/skforecast
+"""
+import argparse
+import gc
+import multiprocessing
+import resource
+import sys
+import time
+import types
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _deep_size(root: object) -> int:
+    """
+    Size in bytes of an object and every object reachable from it, each counted once.
+    Types and modules are not followed.
+    """
+    seen = set()
+    pending = [root]
+    size = 0
+    while pending:
+        obj = pending.pop()
+        if id(obj) in seen or isinstance(obj, (type, types.ModuleType)):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        pending.extend(gc.get_referents(obj))
+    return size
+
+
+def _measure_build(project_root: str, jobs: int, call_resolver: str, graph_format: str, results) -> None:
+    from src.graph.graph_builder import GraphBuilder
+
+    results["rss_before_mb"] = _peak_rss_mb()
+    start = time.time()
+    builder = GraphBuilder(project_root, jobs=jobs, call_resolver=call_resolver, graph_format=graph_format)
+    graph = builder.build()
+    results["seconds"] = time.time() - start
+    results["peak_rss_mb"] = _peak_rss_mb()
+    results["nodes"] = graph.number_of_nodes()
+    results["edges"] = graph.number_of_edges()
+
+    # The graph shares the strings of the definition records, only its own structures are counted
+    definitions_size = _deep_size(builder.definitions)
+    results["definitions_mb"] = definitions_size / (1024 * 1024)
+    results["graph_mb"] = (_deep_size((builder.definitions, graph)) - definitions_size) / (1024 * 1024)
+
+    # Modules parsed by jedi for the calls that fall back to it, kept until the process ends
+    import parso.cache
+    results["parso_cache_modules"] = sum(len(modules) for modules in parso.cache.parser_cache.values())
+    results["parso_cache_mb"] = _deep_size(parso.cache.parser_cache) / (1024 * 1024)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Graph build memory benchmark")
+    parser.add_argument("--project", default="test/skforecast", help="Root folder of the project to build")
+    parser.add_argument("--jobs", type=int, default=1)
+    parser.add_argument("--call_resolver", choices=["jedi", "static"], default="static")
+    parser.add_argument("--graph_format", choices=["networkx", "compact"], default="networkx")
+    args = parser.parse_args()
+
+    # A fresh process, so the peak RSS only accounts for this build
+    context = multiprocessing.get_context("spawn")
+    with context.Manager() as manager:
+        results = manager.dict()
+        process = context.Process(target=_measure_build,
+                                  args=(args.project, args.jobs, args.call_resolver, args.graph_format, results))
+        process.start()
+        process.join()
+        results = dict(results)
+
+    print(f"Build of {args.project} ({args.graph_format} graph): {results['nodes']} nodes, {results['edges']} edges in {results['seconds']:.2f}s")
+    print(f"  peak RSS before build: {results['rss_before_mb']:.1f} MB")
+    print(f"  peak RSS after build:  {results['peak_rss_mb']:.1f} MB")
+    print(f"  definitions retained:  {results['definitions_mb']:.2f} MB")
+    print(f"  graph retained:        {results['graph_mb']:.2f} MB (on top of the definitions)")
+    print(f"  parso module cache:    {results['parso_cache_mb']:.2f} MB ({results['parso_cache_modules']} modules)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+Benchmark of the Neo4j ingestion with the synchronous client against the async
+client at several concurrency levels.
+
+Both clients write to a local recording stand-in of the Neo4j driver instead of
+a database: every transaction records the node ids it touches and takes a fixed
+latency plus a latency per row, the only cost the number of transactions in
+flight can hide. The stand-in also counts the node and edge transactions that
+touch node ids of another transaction running at the same time, which would
+contend for the same locks in Neo4j: node batches partitioned by id never do,
+edge batches only share target nodes.
+
+Usage:
+    uv run python -m benchmarks.neo4j_ingest --sizes 2000 10000 --concurrency 1 4 8
+"""
+import argparse
+import asyncio
+import threading
+import time
+from typing import Dict, List, Set
+from benchmarks.edge_load import make_synthetic_graph
+from src.neo4j_integration.neo4j_client import Neo4jClient
+from src.neo4j_integration.async_neo4j_client import AsyncNeo4jClient
+
+
+class TransactionRecorder:
+    """
+    Records the committed transactions of the stand-in driver and the ones
+    touching node ids of a transaction still open.
+    """
+
+    def __init__(self, latency: float, row_latency: float):
+        self.latency = latency
+        self.row_latency = row_latency
+        self.lock = threading.Lock()
+        self.open: Dict[int, Set[str]] = {}
+        self.transactions = 0
+        self.rows = 0
+        self.contended = {"nodes": 0, "edges": 0}
+        self.max_open = 0
+
+    def delay(self, rows: List[Dict]) -> float:
+        return self.latency + self.row_latency * len(rows)
+
+    def begin(self, rows: List[Dict]) -> int:
+        touched = {value for row in rows for key, value in row.items() if key in ("id", "source", "target")}
+        with self.lock:
+            if any(touched & other for other in self.open.values()):
+                self.contended["edges" if rows and "source" in rows[0] else "nodes"] += 1
+            key = self.transactions
+            self.transactions += 1
+            self.rows += len(rows)
+            self.open[key] = touched
+            self.max_open = max(self.max_open, len(self.open))
+        return key
+
+    def end(self, key: int) -> None:
+        with self.lock:
+            del self.open[key]
+
+
+class _Result:
+    def consume(self):
+        return None
+
+
+class _Transaction:
+    def __init__(self, recorder: TransactionRecorder):
+        self.recorder = recorder
+
+    def run(self, query, rows=None, **parameters):
+        rows = rows or []
+        key = self.recorder.begin(rows)
+        time.sleep(self.recorder.delay(rows))
+        self.recorder.end(key)
+        return _Result()
+
+    def commit(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+class _Session:
+    def __init__(self, recorder: TransactionRecorder):
+        self.recorder = recorder
+
+    def run(self, query, **parameters):
+        return _Result()
+
+    def begin_transaction(self):
+        return _Transaction(self.recorder)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+class RecordingDriver:
+    """Stand-in of the synchronous Neo4j driver."""
+
+    def __init__(self, recorder: TransactionRecorder):
+        self.recorder = recorder
+
+    def session(self, **config):
+        return _Session(self.recorder)
+
+    def close(self):
+        pass
+
+
+class _AsyncResult:
+    async def consume(self):
+        return None
+
+
+class _AsyncTransaction:
+    def __init__(self, recorder: TransactionRecorder):
+        self.recorder = recorder
+
+    async def run(self, query, rows=None, **parameters):
+        rows = rows or []
+        key = self.recorder.begin(rows)
+        await asyncio.sleep(self.recorder.delay(rows))
+        self.recorder.end(key)
+        return _AsyncResult()
+
+    async def commit(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+
+class _AsyncSession:
+    def __init__(self, recorder: TransactionRecorder):
+        self.recorder = recorder
+
+    async def run(self, query, **parameters):
+        return _AsyncResult()
+
+    async def begin_transaction(self):
+        return _AsyncTransaction(self.recorder)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+
+class AsyncRecordingDriver(RecordingDriver):
+    """Stand-in of the asynchronous Neo4j driver."""
+
+    def session(self, **config):
+        return _AsyncSession(self.recorder)
+
+    async def close(self):
+        pass
+
+
+class RecordingClient(Neo4jClient):
+    def __init__(self, recorder: TransactionRecorder, batch_size: int):
+        self.recorder = recorder
+        super().__init__(uri="", user="", password="", batch_size=batch_size)
+
+    def _database_connect(self) -> object:
+        return RecordingDriver(self.recorder)
+
+
+class AsyncRecordingClient(AsyncNeo4jClient):
+    def __init__(self, recorder: TransactionRecorder, batch_size: int, concurrency: int):
+        self.recorder = recorder
+        super().__init__(uri="", user="", password="", batch_size=batch_size, concurrency=concurrency)
+
+    def _database_connect(self) -> object:
+        return AsyncRecordingDriver(self.recorder)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sync and async Neo4j ingestion benchmark on a recording stand-in")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 10000], help="Node counts to benchmark")
+    parser.add_argument("--edges_per_node", type=int, default=2)
+    parser.add_argument("--batch_size", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8],
+                        help="Concurrency levels of the async client")
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds per transaction")
+    parser.add_argument("--row_latency", type=float, default=0.00002, help="Seconds per written row")
+    args = parser.parse_args()
+
+    print(f"{'nodes':>8} {'edges':>8} {'client':>10} {'seconds':>8} {'transactions':>12} "
+          f"{'max open':>8} {'contended node/edge txs':>23}")
+    for size in args.sizes:
+        graph = make_synthetic_graph(size, edges_per_node=args.edges_per_node)
+
+        recorder = TransactionRecorder(args.latency, args.row_latency)
+        start = time.time()
+        RecordingClient(recorder, args.batch_size).push_graph_to_neo4j(graph, delete_previous=True)
+        runs = [("sync", time.time() - start, recorder)]
+
+        for concurrency in args.concurrency:
+            recorder = TransactionRecorder(args.latency, args.row_latency)
+            client = AsyncRecordingClient(recorder, args.batch_size, concurrency)
+            start = time.time()
+            asyncio.run(client.push_graph_to_neo4j(graph, delete_previous=True))
+            runs.append((f"async x{concurrency}", time.time() - start, recorder))
+
+        for name, seconds, recorder in runs:
+            print(f"{size:>8} {graph.number_of_edges():>8} {name:>10} {seconds:>8.2f} {recorder.transactions:>12} "
+                  f"{recorder.max_open:>8} {recorder.contended['nodes']:>11}/{recorder.contended['edges']:<11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,23 @@
 import argparse
 from src.utils.config import config, logger
 from src.graph.graph_builder import GraphBuilder
-from src.neo4j_integration.neo4j_client import Neo4jClient
-from src.utils.utils_deploy import download_extract_file
+from src.graph.snapshot import load_snapshot, read_snapshot_embeddings, write_snapshot, write_snapshot_embeddings
+from src.neo4j_integration.neo4j_client import COMMON_LABEL, Neo4jClient
+from src.neo4j_integration.async_neo4j_client import AsyncNeo4jClient
+from src.embeddings import EmbeddingCache, get_embedding_provider
+from src.database.pipeline import EMBEDDED_PROPERTIES, Pipeline, S3StateStore
+from src.database.streaming import stream_graph_to_neo4j
 import asyncio
+import hashlib
+import json
 import time
 import boto3
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional
 
 s3_client = boto3.client('s3')
+lambda_client = boto3.client('lambda')
 
 def parse_arguments() -> argparse.Namespace:
     """
@@ -19,24 +29,122 @@ def parse_arguments() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Graph building process")
     parser.add_argument(
         "--file_path",
-        required=True,
         help="Path to the input root folder for graph building"
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=config.get("GRAPH_BUILD_JOBS", 1),
+        help="Number of worker processes used to parse files (0 uses all available cores)"
+    )
+    parser.add_argument(
+        "--cache_dir",
+        default=config.get("PARSE_CACHE_DIR"),
+        help="Directory of the persistent parse cache. Unchanged files are not parsed again."
+    )
+    parser.add_argument(
+        "--call_resolution",
+        choices=["all", "internal"],
+        default=config.get("CALL_RESOLUTION", "internal"),
+        help="Resolve every call with jedi, or skip calls to the standard library, site-packages and builtins"
+    )
+    parser.add_argument(
+        "--call_resolver",
+        choices=["jedi", "static"],
+        default=config.get("CALL_RESOLVER", "static"),
+        help="Resolve calls with jedi only, or with the project symbol table falling back to jedi"
+    )
+    parser.add_argument(
+        "--graph_format",
+        choices=["networkx", "compact"],
+        default=config.get("GRAPH_FORMAT", "networkx"),
+        help="Build a networkx graph, or the array-backed compact graph for large codebases"
+    )
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        default=config.get("NEO4J_SYNC_MODE", False),
+        help="Apply only the differences with the graph stored in Neo4j instead of wiping and reloading it"
+    )
+    parser.add_argument(
+        "--snapshot_path",
+        default=config.get("GRAPH_SNAPSHOT_PATH"),
+        help="Directory of the graph snapshot written by the build and read by the push and embedding stages"
+    )
+    parser.add_argument(
+        "--build-only",
+        action="store_true",
+        help="Build the graph and write its snapshot, without pushing it to Neo4j"
+    )
+    parser.add_argument(
+        "--from-snapshot",
+        metavar="SNAPSHOT_PATH",
+        help="Push and embed the graph of an existing snapshot instead of building it"
+    )
+    parser.add_argument(
+        "--push-only",
+        action="store_true",
+        help="Push the graph to Neo4j without creating the vector index and embeddings"
+    )
+    parser.add_argument(
+        "--project_id",
+        default=config.get("PROJECT_ID"),
+        help="Project identifier stored on every node. Only the graph of this project is replaced."
+    )
+    parser.add_argument(
+        "--async_ingestion",
+        action="store_true",
+        default=config.get("NEO4J_ASYNC_INGESTION", False),
+        help="Push the graph in NEO4J_WRITE_CONCURRENCY concurrent transactions with the async Neo4j driver"
+    )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        default=config.get("STREAMING_PIPELINE", False),
+        help="Overlap parsing, Neo4j ingestion and embedding in a bounded-queue pipeline"
+    )
+    args = parser.parse_args()
 
-def build_graph(file_path: str) -> object:
+    if args.streaming and (args.sync or args.build_only or args.from_snapshot):
+        parser.error("--streaming cannot be combined with --sync, --build-only or --from-snapshot")
+    if args.from_snapshot:
+        args.snapshot_path = args.from_snapshot
+    elif not args.file_path:
+        parser.error("--file_path is required unless --from-snapshot is given")
+    if args.build_only and not args.snapshot_path:
+        parser.error("--build-only requires --snapshot_path or GRAPH_SNAPSHOT_PATH")
+    if args.build_only and (args.from_snapshot or args.push_only):
+        parser.error("--build-only cannot be combined with --from-snapshot or --push-only")
+    return args
+
+def build_graph(file_path: str, 
+                jobs: int = 1, 
+                cache_dir: str = None, 
+                call_resolution: str = "internal", 
+                call_resolver: str = "static",
+                graph_format: str = "networkx") -> object:
     """
     Build the graph from the provided file path.
 
     Args:
         file_path (str): Path to the input root folder for graph building.
+        jobs (int): Number of worker processes used to parse files.
+        cache_dir (str): Directory of the persistent parse cache, if any.
+        call_resolution (str): Call resolution mode, "all" or "internal".
+        call_resolver (str): Call resolver backend, "jedi" or "static".
+        graph_format (str): Graph store, "networkx" or "compact".
 
     Returns:
         Graph: The constructed graph object.
     """
     start = time.time()
     logger.info("Starting graph building process...")
-    builder = GraphBuilder(file_path)
+    builder = GraphBuilder(file_path, 
+                           jobs=jobs, 
+                           cache_dir=cache_dir, 
+                           call_resolution=call_resolution, 
+                           call_resolver=call_resolver,
+                           graph_format=graph_format)
     graph = builder.build()
     end = time.time()
     logger.info(
@@ -47,70 +155,284 @@ def build_graph(file_path: str) -> object:
     )
     return graph
 
-def process_graph(graph) -> None:
+async def push_graph_async(graph, delete_previous: bool = True, project_id: Optional[str] = None) -> Dict[str, int]:
+    """
+    Push the graph with `AsyncNeo4jClient`, writing batches in concurrent transactions.
+    Meant to be awaited from an event loop, see `run_coroutine` for synchronous callers.
+
+    Args:
+        graph (Graph): The graph object to push, a networkx DiGraph or a CompactGraph.
+        delete_previous (bool): Delete the nodes of the project first.
+        project_id (Optional[str]): Project stored on the nodes, None for an unscoped graph.
+
+    Returns:
+        Dict[str, int]: Number of written rows per group of nodes and edges.
+    """
+    async with AsyncNeo4jClient(uri=config.get("NEO4J_URI"),
+                                user=config.get("NEO4J_USER"),
+                                password=config.get("NEO4J_PASSWORD"),
+                                batch_size=config.get("NEO4J_BATCH_SIZE", 1000),
+                                concurrency=config.get("NEO4J_WRITE_CONCURRENCY", 4),
+                                project_id=project_id) as client:
+        return await client.push_graph_to_neo4j(graph, delete_previous=delete_previous)
+
+
+def run_coroutine(coroutine):
+    """
+    Run a coroutine to completion from synchronous code, e.g. the Lambda handler or
+    the Streamlit script. From a thread whose event loop is already running, it is
+    run on a new event loop in a worker thread.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
+
+def process_graph(graph, sync: bool = False, snapshot_path: str = None, embed: bool = True,
+                  async_ingestion: bool = None, project_id: Optional[str] = None) -> None:
     """
     Process the graph by pushing it to Neo4j and creating embeddings.
 
     Args:
-        graph (Graph): The graph object to process.
+        graph (Graph): The graph object to process, a networkx DiGraph or a CompactGraph.
+        sync (bool): Apply only the differences with the graph stored in Neo4j and embed 
+            only new or changed nodes, instead of wiping the database and reloading everything.
+        snapshot_path (str): Snapshot the graph was loaded from, if any. Embeddings stored in
+            it are pushed instead of being recomputed, and the computed ones are stored in it.
+        embed (bool): Create the vector index before pushing the graph and the embeddings after.
+        async_ingestion (bool): Push the graph with concurrent transactions of `AsyncNeo4jClient`,
+            `NEO4J_ASYNC_INGESTION` by default. Ignored in sync mode.
+        project_id (Optional[str]): Project the graph belongs to. Only the nodes of this project
+            are replaced, the graphs of other projects stored in the database are left untouched.
     """
+    if async_ingestion is None:
+        async_ingestion = config.get("NEO4J_ASYNC_INGESTION", False)
 
-    client = Neo4jClient(uri=config.get("NEO4J_URI"), user=config.get("NEO4J_USER"), password=config.get("NEO4J_PASSWORD"))
-    client.push_graph_to_neo4j(graph, 
-                               delete_previous=True)
+    client = Neo4jClient(uri=config.get("NEO4J_URI"), 
+                         user=config.get("NEO4J_USER"), 
+                         password=config.get("NEO4J_PASSWORD"),
+                         batch_size=config.get("NEO4J_BATCH_SIZE", 1000),
+                         project_id=project_id)
+
+    if embed:
+        # The same provider embeds the queries, see RouterChat
+        provider = get_embedding_provider(provider=config.get("EMBEDDING_PROVIDER"),
+                                          api_key=config.get("OPENAI_API_KEY"),
+                                          model=config.get("EMBEDDING_MODEL"),
+                                          endpoint=config.get("EMBEDDING_ENDPOINT"),
+                                          dimensions=config.get("EMBEDDING_DIMENSIONS"))
+
+        # Created before loading on the CodeEntity label that nodes are created with,
+        # so no pass over the loaded nodes is needed. A dimension change drops the
+        # stored vectors of the project, so they are all re-embedded below
+        rebuilt = client.create_vector_index(
+            index_name="code_embedding",
+            node_label=COMMON_LABEL,
+            on_node_property=config.get("VECTOR_EMBEDDING_PROPERTY"),
+            embedding_dimensions=provider.dimensions
+        )
+        if rebuilt:
+            logger.info(f"Vector index rebuilt for {provider.dimensions} dimensions, re-embedding all nodes of the project.")
+        logger.debug("Vector index created.")
+
+    if sync:
+        client.sync_graph_to_neo4j(graph, 
+                                   embedding_property=config.get("VECTOR_EMBEDDING_PROPERTY"))
+    elif async_ingestion:
+        run_coroutine(push_graph_async(graph, delete_previous=True, project_id=project_id))
+    else:
+        client.push_graph_to_neo4j(graph, 
+                                   delete_previous=True)
     
     logger.debug("Graph pushed to Neo4j.")
-    
-    common_label = "CodeEntity"
-    client.add_common_label(
-        target_labels=["Class", "Function", "Method"],
-        common_label=common_label
-    )
-    
-    client.create_vector_index(
-        index_name="code_embedding",
-        node_label=common_label
-    )
 
-    logger.debug("Vector index created. Creating embeddings...")
+    if not embed:
+        client.close()
+        return
 
-    properties = {
-        "Method": "code",
-        "Function": "code",
-        "Class": "docstring"
-    }
-    
-    for label, property_name in properties.items():
+    logger.debug("Creating embeddings...")
+
+    embedding_property = config.get("VECTOR_EMBEDDING_PROPERTY")
+    embedding_model = f"{provider.name}:{provider.model}"
+    restored = 0
+    if snapshot_path:
+        restored = client.write_embeddings(read_snapshot_embeddings(snapshot_path, graph, 
+                                                                    embedding_property=embedding_property,
+                                                                    model=embedding_model,
+                                                                    dimensions=provider.dimensions),
+                                           embedding_property=embedding_property)
+
+    cache = EmbeddingCache(config.get("EMBEDDING_CACHE_PATH")) if config.get("EMBEDDING_CACHE_PATH") else None
+
+    for label, property_name in EMBEDDED_PROPERTIES.items():
         client.create_embeddings(node_label=label, 
-                                 openai_api_key=config.get("OPENAI_API_KEY"), 
-                                 on_node_property=property_name)
+                                 provider=provider, 
+                                 on_node_property=property_name,
+                                 embedding_property=embedding_property,
+                                 only_missing=sync or restored > 0,
+                                 batch_size=config.get("EMBEDDING_BATCH_SIZE", 100),
+                                 max_concurrency=config.get("EMBEDDING_CONCURRENCY", 4),
+                                 cache=cache)
         
         logger.debug(f"Embeddings for {label} created.")
     
+    if cache:
+        cache.close()
+    if snapshot_path:
+        # Stored so a later push of the same snapshot does not embed the nodes again
+        write_snapshot_embeddings(snapshot_path, graph, client.read_embeddings(embedding_property),
+                                  embedding_property=embedding_property, model=embedding_model)
     client.close()
 
-def build_process_graph(file_path: str) -> None:
+def build_process_graph(file_path: str, 
+                        jobs: int = 1, 
+                        cache_dir: str = None, 
+                        call_resolution: str = "internal", 
+                        call_resolver: str = "static",
+                        graph_format: str = "networkx",
+                        sync: bool = False,
+                        snapshot_path: str = None,
+                        build_only: bool = False,
+                        from_snapshot: bool = False,
+                        push_only: bool = False,
+                        streaming: bool = False,
+                        async_ingestion: bool = None,
+                        project_id: Optional[str] = None) -> None:
     """
     Build and process the graph from the provided file path.
 
+    With a `snapshot_path`, the build stage writes the graph to a snapshot and the
+    push and embedding stages read it memory-mapped, so they can be run again from
+    it without parsing the project.
+
     Args:
         file_path (str): Path to the input root folder for graph building.
+        jobs (int): Number of worker processes used to parse files.
+        cache_dir (str): Directory of the persistent parse cache, if any.
+        call_resolution (str): Call resolution mode, "all" or "internal".
+        call_resolver (str): Call resolver backend, "jedi" or "static".
+        graph_format (str): Graph store, "networkx" or "compact".
+        sync (bool): Synchronize the differences with Neo4j instead of wiping and reloading.
+        snapshot_path (str): Directory of the graph snapshot, if any.
+        build_only (bool): Stop after writing the snapshot.
+        from_snapshot (bool): Load the graph from the snapshot instead of building it.
+        push_only (bool): Push the graph without creating embeddings.
+        streaming (bool): Parse, push and embed concurrently with the streaming pipeline,
+            without building the whole graph in memory first.
+        async_ingestion (bool): Push the graph with concurrent transactions of the async client.
+        project_id (Optional[str]): Project stored on every node, whose previous graph is replaced.
     """
-    graph = build_graph(file_path)
+    if streaming:
+        try:
+            stream_graph_to_neo4j(file_path,
+                                  jobs=jobs,
+                                  cache_dir=cache_dir,
+                                  call_resolution=call_resolution,
+                                  call_resolver=call_resolver,
+                                  embed=not push_only,
+                                  project_id=project_id)
+        except Exception as e:
+            logger.error(f"An error occurred during streaming graph processing: {e}")
+        return
+
+    if from_snapshot:
+        graph = load_snapshot(snapshot_path)
+    else:
+        graph = build_graph(file_path, 
+                            jobs=jobs, 
+                            cache_dir=cache_dir, 
+                            call_resolution=call_resolution, 
+                            call_resolver=call_resolver,
+                            graph_format="compact" if snapshot_path else graph_format)
+        if snapshot_path:
+            write_snapshot(graph, snapshot_path)
+            # The in-memory build is dropped, the next stages read the memory-mapped snapshot
+            graph = load_snapshot(snapshot_path)
+
+    if build_only:
+        return
+
     try:
-        process_graph(graph)
+        process_graph(graph, sync=sync, snapshot_path=snapshot_path, embed=not push_only,
+                      async_ingestion=async_ingestion, project_id=project_id)
     except Exception as e:
         logger.error(f"An error occurred during graph processing: {e}")
 
 
 def lambda_handler(event, context):
     """
-    Lambda handler function to download and extract the file, build the graph, and process it.
+    Lambda handler function to extract the file, build the graph, and process it.
+
+    The work runs as the checkpointed stages of `Pipeline`, stopping before the
+    Lambda time limit. When stages are left, the function invokes itself again
+    with the same event (if `PIPELINE_SELF_INVOKE` is set) and the next invocation
+    resumes from the checkpoint. As it may run on a new container, the state
+    directory is stored in `PIPELINE_STATE_BUCKET` between invocations. The event
+    counts the invocations, and the run fails after `PIPELINE_MAX_INVOCATIONS`.
     """
-    # Download and extract the file
-    download_extract_file(s3_client = s3_client, event_dict=event, local_download_path="/var/task/test/skforecast.zip", extract_path="/var/task/test/skforecast")
-    build_process_graph("/var/task/test/skforecast")
-    return "Graph building and processing complete."
+    logger.info(f"Received event: {json.dumps(event)}")
+    invocation = event.get("pipeline_invocation", 1)
+    max_invocations = config.get("PIPELINE_MAX_INVOCATIONS", 20)
+    uploaded_object = event.get("detail", {}).get("object", {})
+    run_id = (f"{uploaded_object['key']}:{uploaded_object.get('etag', '')}"
+              if "key" in uploaded_object else None)
+    # Each uploaded archive is its own project, unless one is configured
+    project_id = config.get("PROJECT_ID") or (Path(uploaded_object["key"]).stem if "key" in uploaded_object else None)
+
+    # One state directory per run, so runs sharing a warm container do not mix their state
+    run_key = hashlib.sha256((run_id or json.dumps(event, sort_keys=True)).encode("utf-8")).hexdigest()[:16]
+    state_dir = str(Path(config.get("PIPELINE_STATE_DIR"), run_key))
+    state_store = None
+    if config.get("PIPELINE_STATE_BUCKET"):
+        state_store = S3StateStore(s3_client, config.get("PIPELINE_STATE_BUCKET"),
+                                   f"{config.get('PIPELINE_STATE_PREFIX')}/{run_key}")
+        state_store.download(state_dir)
+    started = time.time()
+
+    pipeline = Pipeline(state_dir=state_dir,
+                        archive_path="/var/task/test/skforecast.zip",
+                        run_id=run_id,
+                        project_id=project_id,
+                        jobs=config.get("GRAPH_BUILD_JOBS", 1),
+                        call_resolution=config.get("CALL_RESOLUTION", "internal"),
+                        call_resolver=config.get("CALL_RESOLVER", "static"),
+                        sync=config.get("NEO4J_SYNC_MODE", False),
+                        async_ingestion=config.get("NEO4J_ASYNC_INGESTION", False),
+                        time_budget=context.get_remaining_time_in_millis() / 1000 if context else None,
+                        safety_margin=config.get("PIPELINE_SAFETY_MARGIN", 60))
+    completed = False
+    try:
+        completed = pipeline.run()
+    finally:
+        if state_store is not None:
+            if completed:
+                state_store.delete()
+            else:
+                state_store.upload(state_dir, since=started)
+
+    if not completed:
+        if invocation >= max_invocations:
+            raise RuntimeError(f"Pipeline not completed after {invocation} invocations, "
+                               f"stopped at stages {pipeline.checkpoint.completed_stages}")
+        if context and config.get("PIPELINE_SELF_INVOKE"):
+            if state_store is None:
+                logger.warning("PIPELINE_SELF_INVOKE is set without PIPELINE_STATE_BUCKET: the next invocation "
+                               "only resumes if PIPELINE_STATE_DIR is persistent storage.")
+            logger.info(f"Pipeline stages left, invoking the function again to resume them "
+                        f"(invocation {invocation + 1} of at most {max_invocations}).")
+            lambda_client.invoke(FunctionName=context.invoked_function_arn,
+                                 InvocationType="Event",
+                                 Payload=json.dumps({**event, "pipeline_invocation": invocation + 1}))
+
+    return {
+        "status": "complete" if completed else "in_progress",
+        "invocation": invocation,
+        "completed_stages": pipeline.checkpoint.completed_stages,
+        "progress": pipeline.checkpoint.progress
+    }
 
 
 def main() -> None:
@@ -118,7 +440,20 @@ def main() -> None:
     Main function to orchestrate graph building and processing from command-line parsed argument.
     """
     args = parse_arguments()
-    build_process_graph(args.file_path)
+    build_process_graph(args.file_path, 
+                        jobs=args.jobs, 
+                        cache_dir=args.cache_dir, 
+                        call_resolution=args.call_resolution, 
+                        call_resolver=args.call_resolver,
+                        graph_format=args.graph_format,
+                        sync=args.sync,
+                        snapshot_path=args.snapshot_path,
+                        build_only=args.build_only,
+                        from_snapshot=bool(args.from_snapshot),
+                        push_only=args.push_only,
+                        streaming=args.streaming,
+                        async_ingestion=args.async_ingestion,
+                        project_id=args.project_id)
 
 if __name__ == '__main__':
     logger.debug(f"URI: {config.get('NEO4J_URI')}")
@@ -0,0 +1,487 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from src.utils.config import config, logger
+from src.graph.graph_builder import BuildInterrupted, GraphBuilder
+from src.graph.snapshot import load_snapshot, read_snapshot_embeddings, write_snapshot, write_snapshot_embeddings
+from src.neo4j_integration.neo4j_client import COMMON_LABEL, Neo4jClient
+from src.neo4j_integration.async_neo4j_client import AsyncNeo4jClient
+from src.embeddings import EmbeddingCache, get_embedding_provider
+
+# The vector index is created before the push, so nodes need no indexing pass once loaded
+PIPELINE_STAGES = ("extract", "build", "index", "push", "embed")
+CHECKPOINT_FILE = "checkpoint.json"
+CHECKPOINT_VERSION = 1
+
+# Node property embedded for each label
+EMBEDDED_PROPERTIES = {
+    "Method": "code",
+    "Function": "code",
+    "Class": "docstring"
+}
+
+
+class StageInterrupted(Exception):
+    """Raised inside a stage when the time budget of the invocation is exhausted."""
+
+
+class PipelineCheckpoint:
+    """
+    Progress of a pipeline run, persisted as JSON in the state directory.
+
+    It records the completed stages and the progress markers of the current one:
+    files parsed by the build, batches committed per node label and relation type
+    by the push, and nodes embedded per label.
+    """
+
+    def __init__(self, state_dir: Path, run_id: str):
+        self.path = state_dir / CHECKPOINT_FILE
+        self.run_id = run_id
+        self.completed_stages: List[str] = []
+        self.progress: Dict[str, Dict] = {}
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable pipeline checkpoint {self.path}: {e}")
+            return
+
+        if saved.get("version") != CHECKPOINT_VERSION or saved.get("run_id") != run_id:
+            logger.info(f"Pipeline checkpoint {self.path} belongs to another run, starting over.")
+            return
+        self.completed_stages = saved["completed_stages"]
+        self.progress = saved["progress"]
+
+    def save(self) -> None:
+        """Write the checkpoint atomically, so an interrupted invocation never leaves it half written."""
+        content = {
+            "version": CHECKPOINT_VERSION,
+            "run_id": self.run_id,
+            "completed_stages": self.completed_stages,
+            "progress": self.progress,
+        }
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=self.path.parent,
+                                         suffix=".tmp", delete=False) as f:
+            json.dump(content, f, indent=2)
+        os.replace(f.name, self.path)
+
+
+class S3StateStore:
+    """
+    Durable copy of a pipeline state directory under an S3 prefix.
+
+    The /tmp of a Lambda container does not outlive it, so an invocation landing
+    on a new container downloads the state left by the previous one, and uploads
+    the files it wrote before returning.
+    """
+
+    def __init__(self, s3_client, bucket: str, prefix: str):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+
+    def _keys(self) -> List[str]:
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        return [item["Key"]
+                for page in paginator.paginate(Bucket=self.bucket, Prefix=f"{self.prefix}/")
+                for item in page.get("Contents", [])]
+
+    def download(self, state_dir: str) -> int:
+        """
+        Download the stored state into `state_dir`. Returns the number of downloaded files.
+        """
+        keys = self._keys()
+        for key in keys:
+            path = Path(state_dir, key[len(self.prefix) + 1:])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self.s3_client.download_file(self.bucket, key, str(path))
+        logger.info(f"Downloaded {len(keys)} pipeline state files from s3://{self.bucket}/{self.prefix}")
+        return len(keys)
+
+    def upload(self, state_dir: str, since: float = 0.0) -> int:
+        """
+        Upload the files of `state_dir` modified since the `since` timestamp, e.g. the
+        ones written by the current invocation. Returns the number of uploaded files.
+        """
+        uploaded = 0
+        for path in Path(state_dir).rglob("*"):
+            if path.is_file() and path.stat().st_mtime >= since:
+                key = f"{self.prefix}/{path.relative_to(state_dir).as_posix()}"
+                self.s3_client.upload_file(str(path), self.bucket, key)
+                uploaded += 1
+        logger.info(f"Uploaded {uploaded} pipeline state files to s3://{self.bucket}/{self.prefix}")
+        return uploaded
+
+    def delete(self) -> None:
+        """Delete the stored state, once the run is completed."""
+        keys = self._keys()
+        for start in range(0, len(keys), 1000):
+            self.s3_client.delete_objects(Bucket=self.bucket,
+                                          Delete={"Objects": [{"Key": key} for key in keys[start:start + 1000]]})
+
+
+class Pipeline:
+    """
+    Graph database creation split into resumable stages: extract, build, index,
+    push and embed.
+
+    Every stage persists its progress in a checkpoint in `state_dir`, together with
+    what it hands over to the next stages (extracted project, parse cache and graph
+    snapshot). A stage stops cleanly when the time budget of the invocation runs
+    out, and the next invocation with the same `state_dir` and `run_id` continues
+    from the last checkpoint instead of starting over.
+    """
+
+    def __init__(self,
+                 state_dir: str,
+                 project_root: Optional[str] = None,
+                 archive_path: Optional[str] = None,
+                 run_id: Optional[str] = None,
+                 project_id: Optional[str] = None,
+                 jobs: int = 1,
+                 call_resolution: str = "internal",
+                 call_resolver: str = "static",
+                 sync: bool = False,
+                 async_ingestion: Optional[bool] = None,
+                 time_budget: Optional[float] = None,
+                 safety_margin: float = 60.0):
+        """
+        Args:
+            state_dir (str): Directory holding the checkpoint and the data shared between stages.
+                On Lambda it is local to the container, see `S3StateStore` for a new container to resume.
+            project_root (Optional[str]): Project to build, when it does not need to be extracted.
+            archive_path (Optional[str]): ZIP or RAR archive of the project, extracted by the first stage.
+            run_id (Optional[str]): Identifier of the run. A checkpoint of another run is discarded.
+            project_id (Optional[str]): Project stored on every node, whose previous graph is replaced.
+            jobs (int): Number of worker processes used to parse files.
+            call_resolution (str): Call resolution mode, "all" or "internal".
+            call_resolver (str): Call resolver backend, "jedi" or "static".
+            sync (bool): Synchronize the differences with Neo4j instead of wiping and reloading.
+            async_ingestion (Optional[bool]): Push the graph with concurrent transactions of
+                `AsyncNeo4jClient`, `NEO4J_ASYNC_INGESTION` by default. Ignored in sync mode.
+            time_budget (Optional[float]): Seconds available to this invocation, unlimited if None.
+            safety_margin (float): Seconds kept free at the end of the budget to checkpoint and return.
+        """
+        if not project_root and not archive_path:
+            raise ValueError("Either a project root or an archive of the project is required")
+        self.state_dir = Path(state_dir)
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        self.archive_path = archive_path
+        self.project_root = str(self.state_dir / "project") if archive_path else project_root
+        self.parse_cache_dir = str(self.state_dir / "parse_cache")
+        self.snapshot_path = str(self.state_dir / "graph.snapshot")
+        self.jobs = jobs
+        self.call_resolution = call_resolution
+        self.call_resolver = call_resolver
+        self.sync = sync
+        if async_ingestion is None:
+            async_ingestion = config.get("NEO4J_ASYNC_INGESTION", False)
+        self.async_ingestion = async_ingestion
+        self.project_id = project_id
+        self.deadline = time.monotonic() + time_budget - safety_margin if time_budget is not None else None
+
+        run_id = run_id or json.dumps([archive_path or project_root, project_id, call_resolution, call_resolver, sync,
+                                       async_ingestion])
+        self.checkpoint = PipelineCheckpoint(self.state_dir, run_id)
+        self._client = None
+
+    @property
+    def completed(self) -> bool:
+        return all(stage in self.checkpoint.completed_stages for stage in PIPELINE_STAGES)
+
+    def should_stop(self) -> bool:
+        """Whether the time budget of the invocation is exhausted."""
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def run(self, stages: Optional[List[str]] = None) -> bool:
+        """
+        Run the pending stages in order, skipping the completed ones.
+
+        Args:
+            stages (Optional[List[str]]): Stages to run, all of them if None.
+
+        Returns:
+            bool: True if every requested stage is completed, False if the time budget ran out.
+        """
+        stages = [stage for stage in PIPELINE_STAGES if stages is None or stage in stages]
+        try:
+            for stage in stages:
+                if stage in self.checkpoint.completed_stages:
+                    logger.info(f"Pipeline stage {stage} already completed, skipping it.")
+                    continue
+                if self.should_stop():
+                    logger.info(f"Time budget exhausted before pipeline stage {stage}.")
+                    return False
+
+                start = time.time()
+                logger.info(f"Running pipeline stage {stage}...")
+                try:
+                    getattr(self, f"_run_{stage}")()
+                except (StageInterrupted, BuildInterrupted) as e:
+                    self.checkpoint.save()
+                    logger.info(f"Pipeline stage {stage} interrupted after {time.time() - start:.1f}s, "
+                                f"progress saved: {e}")
+                    return False
+
+                self.checkpoint.completed_stages.append(stage)
+                self.checkpoint.save()
+                logger.info(f"Pipeline stage {stage} completed in {time.time() - start:.1f}s.")
+            return True
+        finally:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+    @property
+    def client(self) -> Neo4jClient:
+        if self._client is None:
+            self._client = Neo4jClient(uri=config.get("NEO4J_URI"),
+                                       user=config.get("NEO4J_USER"),
+                                       password=config.get("NEO4J_PASSWORD"),
+                                       batch_size=config.get("NEO4J_BATCH_SIZE", 1000),
+                                       project_id=self.project_id)
+        return self._client
+
+    def _progress(self, stage: str) -> Dict:
+        return self.checkpoint.progress.setdefault(stage, {})
+
+    def _checkpoint_callback(self, stage: str) -> Callable:
+        """
+        Callback recording the progress of a stage after each committed batch, and
+        stopping the stage once it is saved if the time budget is exhausted.
+        """
+        progress = self._progress(stage)
+
+        def on_batch(key: str, count: int) -> None:
+            progress[key] = count
+            self.checkpoint.save()
+            if self.should_stop():
+                raise StageInterrupted(f"{key}: {count}")
+
+        return on_batch
+
+    def _run_extract(self) -> None:
+        if not self.archive_path:
+            return
+        # Imported here, as only this stage needs the archive libraries
+        from src.utils.utils_deploy import extract_compressed_file
+        shutil.rmtree(self.project_root, ignore_errors=True)
+        if extract_compressed_file(self.archive_path, self.project_root) is None:
+            raise RuntimeError(f"Could not extract {self.archive_path}")
+
+    def _run_build(self) -> None:
+        builder = GraphBuilder(self.project_root,
+                               jobs=self.jobs,
+                               cache_dir=self.parse_cache_dir,
+                               call_resolution=self.call_resolution,
+                               call_resolver=self.call_resolver,
+                               graph_format="compact")
+        progress = self._progress("build")
+        try:
+            graph = builder.build(should_stop=self.should_stop)
+        except BuildInterrupted as e:
+            # Parsed files are in the parse cache, which is what the next invocation resumes from
+            progress["files_parsed"] = builder.stats["parse_cache_hits"] + e.parsed
+            progress["files_total"] = builder.stats["parse_cache_hits"] + e.total
+            raise
+        write_snapshot(graph, self.snapshot_path)
+        files = builder.stats["parse_cache_hits"] + builder.stats["parse_cache_misses"]
+        progress.update(files_parsed=files, files_total=files,
+                        nodes=graph.number_of_nodes(), edges=graph.number_of_edges())
+
+    def _embedding_provider(self):
+        # The same provider embeds the queries, see RouterChat
+        return get_embedding_provider(provider=config.get("EMBEDDING_PROVIDER"),
+                                      api_key=config.get("OPENAI_API_KEY"),
+                                      model=config.get("EMBEDDING_MODEL"),
+                                      endpoint=config.get("EMBEDDING_ENDPOINT"),
+                                      dimensions=config.get("EMBEDDING_DIMENSIONS"))
+
+    def _run_index(self) -> None:
+        provider = self._embedding_provider()
+        rebuilt = self.client.create_vector_index(index_name="code_embedding",
+                                                  node_label=COMMON_LABEL,
+                                                  on_node_property=config.get("VECTOR_EMBEDDING_PROPERTY"),
+                                                  embedding_dimensions=provider.dimensions)
+        if rebuilt:
+            logger.info(f"Vector index rebuilt for {provider.dimensions} dimensions, re-embedding all nodes of the project.")
+
+    def _run_push(self) -> None:
+        graph = load_snapshot(self.snapshot_path)
+        on_batch = self._checkpoint_callback("push")
+        if self.sync:
+            # The diff is recomputed on every invocation, so a sync resumes by running again
+            self.client.sync_graph_to_neo4j(graph,
+                                            embedding_property=config.get("VECTOR_EMBEDDING_PROPERTY"),
+                                            on_batch=on_batch)
+        elif self.async_ingestion:
+            try:
+                asyncio.run(self._push_async(graph, on_batch))
+            except StageInterrupted:
+                raise
+            except Exception:
+                # Batches following the failed one may be committed, so the push starts over
+                self.checkpoint.progress["push"] = {}
+                self.checkpoint.save()
+                raise
+        else:
+            self.client.push_graph_to_neo4j(graph,
+                                            delete_previous=True,
+                                            progress=dict(self._progress("push")),
+                                            on_batch=on_batch)
+
+    async def _push_async(self, graph: object, on_batch: Callable) -> None:
+        async with AsyncNeo4jClient(uri=config.get("NEO4J_URI"),
+                                    user=config.get("NEO4J_USER"),
+                                    password=config.get("NEO4J_PASSWORD"),
+                                    batch_size=config.get("NEO4J_BATCH_SIZE", 1000),
+                                    concurrency=config.get("NEO4J_WRITE_CONCURRENCY", 4),
+                                    project_id=self.project_id) as client:
+            await client.push_graph_to_neo4j(graph,
+                                             delete_previous=True,
+                                             progress=dict(self._progress("push")),
+                                             on_batch=on_batch)
+
+    def _run_embed(self) -> None:
+        graph = load_snapshot(self.snapshot_path)
+        provider = self._embedding_provider()
+        embedding_property = config.get("VECTOR_EMBEDDING_PROPERTY")
+        embedding_model = f"{provider.name}:{provider.model}"
+        progress = self._progress("embed")
+
+        if "restored" not in progress:
+            progress["restored"] = self.client.write_embeddings(
+                read_snapshot_embeddings(self.snapshot_path, graph,
+                                         embedding_property=embedding_property,
+                                         model=embedding_model,
+                                         dimensions=provider.dimensions),
+                embedding_property=embedding_property)
+            self.checkpoint.save()
+
+        cache = EmbeddingCache(config.get("EMBEDDING_CACHE_PATH")) if config.get("EMBEDDING_CACHE_PATH") else None
+        on_batch = self._checkpoint_callback("embed")
+        try:
+            for label, property_name in EMBEDDED_PROPERTIES.items():
+                # Committed batches are skipped through only_missing, whether this
+                # invocation resumes an earlier one or follows a fresh push
+                embedded_before = progress.get(label, 0)
+                self.client.create_embeddings(node_label=label,
+                                              provider=provider,
+                                              on_node_property=property_name,
+                                              embedding_property=embedding_property,
+                                              only_missing=True,
+                                              batch_size=config.get("EMBEDDING_BATCH_SIZE", 100),
+                                              max_concurrency=config.get("EMBEDDING_CONCURRENCY", 4),
+                                              cache=cache,
+                                              on_batch=lambda count, label=label, before=embedded_before:
+                                                  on_batch(label, before + count))
+        finally:
+            if cache:
+                cache.close()
+
+        # Stored so a later push of the same snapshot does not embed the nodes again
+        write_snapshot_embeddings(self.snapshot_path, graph, self.client.read_embeddings(embedding_property),
+                                  embedding_property=embedding_property, model=embedding_model)
+
+
+def _run_pipeline_process(pipeline_kwargs: Dict, stages: List[str]) -> None:
+    Pipeline(**pipeline_kwargs).run(stages)
+
+
+def run_local(pipeline_kwargs: Dict,
+              stages: Optional[List[str]] = None,
+              separate_processes: bool = False,
+              max_invocations: int = 100) -> int:
+    """
+    Run the pipeline locally, re-invoking it until every stage is completed, like
+    consecutive Lambda invocations would.
+
+    Args:
+        pipeline_kwargs (Dict): Arguments of `Pipeline`, the same for every invocation.
+        stages (Optional[List[str]]): Stages to run, all of them if None.
+        separate_processes (bool): Run each invocation of each stage in its own process,
+            so stages only share what they persist in the state directory.
+        max_invocations (int): Maximum number of invocations before giving up.
+
+    Returns:
+        int: Number of invocations made.
+    """
+    stages = [stage for stage in PIPELINE_STAGES if stages is None or stage in stages]
+    context = multiprocessing.get_context("spawn")
+    invocations = 0
+    for stage in stages if separate_processes else [None]:
+        requested = [stage] if stage else stages
+        while True:
+            if invocations == max_invocations:
+                raise RuntimeError(f"Pipeline not completed after {max_invocations} invocations")
+            invocations += 1
+            if separate_processes:
+                process = context.Process(target=_run_pipeline_process, args=(pipeline_kwargs, requested))
+                process.start()
+                process.join()
+                if process.exitcode != 0:
+                    raise RuntimeError(f"Pipeline stage {stage} failed with exit code {process.exitcode}")
+                done = stage in Pipeline(**pipeline_kwargs).checkpoint.completed_stages
+            else:
+                done = Pipeline(**pipeline_kwargs).run(requested)
+            if done:
+                break
+    logger.info(f"Pipeline completed in {invocations} invocations.")
+    return invocations
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Local orchestrator of the checkpointed graph database pipeline")
+    parser.add_argument("--state_dir", required=True, help="Directory of the checkpoint and intermediate data")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--file_path", help="Path to the input root folder for graph building")
+    source.add_argument("--archive_path", help="ZIP or RAR archive of the project to extract and build")
+    parser.add_argument("--project_id", default=config.get("PROJECT_ID"),
+                        help="Project identifier stored on every node, only its graph is replaced")
+    parser.add_argument("--stages", nargs="+", choices=PIPELINE_STAGES, help="Stages to run, all by default")
+    parser.add_argument("--jobs", type=int, default=config.get("GRAPH_BUILD_JOBS", 1))
+    parser.add_argument("--call_resolution", choices=["all", "internal"], default=config.get("CALL_RESOLUTION", "internal"))
+    parser.add_argument("--call_resolver", choices=["jedi", "static"], default=config.get("CALL_RESOLVER", "static"))
+    parser.add_argument("--sync", action="store_true", default=config.get("NEO4J_SYNC_MODE", False),
+                        help="Synchronize the differences with Neo4j")
+    parser.add_argument("--async_ingestion", action="store_true", default=config.get("NEO4J_ASYNC_INGESTION", False),
+                        help="Push the graph in NEO4J_WRITE_CONCURRENCY concurrent transactions")
+    parser.add_argument("--time_budget", type=float, help="Seconds per invocation, to simulate the Lambda time limit")
+    parser.add_argument("--safety_margin", type=float, default=0.0,
+                        help="Seconds kept free at the end of each invocation")
+    parser.add_argument("--separate_processes", action="store_true", help="Run every invocation in its own process")
+    parser.add_argument("--restart", action="store_true", help="Discard the checkpoint and start over")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_arguments()
+    if args.restart:
+        Path(args.state_dir, CHECKPOINT_FILE).unlink(missing_ok=True)
+    run_local(dict(state_dir=args.state_dir,
+                   project_root=args.file_path,
+                   archive_path=args.archive_path,
+                   project_id=args.project_id,
+                   jobs=args.jobs,
+                   call_resolution=args.call_resolution,
+                   call_resolver=args.call_resolver,
+                   sync=args.sync,
+                   async_ingestion=args.async_ingestion,
+                   time_budget=args.time_budget,
+                   safety_margin=args.safety_margin),
+              stages=args.stages,
+              separate_processes=args.separate_processes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,461 @@
+import dataclasses
+import queue
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+from src.utils.config import config, logger
+from src.utils.code_parsing import DefinitionRecord, find_python_files, get_relative_module_name
+from src.graph.class_hierarchy import ClassHierarchy
+from src.graph.graph_builder import GraphBuilder
+from src.neo4j_integration.neo4j_client import (
+    COMMON_LABEL,
+    NODE_PROPERTIES,
+    Neo4jClient,
+    compute_node_hash,
+    get_node_label
+)
+from src.embeddings import EmbeddingCache, EmbeddingProvider, embed_in_batches, get_embedding_provider
+from src.database.pipeline import EMBEDDED_PROPERTIES
+
+# Marks the end of the items of a queue
+_END = object()
+
+
+class _Cancelled(Exception):
+    """Raised in a stage when another stage failed, to stop it instead of blocking on a queue."""
+
+
+@dataclasses.dataclass
+class StageThroughput:
+    """
+    Throughput of a pipeline stage: items handled, time spent waiting for the
+    upstream stage (starved) and for room in the downstream queue (backpressure).
+    """
+    name: str
+    unit: str
+    items: int = 0
+    seconds: float = 0.0
+    starved_seconds: float = 0.0
+    blocked_seconds: float = 0.0
+
+    def report(self) -> str:
+        rate = self.items / self.seconds if self.seconds else 0.0
+        return (f"  {self.name}: {self.items} {self.unit} in {self.seconds:.2f}s ({rate:.0f} {self.unit}/s), "
+                f"starved {self.starved_seconds:.2f}s, blocked {self.blocked_seconds:.2f}s")
+
+
+class StreamingPipeline:
+    """
+    Producer/consumer pipeline overlapping the parsing, the Neo4j ingestion and the
+    embedding of a project, instead of running them one after another.
+
+    Three threads are connected by bounded queues:
+    - parse: streams the definitions and calls of each file from `GraphBuilder.stream_results`.
+    - ingest: writes node batches as files arrive, with the common label set on creation,
+      and writes an edge as soon as both of its endpoints are committed. `self.`, `cls.`
+      and `super()` calls need the whole class hierarchy and are resolved once parsing ends.
+    - embed: embeds the text of committed nodes and writes their vectors.
+
+    A stage blocks when the next queue is full, so the parsed files, node rows and texts
+    to embed in flight, the bulk of the data with the code and docstrings, are bounded
+    by the queue sizes. Besides them, the ingest stage keeps the id of every written
+    node and the class records for the whole run, see `_Ingestor`.
+    """
+
+    def __init__(self,
+                 project_root: str,
+                 client: Neo4jClient,
+                 provider: Optional[EmbeddingProvider] = None,
+                 jobs: int = 1,
+                 cache_dir: Optional[str] = None,
+                 call_resolution: str = "internal",
+                 call_resolver: str = "static",
+                 embedding_property: str = "code_embedding",
+                 queue_size: int = 64,
+                 embedding_batch_size: int = 100,
+                 embedding_concurrency: int = 4,
+                 embedding_cache_path: Optional[str] = None):
+        """
+        Args:
+            project_root (str): Root folder of the project.
+            client (Neo4jClient): Client of the database. The graph of its project is deleted before loading.
+            provider (Optional[EmbeddingProvider]): Embedding provider, nodes are not embedded if None.
+            jobs (int): Number of worker processes used to parse files.
+            cache_dir (Optional[str]): Directory of the persistent parse cache, if any.
+            call_resolution (str): Call resolution mode, "all" or "internal".
+            call_resolver (str): Call resolver backend, "jedi" or "static".
+            embedding_property (str): Node property where the vectors are stored.
+            queue_size (int): Capacity of the queues between stages, in parsed files
+                between parse and ingest, and in nodes between ingest and embed.
+            embedding_batch_size (int): Number of texts per embedding request.
+            embedding_concurrency (int): Maximum number of embedding requests in flight.
+            embedding_cache_path (Optional[str]): Persistent embedding cache, if any.
+        """
+        self.builder = GraphBuilder(project_root,
+                                    jobs=jobs,
+                                    cache_dir=cache_dir,
+                                    call_resolution=call_resolution,
+                                    call_resolver=call_resolver)
+        self.client = client
+        self.provider = provider
+        self.embedding_property = embedding_property
+        self.embedding_batch_size = embedding_batch_size
+        self.embedding_concurrency = embedding_concurrency
+        self.embedding_cache_path = embedding_cache_path
+
+        self.parsed_queue = queue.Queue(maxsize=queue_size)
+        self.embed_queue = queue.Queue(maxsize=queue_size)
+        self.throughput = {
+            "parse": StageThroughput("parse", "files"),
+            "ingest": StageThroughput("ingest", "nodes"),
+            "embed": StageThroughput("embed", "nodes"),
+        }
+        self.edges_written = 0
+        self._failed = threading.Event()
+        self._errors: List[BaseException] = []
+
+    def run(self) -> Dict[str, StageThroughput]:
+        """
+        Delete the stored graph of the project, then parse, ingest and embed it concurrently.
+
+        Returns:
+            Dict[str, StageThroughput]: Throughput of each stage.
+
+        Raises:
+            Exception: The first error raised by a stage, once every stage is stopped.
+        """
+        self.client.delete_project_graph()
+        self.client.create_constraints()
+        if self.provider is not None:
+            # Created before loading, so vectors are indexed as they are written
+            self.client.create_vector_index(index_name="code_embedding",
+                                            node_label=COMMON_LABEL,
+                                            on_node_property=self.embedding_property,
+                                            embedding_dimensions=self.provider.dimensions)
+
+        start = time.time()
+        threads = [threading.Thread(target=self._run_stage, args=(name, stage), name=f"pipeline-{name}")
+                   for name, stage in (("parse", self._parse),
+                                       ("ingest", self._ingest),
+                                       ("embed", self._embed))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if self._errors:
+            raise self._errors[0]
+
+        logger.info(self.report(time.time() - start))
+        return self.throughput
+
+    def report(self, elapsed: float) -> str:
+        lines = [f"Streaming pipeline completed in {elapsed:.2f}s, {self.edges_written} edges written, "
+                 f"{len(self.builder.failed_files)} failed files:"]
+        lines.extend(stage.report() for stage in self.throughput.values())
+        return "\n".join(lines)
+
+    def _run_stage(self, name: str, stage: Callable[[StageThroughput], None]) -> None:
+        throughput = self.throughput[name]
+        start = time.time()
+        try:
+            stage(throughput)
+        except _Cancelled:
+            logger.info(f"Pipeline stage {name} stopped after a failure of another stage.")
+        except BaseException as e:
+            logger.error(f"Pipeline stage {name} failed: {e}")
+            self._errors.append(e)
+            self._failed.set()
+        finally:
+            throughput.seconds = time.time() - start
+
+    def _put(self, target: queue.Queue, item: object, throughput: StageThroughput) -> None:
+        start = time.time()
+        while True:
+            if self._failed.is_set():
+                raise _Cancelled()
+            try:
+                target.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        throughput.blocked_seconds += time.time() - start
+
+    def _get(self, source: queue.Queue, throughput: StageThroughput) -> object:
+        start = time.time()
+        while True:
+            if self._failed.is_set():
+                raise _Cancelled()
+            try:
+                item = source.get(timeout=0.1)
+                break
+            except queue.Empty:
+                continue
+        throughput.starved_seconds += time.time() - start
+        return item
+
+    def _drain(self, source: queue.Queue, throughput: StageThroughput) -> Iterator:
+        while (item := self._get(source, throughput)) is not _END:
+            yield item
+
+    def _parse(self, throughput: StageThroughput) -> None:
+        for file_path, result in self.builder.stream_results():
+            self._put(self.parsed_queue, (file_path, result), throughput)
+            throughput.items += 1
+        self._put(self.parsed_queue, _END, throughput)
+
+    def _ingest(self, throughput: StageThroughput) -> None:
+        ingestor = _Ingestor(self, throughput)
+        with self.client.driver.session() as session:
+            ingestor.session = session
+            for file_path, (defs, calls_list) in self._drain(self.parsed_queue, throughput):
+                ingestor.add_file(file_path, defs, calls_list)
+            ingestor.finish()
+        self.edges_written = ingestor.edges_written
+        self._put(self.embed_queue, _END, throughput)
+
+    def _embed(self, throughput: StageThroughput) -> None:
+        pairs = self._drain(self.embed_queue, throughput)
+        if self.provider is None:
+            for _ in pairs:
+                pass
+            return
+
+        # Opened in this thread, as the cache connection cannot be shared between threads
+        cache = EmbeddingCache(self.embedding_cache_path) if self.embedding_cache_path else None
+        query = self.client.vector_write_query(self.embedding_property, self.client.project_id)
+        try:
+            with self.client.driver.session() as session:
+                for batch in embed_in_batches(pairs, self.provider,
+                                              batch_size=self.embedding_batch_size,
+                                              max_concurrency=self.embedding_concurrency,
+                                              cache=cache):
+                    self.client._write_batch(session, query,
+                                             [{"id": node_id, "vector": vector} for node_id, vector in batch])
+                    throughput.items += len(batch)
+        finally:
+            if cache:
+                cache.close()
+
+
+class _Ingestor:
+    """
+    State of the ingest stage: node and edge batches being filled, committed node
+    ids and edges waiting for one of their endpoints.
+
+    Every edge comes from a definition of the file being ingested, except the
+    `self.`, `cls.` and `super()` calls resolved at the end, so duplicated edges are
+    detected per file. An edge waits for an endpoint only until the file of its
+    module is ingested: if the endpoint is not defined there, or belongs to no module
+    of the project, the edge is dropped, like the build drops it. Retained until the
+    end of the run:
+    - `committed`: the id of every written node, to know when an edge can be written.
+    - `class_skeletons`: the class records without code and docstring, to build the
+      class hierarchy that resolves the deferred calls.
+    - `deferred_calls`: the `self.`, `cls.` and `super()` calls of the project, and
+      the targets of the other calls of their callers, so they are written once.
+    """
+
+    def __init__(self, pipeline: StreamingPipeline, throughput: StageThroughput):
+        self.pipeline = pipeline
+        self.client = pipeline.client
+        self.throughput = throughput
+        self.session = None
+        self.batch_size = pipeline.client.batch_size
+
+        project_root = pipeline.builder.project_root
+        self.project_modules: Set[str] = {get_relative_module_name(path, project_root)
+                                          for path in find_python_files(project_root)}
+        self.ingested_modules: Set[str] = set()
+        self.class_skeletons: Dict[str, DefinitionRecord] = {}
+        self.committed: Set[str] = set()
+        self.pending: Set[str] = set()
+        self.node_batches: Dict[str, List[Dict]] = defaultdict(list)
+        self.edge_batches: Dict[str, List[Dict]] = defaultdict(list)
+        # Edges keyed by the endpoint they wait for, and those endpoints by module
+        self.waiting: Dict[str, List[Tuple[str, str, str]]] = defaultdict(list)
+        self.waiting_by_module: Dict[str, Set[str]] = defaultdict(set)
+        self.seen_edges: Set[Tuple[str, str, str]] = set()
+        self.deferred_calls: List[Dict] = []
+        self.deferred_call_targets: Dict[str, Set[str]] = {}
+        self.edges_written = 0
+        self.edges_dropped = 0
+
+    def add_file(self, file_path: str, defs: Dict[str, DefinitionRecord], calls_list: List[Dict]) -> None:
+        """Add the definitions and calls of a file, then release its per-file state."""
+        for record in defs.values():
+            self.add_node(record)
+        callers = set()
+        for call in calls_list:
+            if call.get("self_class"):
+                self.deferred_calls.append(call)
+                callers.add(call.get("caller_id"))
+            else:
+                self.add_edge(call.get("caller_id"), call.get("candidate_id"), "CALL")
+
+        # Deferred calls are resolved at the end and must not repeat the other calls of their caller
+        for source, target, rel_type in self.seen_edges:
+            if rel_type == "CALL" and source in callers:
+                self.deferred_call_targets.setdefault(source, set()).add(target)
+        self.seen_edges.clear()
+
+        module = get_relative_module_name(file_path, self.pipeline.builder.project_root)
+        self.ingested_modules.add(module)
+        for endpoint in self.waiting_by_module.pop(module, ()):
+            if endpoint not in self.pending and endpoint not in self.committed:
+                self.edges_dropped += len(self.waiting.pop(endpoint, []))
+
+    def add_node(self, record: DefinitionRecord) -> None:
+        label = get_node_label({'type': record.type})
+        data = record.to_dict()
+        row = {key: data.get(key) for key in NODE_PROPERTIES}
+        row['id'] = record.id
+        row['content_hash'] = compute_node_hash(label, data)
+        if self.client.project_id is not None:
+            row['project_id'] = self.client.project_id
+        self.node_batches[label].append(row)
+        self.pending.add(record.id)
+        # The code and docstring go to Neo4j, only what the deferred calls need is kept
+        if record.type == 'class':
+            self.class_skeletons[record.id] = dataclasses.replace(record, code="", docstring="")
+
+        if record.parent_id:
+            self.add_edge(record.id, record.parent_id, "NESTED_IN")
+        if record.type == 'class':
+            for base_class in record.inherits_from:
+                self.add_edge(record.id, base_class, "INHERITS_FROM")
+
+        if len(self.node_batches[label]) >= self.batch_size:
+            self.write_nodes(label)
+
+    def add_edge(self, source: str, target: str, rel_type: str) -> None:
+        edge = (source, target, rel_type)
+        if edge in self.seen_edges:
+            return
+        self.seen_edges.add(edge)
+        self.schedule_edge(edge)
+
+    def module_of(self, definition_id: str) -> Optional[str]:
+        """Return the project module a definition id belongs to, the longest matching prefix."""
+        if not definition_id:
+            return None
+        parts = definition_id.split(".")
+        for length in range(len(parts) - 1, 0, -1):
+            module = ".".join(parts[:length])
+            if module in self.project_modules:
+                return module
+        return None
+
+    def schedule_edge(self, edge: Tuple[str, str, str]) -> None:
+        source, target, rel_type = edge
+        for endpoint in (source, target):
+            if endpoint in self.committed:
+                continue
+            if endpoint not in self.pending:
+                module = self.module_of(endpoint)
+                if module is None or module in self.ingested_modules:
+                    self.edges_dropped += 1
+                    return
+                self.waiting_by_module[module].add(endpoint)
+            self.waiting[endpoint].append(edge)
+            return
+        self.edge_batches[rel_type].append({"source": source, "target": target})
+        if len(self.edge_batches[rel_type]) >= self.batch_size:
+            self.write_edges(rel_type)
+
+    def write_nodes(self, label: str) -> None:
+        rows = self.node_batches.pop(label, [])
+        if not rows:
+            return
+        self.client._write_batch(self.session, self.client.node_create_query(label), rows)
+        self.throughput.items += len(rows)
+
+        property_name = EMBEDDED_PROPERTIES[label]
+        for row in rows:
+            self.committed.add(row['id'])
+            self.pending.discard(row['id'])
+            if row.get(property_name):
+                self.pipeline._put(self.pipeline.embed_queue, (row['id'], row[property_name]), self.throughput)
+        for row in rows:
+            for edge in self.waiting.pop(row['id'], []):
+                self.schedule_edge(edge)
+
+    def write_edges(self, rel_type: str) -> None:
+        rows = self.edge_batches.pop(rel_type, [])
+        if rows:
+            self.client._write_batch(self.session, self.client.edge_create_query(rel_type, self.client.project_id), rows)
+            self.edges_written += len(rows)
+
+    def finish(self) -> None:
+        """Write the remaining nodes, resolve the deferred calls and write the remaining edges."""
+        for label in list(self.node_batches):
+            self.write_nodes(label)
+
+        hierarchy = ClassHierarchy(self.class_skeletons, defined_ids=self.committed)
+        self.seen_edges = {(caller, target, "CALL")
+                           for caller, targets in self.deferred_call_targets.items() for target in targets}
+        for call in self.deferred_calls:
+            candidate_id = call.get("candidate_id")
+            method_id = hierarchy.resolve_method(call["self_class"], call["attr"],
+                                                 skip_class=call.get("super", False))
+            if method_id and method_id != candidate_id:
+                self.pipeline.builder.stats["mro_resolved_calls"] += 1
+            self.add_edge(call.get("caller_id"), method_id or candidate_id, "CALL")
+
+        for rel_type in list(self.edge_batches):
+            self.write_edges(rel_type)
+        # Edges still waiting point to files that could not be parsed
+        self.edges_dropped += sum(len(edges) for edges in self.waiting.values())
+        if self.edges_dropped:
+            logger.debug(f"{self.edges_dropped} edges to nodes outside the project definitions were dropped.")
+
+
+def stream_graph_to_neo4j(project_root: str,
+                          jobs: int = 1,
+                          cache_dir: Optional[str] = None,
+                          call_resolution: str = "internal",
+                          call_resolver: str = "static",
+                          embed: bool = True,
+                          project_id: Optional[str] = None) -> Dict[str, StageThroughput]:
+    """
+    Build the graph of a project and load it into Neo4j with the streaming pipeline.
+
+    Args:
+        project_root (str): Root folder of the project.
+        jobs (int): Number of worker processes used to parse files.
+        cache_dir (Optional[str]): Directory of the persistent parse cache, if any.
+        call_resolution (str): Call resolution mode, "all" or "internal".
+        call_resolver (str): Call resolver backend, "jedi" or "static".
+        embed (bool): Create the vector index and the embeddings while loading.
+        project_id (Optional[str]): Project stored on every node, whose previous graph is replaced.
+
+    Returns:
+        Dict[str, StageThroughput]: Throughput of each stage.
+    """
+    client = Neo4jClient(uri=config.get("NEO4J_URI"),
+                         user=config.get("NEO4J_USER"),
+                         password=config.get("NEO4J_PASSWORD"),
+                         batch_size=config.get("NEO4J_BATCH_SIZE", 1000),
+                         project_id=project_id)
+    # The same provider embeds the queries, see RouterChat
+    provider = get_embedding_provider(provider=config.get("EMBEDDING_PROVIDER"),
+                                      api_key=config.get("OPENAI_API_KEY"),
+                                      model=config.get("EMBEDDING_MODEL"),
+                                      endpoint=config.get("EMBEDDING_ENDPOINT"),
+                                      dimensions=config.get("EMBEDDING_DIMENSIONS")) if embed else None
+    try:
+        pipeline = StreamingPipeline(project_root,
+                                     client=client,
+                                     provider=provider,
+                                     jobs=jobs,
+                                     cache_dir=cache_dir,
+                                     call_resolution=call_resolution,
+                                     call_resolver=call_resolver,
+                                     embedding_property=config.get("VECTOR_EMBEDDING_PROPERTY"),
+                                     queue_size=config.get("STREAMING_QUEUE_SIZE", 64),
+                                     embedding_batch_size=config.get("EMBEDDING_BATCH_SIZE", 100),
+                                     embedding_concurrency=config.get("EMBEDDING_CONCURRENCY", 4),
+                                     embedding_cache_path=config.get("EMBEDDING_CACHE_PATH"))
+        return pipeline.run()
+    finally:
+        client.close()
@@ -0,0 +1,9 @@
+from .providers import (
+    EmbeddingProvider,
+    OpenAIEmbeddingProvider,
+    HashingEmbeddingProvider,
+    get_embedding_provider,
+    truncate_embedding
+)
+from .cache import EmbeddingCache
+from .pipeline import embed_in_batches
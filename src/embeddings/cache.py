@@ -0,0 +1,115 @@
+import hashlib
+import sqlite3
+from array import array
+from pathlib import Path
+from typing import List, Optional, Tuple
+from src.utils.config import logger
+
+# SQLite limits the number of bound variables per statement
+_MAX_QUERY_VARIABLES = 500
+# Version of the cache schema, stored in the `user_version` pragma of the file
+_SCHEMA_VERSION = 1
+
+
+def count_tokens(texts: List[str]) -> int:
+    """
+    Count the tokens of the texts with the OpenAI tokenizer, or estimate them
+    from their length if the tokenizer is not available.
+    """
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("cl100k_base")
+        return sum(len(tokens) for tokens in encoding.encode_batch(texts))
+    except Exception:
+        return sum(len(text) for text in texts) // 4
+
+
+class EmbeddingCache:
+    """
+    Persistent cache of embedding vectors keyed by (provider fingerprint, dimensions,
+    sha256(text)). The fingerprint identifies the provider backend, model and, for
+    the OpenAI provider, the endpoint, so vectors of a proxy or stub server are
+    never served for the real API and vice versa.
+
+    Vectors are stored as float32 blobs in a single SQLite file, so identical code
+    is only embedded once across rebuilds and across projects sharing the file.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(self.path))
+        self._migrate()
+        self.hits = 0
+        self.misses = 0
+        self.tokens_saved = 0
+
+    def _migrate(self) -> None:
+        """Bring a cache file created by an older version to the current schema, once."""
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version >= _SCHEMA_VERSION:
+            return
+        if version < 1:
+            # Entries of the former table were keyed by model name only and cannot be
+            # attributed to a provider and endpoint
+            self.connection.execute("DROP TABLE IF EXISTS embeddings")
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS embedding_vectors (
+                    provider TEXT NOT NULL,
+                    dimensions INTEGER NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    PRIMARY KEY (provider, dimensions, text_hash)
+                )
+            """)
+        self.connection.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+        self.connection.commit()
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, provider: str, dimensions: int, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Look up the vectors of the texts embedded by the provider with the given
+        fingerprint, returning None for the ones not cached.
+        """
+        hashes = [self.text_hash(text) for text in texts]
+        found = {}
+        for i in range(0, len(hashes), _MAX_QUERY_VARIABLES):
+            chunk = hashes[i:i + _MAX_QUERY_VARIABLES]
+            rows = self.connection.execute(
+                f"SELECT text_hash, vector FROM embedding_vectors WHERE provider = ? AND dimensions = ? "
+                f"AND text_hash IN ({', '.join('?' * len(chunk))})",
+                [provider, dimensions, *chunk]
+            )
+            for text_hash, blob in rows:
+                found[text_hash] = array("f", blob).tolist()
+
+        vectors = [found.get(text_hash) for text_hash in hashes]
+        hit_texts = [text for text, vector in zip(texts, vectors) if vector is not None]
+        self.hits += len(hit_texts)
+        self.misses += len(texts) - len(hit_texts)
+        if hit_texts:
+            self.tokens_saved += count_tokens(hit_texts)
+        return vectors
+
+    def put_many(self, provider: str, dimensions: int, items: List[Tuple[str, List[float]]]) -> None:
+        """
+        Store (text, vector) pairs in the cache.
+        """
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO embedding_vectors (provider, dimensions, text_hash, vector) VALUES (?, ?, ?, ?)",
+            [(provider, dimensions, self.text_hash(text), array("f", vector).tobytes()) for text, vector in items]
+        )
+        self.connection.commit()
+
+    def report(self) -> str:
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups if lookups else 0.0
+        return (f"Embedding cache: {self.hits}/{lookups} hits ({hit_rate:.1%}), "
+                f"{self.tokens_saved} tokens saved.")
+
+    def close(self) -> None:
+        logger.info(self.report())
+        self.connection.close()
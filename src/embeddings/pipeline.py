@@ -0,0 +1,93 @@
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Tuple
+from src.utils.config import logger
+from src.embeddings.cache import EmbeddingCache
+from src.embeddings.providers import EmbeddingProvider
+
+
+def _chunked(iterable: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def embed_in_batches(pairs: Iterable[Tuple[str, str]], 
+                     provider: EmbeddingProvider, 
+                     batch_size: int = 100, 
+                     max_concurrency: int = 4,
+                     cache: Optional[EmbeddingCache] = None) -> Iterator[List[Tuple[str, List[float]]]]:
+    """
+    Embed a stream of (id, text) pairs in multi-input batches.
+
+    At most `max_concurrency` batches are requested at the same time, which also
+    bounds how much of the input stream is held in memory. Embedded batches are
+    yielded in input order as (id, vector) pairs. Batches whose request fails are
+    logged and skipped, so their nodes can be embedded in a later run. When a
+    cache is given, it is consulted first and only the misses are requested.
+
+    Args:
+        pairs (Iterable[Tuple[str, str]]): Stream of (id, text) pairs.
+        provider (EmbeddingProvider): Embedding provider.
+        batch_size (int): Number of texts per request.
+        max_concurrency (int): Maximum number of requests in flight.
+        cache (Optional[EmbeddingCache]): Persistent embedding cache.
+
+    Yields:
+        List[Tuple[str, List[float]]]: Embedded (id, vector) pairs of one batch.
+    """
+    start = time.time()
+    embedded, failed = 0, 0
+    fingerprint, dimensions = provider.fingerprint, provider.dimensions
+
+    def collect(batch, cached_vectors, future):
+        nonlocal embedded, failed
+        try:
+            new_vectors = iter(future.result())
+        except Exception as e:
+            logger.error(f"Error embedding batch of {len(batch)} texts: {e}")
+            failed += len(batch)
+            return None
+
+        vectors, new_items = [], []
+        for (_, text), vector in zip(batch, cached_vectors):
+            if vector is None:
+                vector = next(new_vectors)
+                new_items.append((text, vector))
+            vectors.append(vector)
+        if cache is not None and new_items:
+            cache.put_many(fingerprint, dimensions, new_items)
+
+        embedded += len(batch)
+        return [(node_id, vector) for (node_id, _), vector in zip(batch, vectors)]
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        in_flight = deque()
+        for batch in _chunked(pairs, batch_size):
+            texts = [text for _, text in batch]
+            cached_vectors = cache.get_many(fingerprint, dimensions, texts) if cache is not None else [None] * len(texts)
+            missing_texts = [text for text, vector in zip(texts, cached_vectors) if vector is None]
+
+            if missing_texts:
+                future = executor.submit(provider.embed_documents, missing_texts)
+            else:
+                future = Future()
+                future.set_result([])
+            in_flight.append((batch, cached_vectors, future))
+
+            if len(in_flight) >= max_concurrency:
+                result = collect(*in_flight.popleft())
+                if result:
+                    yield result
+
+        while in_flight:
+            result = collect(*in_flight.popleft())
+            if result:
+                yield result
+
+    elapsed = time.time() - start
+    logger.info(f"Embedded {embedded} texts in {elapsed:.2f}s ({embedded / max(elapsed, 1e-9):.0f} texts/s), {failed} failed.")
+    if cache is not None:
+        logger.info(cache.report())
@@ -0,0 +1,184 @@
+import hashlib
+import math
+import re
+from collections import Counter
+from typing import List, Optional
+from langchain_core.embeddings import Embeddings
+from openai import OpenAI
+
+# Native output dimensions of the OpenAI embedding models
+OPENAI_MODEL_DIMENSIONS = {
+    "text-embedding-ada-002": 1536,
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+}
+
+# Models accepting the `dimensions` request parameter to return shortened vectors
+OPENAI_MODELS_WITH_DIMENSIONS = ("text-embedding-3-small", "text-embedding-3-large")
+
+_IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+_SUBTOKEN_PATTERN = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+
+class EmbeddingProvider(Embeddings):
+    """
+    Base class of the embedding providers.
+
+    The same provider must be used to index the code graph and to embed the
+    queries against it, and the vector index dimension is taken from it.
+    Providers are LangChain `Embeddings`, so they can be handed to LangChain
+    vector stores directly.
+    """
+
+    name: str = ""
+    model: str = ""
+    dimensions: int = 0
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        Identity of the vectors produced by the provider, used to key the embedding cache.
+        """
+        return f"{self.name}:{self.model}"
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed a batch of texts.
+        """
+        raise NotImplementedError
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def truncate_embedding(vector: List[float], dimensions: int) -> List[float]:
+    """
+    Keep the first `dimensions` components of a vector and L2-normalize them
+    (Matryoshka truncation).
+    """
+    vector = vector[:dimensions]
+    norm = math.sqrt(sum(value * value for value in vector))
+    return [value / norm for value in vector] if norm else vector
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """
+    Embedding provider for the OpenAI embeddings endpoint, or any endpoint
+    implementing the same API (e.g. a proxy or a local stub server).
+
+    Reduced-dimension vectors are requested through the `dimensions` parameter
+    for the models supporting it, and obtained by Matryoshka truncation for the
+    others. Truncation is only lossless enough for models trained for it.
+    """
+
+    name = "openai"
+
+    def __init__(self,
+                 api_key: str,
+                 model: str = "text-embedding-ada-002",
+                 endpoint: str = "https://api.openai.com/v1",
+                 dimensions: Optional[int] = None,
+                 max_retries: int = 3,
+                 timeout: float = 60):
+        self.model = model
+        self.endpoint = endpoint
+        self.target_dimensions = dimensions
+        self.client = OpenAI(api_key=api_key, base_url=endpoint, max_retries=max_retries, timeout=timeout)
+        self._dimensions = dimensions or OPENAI_MODEL_DIMENSIONS.get(model)
+
+    @property
+    def fingerprint(self) -> str:
+        # A proxy or stub server may return different vectors for the same model name
+        return f"{self.name}:{self.model}@{self.endpoint}"
+
+    @property
+    def dimensions(self) -> int:
+        # Unknown models are probed once to find out their output dimension
+        if self._dimensions is None:
+            self._dimensions = len(self.embed_query("dimension probe"))
+        return self._dimensions
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed a batch of texts with a single multi-input request.
+        """
+        if self.target_dimensions and self.model in OPENAI_MODELS_WITH_DIMENSIONS:
+            response = self.client.embeddings.create(model=self.model, input=texts, dimensions=self.target_dimensions)
+        else:
+            response = self.client.embeddings.create(model=self.model, input=texts)
+
+        vectors = [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+        if self.target_dimensions:
+            vectors = [truncate_embedding(vector, self.target_dimensions) if len(vector) > self.target_dimensions
+                       else vector for vector in vectors]
+        return vectors
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """
+    In-process CPU embedding provider based on feature hashing.
+
+    Texts are split into identifiers and their camelCase/snake_case subtokens,
+    which are hashed into a fixed number of signed buckets with log-scaled term
+    frequencies and L2-normalized. It needs no network access and has no
+    per-token cost, at the price of capturing lexical rather than semantic similarity.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dimensions: int = 512):
+        self.model = "hashing-v1"
+        self.dimensions = dimensions
+
+    @staticmethod
+    def _tokenize(text: str) -> List[str]:
+        tokens = []
+        for identifier in _IDENTIFIER_PATTERN.findall(text):
+            identifier_lower = identifier.lower()
+            tokens.append(identifier_lower)
+            subtokens = [subtoken.lower() for subtoken in _SUBTOKEN_PATTERN.findall(identifier)]
+            if len(subtokens) > 1:
+                tokens.extend(subtokens)
+        return tokens
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        for token, count in Counter(self._tokenize(text)).items():
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+            sign = 1.0 if digest[4] & 1 else -1.0
+            vector[bucket] += sign * (1.0 + math.log(count))
+
+        norm = math.sqrt(sum(value * value for value in vector))
+        return [value / norm for value in vector] if norm else vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+
+def get_embedding_provider(provider: str = "openai",
+                           api_key: Optional[str] = None,
+                           model: Optional[str] = None,
+                           endpoint: Optional[str] = None,
+                           dimensions: Optional[int] = None) -> EmbeddingProvider:
+    """
+    Create the embedding provider selected in the configuration.
+
+    Args:
+        provider (str): Provider name, "openai" or "hashing".
+        api_key (Optional[str]): API key of the OpenAI provider.
+        model (Optional[str]): Model of the OpenAI provider.
+        endpoint (Optional[str]): Endpoint of the OpenAI provider.
+        dimensions (Optional[int]): Target vector dimension, the provider default if None.
+
+    Returns:
+        EmbeddingProvider: The embedding provider.
+    """
+    if provider == "openai":
+        return OpenAIEmbeddingProvider(api_key=api_key,
+                                       model=model or "text-embedding-ada-002",
+                                       endpoint=endpoint or "https://api.openai.com/v1",
+                                       dimensions=dimensions)
+    if provider == "hashing":
+        return HashingEmbeddingProvider(dimensions=dimensions or 512)
+    raise ValueError(f"Unknown embedding provider: {provider}")
@@ -0,0 +1,94 @@
+from typing import Collection, Dict, List, Optional
+from src.utils.config.logger_config import logger
+from src.utils.code_parsing import DefinitionRecord
+
+
+class ClassHierarchy:
+    """
+    Project-wide class hierarchy built from the `inherits_from` data of the definitions.
+
+    The method resolution order (C3 linearization) of each class is computed once
+    and cached, so `self.`, `cls.` and `super()` calls are resolved to the class
+    that actually defines the method with dictionary lookups. Bases outside the
+    project are unknown and end the MRO.
+
+    Only the class records are read from `definitions`. Methods are looked up in
+    `defined_ids` when given, so callers may keep the class records alone.
+    """
+
+    def __init__(self, definitions: Dict[str, DefinitionRecord], defined_ids: Optional[Collection[str]] = None):
+        self.definitions = definitions
+        self.defined_ids = defined_ids if defined_ids is not None else definitions
+        self.bases: Dict[str, List[str]] = {}
+        for def_id, record in definitions.items():
+            if record.type != 'class':
+                continue
+            # inherits_from also holds the unresolved base names, only project classes are kept
+            project_bases = [base for base in record.inherits_from
+                             if base != def_id and base in definitions and definitions[base].type == 'class']
+            self.bases[def_id] = list(dict.fromkeys(project_bases))
+        self._mro: Dict[str, List[str]] = {}
+
+    def mro(self, class_id: str) -> List[str]:
+        """
+        Return the linearized method resolution order of a class, the class included.
+        """
+        if class_id not in self._mro:
+            self._mro[class_id] = self._linearize(class_id, visiting=set())
+        return self._mro[class_id]
+
+    def _linearize(self, class_id: str, visiting: set) -> List[str]:
+        if class_id in self._mro:
+            return self._mro[class_id]
+        if class_id in visiting:
+            logger.warning(f"Inheritance cycle found at {class_id}")
+            return [class_id]
+
+        visiting.add(class_id)
+        bases = self.bases.get(class_id, [])
+        # In a cycle, the MRO of a base leads back to the class, which is only kept first
+        sequences = [[cls for cls in self._linearize(base, visiting) if cls != class_id] for base in bases]
+        sequences.append(list(bases))
+        visiting.discard(class_id)
+
+        result = [class_id]
+        while True:
+            sequences = [sequence for sequence in sequences if sequence]
+            if not sequences:
+                break
+            for sequence in sequences:
+                head = sequence[0]
+                if not any(head in other[1:] for other in sequences):
+                    break
+            else:
+                # Inconsistent hierarchy, fall back to depth-first order of the remaining bases
+                logger.warning(f"Inconsistent method resolution order for {class_id}")
+                for sequence in sequences:
+                    result.extend(base for base in sequence if base not in result)
+                break
+            result.append(head)
+            for sequence in sequences:
+                if sequence[0] == head:
+                    del sequence[0]
+
+        self._mro[class_id] = result
+        return result
+
+    def resolve_method(self, class_id: str, attribute: str, skip_class: bool = False) -> Optional[str]:
+        """
+        Find the definition of a method as looked up on an instance of `class_id`.
+
+        Args:
+            class_id (str): Full name of the class of `self` or `cls`.
+            attribute (str): Name of the method.
+            skip_class (bool): Start the lookup after the class itself, as `super()` does.
+
+        Returns:
+            Optional[str]: Full name of the method definition, or None if no project class defines it.
+        """
+        classes = self.mro(class_id)
+        for candidate_class in classes[1:] if skip_class else classes:
+            method_id = f"{candidate_class}.{attribute}"
+            if method_id in self.defined_ids:
+                return method_id
+        return None
@@ -0,0 +1,195 @@
+import sys
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import networkx as nx
+from src.utils.code_parsing import DefinitionRecord
+
+NODE_TYPES = ("class", "function", "method")
+RELATIONS = ("nested_in", "call", "inherits_from")
+
+
+class CompactGraph:
+    """
+    Array-backed store of the code graph, for projects too large for a networkx DiGraph.
+
+    Nodes are numbered in insertion order and their dotted ids are kept once in an
+    intern table. Node attributes are stored by column: integer attributes (type,
+    line, file, parent) in `array` columns and text attributes in plain lists of
+    shared strings. The edges of each relation are stored as CSR adjacency arrays:
+    the targets of node `i` are `targets[offsets[i]:offsets[i + 1]]`.
+
+    Unlike a DiGraph, the same pair of nodes may be linked by several relations,
+    e.g. a method that instantiates its own class is both nested in and calls it.
+    """
+
+    def __init__(self):
+        self.names: List[str] = []
+        self._index: Optional[Dict[str, int]] = {}
+        self.file_names: List[str] = []
+        self._file_index: Dict[str, int] = {}
+
+        self.types = array("B")
+        self.lines = array("l")
+        self.files = array("l")
+        self.parents = array("l")
+        self.display_names: List[str] = []
+        self.codes: List[str] = []
+        self.docstrings: List[str] = []
+        self.inherits_from: List[List[str]] = []
+
+        self.adjacency: Dict[str, Tuple[array, array]] = {}
+
+    @classmethod
+    def from_records(cls,
+                     definitions: Dict[str, DefinitionRecord],
+                     edges: Iterable[Tuple[str, str, str]]) -> "CompactGraph":
+        """
+        Build the graph from the definition records and the (source, target, relation) edges of a build.
+        Edges whose endpoints are not definitions are ignored, duplicated edges are kept once.
+        """
+        graph = cls()
+        for record in definitions.values():
+            graph._add_node(record)
+        for i, record in enumerate(definitions.values()):
+            graph.parents[i] = graph.index.get(record.parent_id, -1) if record.parent_id else -1
+
+        pairs: Dict[str, Dict[Tuple[int, int], None]] = {relation: {} for relation in RELATIONS}
+        for source, target, relation in edges:
+            source_index = graph.index.get(source)
+            target_index = graph.index.get(target)
+            if source_index is not None and target_index is not None:
+                pairs.setdefault(relation, {})[(source_index, target_index)] = None
+
+        for relation, relation_pairs in pairs.items():
+            graph.adjacency[relation] = graph._to_csr(relation_pairs)
+        return graph
+
+    def _add_node(self, record: DefinitionRecord) -> None:
+        node_index = len(self.names)
+        name = sys.intern(record.id)
+        self.names.append(name)
+        self._index[name] = node_index
+
+        file_index = self._file_index.get(record.file)
+        if file_index is None:
+            file_index = self._file_index[record.file] = len(self.file_names)
+            self.file_names.append(sys.intern(record.file))
+
+        self.types.append(NODE_TYPES.index(record.type))
+        self.lines.append(record.line)
+        self.files.append(file_index)
+        self.parents.append(-1)
+        self.display_names.append(record.name)
+        self.codes.append(record.code)
+        self.docstrings.append(record.docstring)
+        self.inherits_from.append(record.inherits_from)
+
+    def _to_csr(self, pairs: Iterable[Tuple[int, int]]) -> Tuple[array, array]:
+        """Pack (source, target) index pairs into CSR offsets and targets, keeping the order of each source."""
+        counts = array("l", [0]) * (len(self.names) + 1)
+        pairs = list(pairs)
+        for source, _ in pairs:
+            counts[source + 1] += 1
+        for i in range(len(self.names)):
+            counts[i + 1] += counts[i]
+
+        offsets = array("l", counts)
+        targets = array("l", [0]) * len(pairs)
+        for source, target in pairs:
+            targets[counts[source]] = target
+            counts[source] += 1
+        return offsets, targets
+
+    @property
+    def index(self) -> Dict[str, int]:
+        """Intern table from node id to node index, built on first use for loaded graphs."""
+        if self._index is None:
+            self._index = {name: node_index for node_index, name in enumerate(self.names)}
+        return self._index
+
+    def number_of_nodes(self) -> int:
+        return len(self.names)
+
+    def number_of_edges(self, relation: Optional[str] = None) -> int:
+        relations = [relation] if relation else self.adjacency.keys()
+        return sum(len(self.adjacency[name][1]) for name in relations if name in self.adjacency)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def node_attributes(self, node_index: int) -> Dict:
+        """Return the attributes of a node as the dictionary stored by the networkx graph."""
+        parent = self.parents[node_index]
+        return {
+            'id': self.names[node_index],
+            'name': self.display_names[node_index],
+            'type': NODE_TYPES[self.types[node_index]],
+            'file': self.file_names[self.files[node_index]],
+            'line': self.lines[node_index],
+            'code': self.codes[node_index],
+            'docstring': self.docstrings[node_index],
+            'inherits_from': self.inherits_from[node_index],
+            'parent_id': self.names[parent] if parent >= 0 else None
+        }
+
+    def successors(self, name: str, relation: str) -> List[str]:
+        """Return the ids of the nodes linked from node `name` by `relation`."""
+        offsets, targets = self.adjacency.get(relation, (None, None))
+        node_index = self.index.get(name)
+        if offsets is None or node_index is None:
+            return []
+        return [self.names[target] for target in targets[offsets[node_index]:offsets[node_index + 1]]]
+
+    def edges(self, relation: Optional[str] = None) -> Iterator[Tuple[str, str, str]]:
+        """Iterate the (source, target, relation) edges, grouped by relation and sorted by source."""
+        for relation_name in [relation] if relation else list(self.adjacency):
+            offsets, targets = self.adjacency.get(relation_name, (array("l", [0]), array("l")))
+            for source in range(len(offsets) - 1):
+                for position in range(offsets[source], offsets[source + 1]):
+                    yield self.names[source], self.names[targets[position]], relation_name
+
+    def node_rows(self, node_type: str, properties: Sequence[str]) -> Iterator[Dict]:
+        """
+        Stream the `properties` and id of every node of a type, read straight from the columns.
+        """
+        type_code = NODE_TYPES.index(node_type)
+        columns = {
+            'name': self.display_names,
+            'code': self.codes,
+            'docstring': self.docstrings,
+            'line': self.lines,
+        }
+        for node_index, node_type_code in enumerate(self.types):
+            if node_type_code != type_code:
+                continue
+            row = {}
+            for key in properties:
+                if key == 'file':
+                    row[key] = self.file_names[self.files[node_index]]
+                elif key == 'type':
+                    row[key] = node_type
+                else:
+                    row[key] = columns[key][node_index]
+            row['id'] = self.names[node_index]
+            yield row
+
+    def edge_rows(self, relation: str) -> Iterator[Dict]:
+        """Stream the edges of a relation as {"source", "target"} rows."""
+        for source, target, _ in self.edges(relation):
+            yield {"source": source, "target": target}
+
+    def to_networkx(self) -> nx.DiGraph:
+        """
+        Export the graph as the networkx DiGraph built by `GraphBuilder`. A pair of nodes
+        linked by several relations keeps the last one, in `RELATIONS` order.
+        """
+        graph = nx.DiGraph()
+        for node_index, name in enumerate(self.names):
+            graph.add_node(name, **self.node_attributes(node_index))
+        for relation in RELATIONS:
+            for source, target, _ in self.edges(relation):
+                graph.add_edge(source, target, relation=relation)
+        return graph
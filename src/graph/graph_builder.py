@@ -1,58 +1,346 @@
+import os
 import networkx as nx 
 import jedi
-from typing import List, Dict, Tuple
-# from joblib import Parallel, delayed
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from pathlib import Path
+from typing import Callable, List, Dict, FrozenSet, Iterator, Optional, Tuple
 from src.utils.config.logger_config import logger
+from src.utils.call_resolvers import ProjectSymbolTable, apply_jedi_build_settings, jedi_build_settings
 from src.utils.code_parsing import (
+    CALL_RESOLUTION_MODES,
+    CALL_RESOLVERS,
+    DefinitionRecord,
+    build_symbol_table,
     find_python_files,
+    find_project_packages,
     parse_source,
     get_definitions_relationships
 )
+from src.graph.class_hierarchy import ClassHierarchy
+from src.graph.compact_graph import CompactGraph
+from src.graph.parse_cache import ParseCache, compute_cache_keys
+
+# "networkx" builds a networkx DiGraph, "compact" the array-backed CompactGraph
+GRAPH_FORMATS = ("networkx", "compact")
+
+
+class BuildInterrupted(Exception):
+    """
+    Raised when a build is stopped before every file is parsed. The files parsed
+    so far are kept in the parse cache, so the next build only parses the rest.
+    """
+
+    def __init__(self, parsed: int, total: int):
+        super().__init__(f"Build interrupted after parsing {parsed} of {total} files")
+        self.parsed = parsed
+        self.total = total
+
+# Jedi project, project packages and symbol table owned by each worker process of the parsing pool
+_worker_project = None
+_worker_project_packages = None
+_worker_symbol_table = None
+
+
+def _init_worker(project_root: str, 
+                 project_packages: Optional[FrozenSet[str]], 
+                 symbol_table: Optional[ProjectSymbolTable]) -> None:
+    """
+    Initialize a parsing worker process with its own Jedi project and a copy of the symbol table.
+    """
+    global _worker_project, _worker_project_packages, _worker_symbol_table
+    # The process only parses files of the build, so the settings are not restored
+    apply_jedi_build_settings()
+    _worker_project = jedi.Project(project_root)
+    _worker_project_packages = project_packages
+    _worker_symbol_table = symbol_table
+
+
+def _process_file_worker(file_path: str) -> Tuple[Dict, List, Counter]:
+    """
+    Parse a single file inside a worker process.
+
+    Args:
+        file_path (str): Path to the file to be parsed.
+
+    Returns:
+        Tuple[Dict, List, Counter]: Picklable definition records, call records and resolution stats of the file.
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        source = f.read()
+    tree = parse_source(source, file_path)
+    stats = Counter()
+    defs, calls_list = get_definitions_relationships(
+        source=source,
+        tree=tree,
+        file_path=file_path,
+        project=_worker_project,
+        project_packages=_worker_project_packages,
+        symbol_table=_worker_symbol_table,
+        stats=stats
+    )
+    return defs, calls_list, stats
+
 
 class GraphBuilder:
-    def __init__(self, project_root):
+    def __init__(self, project_root, jobs: int = 1, cache_dir: Optional[str] = None,
+                 call_resolution: str = "internal", call_resolver: str = "static",
+                 graph_format: str = "networkx"):
+        if call_resolution not in CALL_RESOLUTION_MODES:
+            raise ValueError(f"Unknown call resolution mode: {call_resolution}")
+        if call_resolver not in CALL_RESOLVERS:
+            raise ValueError(f"Unknown call resolver: {call_resolver}")
+        if graph_format not in GRAPH_FORMATS:
+            raise ValueError(f"Unknown graph format: {graph_format}")
         self.project_root = project_root
         self.project = jedi.Project(project_root)
-        self.graph = nx.DiGraph()
-        self.definitions = {}
+        self.jobs = jobs if jobs and jobs > 0 else os.cpu_count()
+        self.call_resolution = call_resolution
+        self.call_resolver = call_resolver
+        project_packages = find_project_packages(project_root)
+        # Calls to other packages are only skipped in "internal" mode
+        self.project_packages = project_packages if call_resolution == "internal" else None
+        # Built once here and shared with the parsing workers
+        self.symbol_table = build_symbol_table(project_root, project_packages) if call_resolver == "static" else None
+        self.cache = ParseCache(cache_dir) if cache_dir else None
+        self.graph_format = graph_format
+        self.graph = nx.DiGraph() if graph_format == "networkx" else CompactGraph()
+        self.definitions: Dict[str, DefinitionRecord] = {}
         self.calls = []
+        self.failed_files = []
+        self.stats = Counter()
 
         
-    def build(self):
+    def build(self, should_stop: Optional[Callable[[], bool]] = None):
         """
         Build a call graph for all Python files under the project_root directory.
-        The graph is represented as a NetworkX directed graph (DiGraph):
+        The graph is represented as a NetworkX directed graph (DiGraph), or as a
+        `CompactGraph` with the "compact" graph format:
         - Nodes represent definitions (functions, methods, classes) with their properties.
         - Edges represent relationships:
             "nested": a definition declared inside another (e.g., method inside a class).
             "call": a function/method call from one definition to another.
         Returns the constructed graph.
+
+        `should_stop` is checked after each parsed file. When it returns True, the
+        build raises `BuildInterrupted`, and a later build with the same parse cache
+        resumes from the files that were not parsed yet.
         """
+        with jedi_build_settings():
+            return self._build(should_stop)
+
+    def _build(self, should_stop: Optional[Callable[[], bool]]):
         # Create nodes: Gather all definitions from all Python files
         logger.info(f"PROJECT ROOT: {self.project_root}")
 
-        # file_source_tuple_list = Parallel(n_jobs=-1)(delayed(self._read_file)(file_path) 
-        #                               for file_path in find_python_files(self.project_root))
+        file_paths = list(find_python_files(self.project_root))
+        results = self._load_cached_results(file_paths) if self.cache else {}
 
-        file_source_tuple_list = []
-        for file_path in find_python_files(self.project_root):
-            file_source_tuple_list.append(self._read_file(file_path=file_path))
-        
+        # Only files whose cache key changed need to be resolved again
+        pending_paths = [file_path for file_path in file_paths if file_path not in results]
+        for file_path, result in self._parse_files(pending_paths, should_stop=should_stop):
+            results[file_path] = result
 
-        for source, file_path in file_source_tuple_list:
-            defs, calls_list = self._process_file(source, file_path)
+        for file_path in file_paths:
+            if file_path not in results:
+                continue
+            defs, calls_list = results[file_path]
+            self.definitions.update(defs)
+            self.calls.extend(calls_list)
 
-            for def_id, info in defs.items():
-                self.definitions.update(defs)
-                self.graph.add_node(def_id, **info)
+        if self.failed_files:
+            logger.warning(f"{len(self.failed_files)} files could not be parsed and were skipped.")
 
-            self.calls.extend(calls_list)
-        
-        self._add_nested_edges()
-        self._add_call_edges()
-        self._add_inheritance_edges()
+        edges = [*self._nested_edges(), *self._call_edges(), *self._inheritance_edges()]
+        if self.graph_format == "compact":
+            self.graph = CompactGraph.from_records(self.definitions, edges)
+        else:
+            for def_id, record in self.definitions.items():
+                self.graph.add_node(def_id, **record.to_dict())
+            for source, target, relation in edges:
+                self.graph.add_edge(source, target, relation=relation)
 
+        logger.info(self.build_report())
         return self.graph
+
+    def build_report(self) -> str:
+        """
+        Summarize the build: graph size, parse cache usage and jedi goto calls made and avoided.
+        """
+        goto_calls = self.stats["goto_calls"]
+        goto_avoided = self.stats["goto_avoided"]
+        resolved_calls = goto_calls + goto_avoided
+        avoided_ratio = goto_avoided / resolved_calls if resolved_calls else 0.0
+
+        lines = [
+            f"Graph build report ({self.call_resolution} call resolution, {self.call_resolver} resolver, "
+            f"{self.graph_format} graph):",
+            f"  nodes: {self.graph.number_of_nodes()}, edges: {self.graph.number_of_edges()}, "
+            f"failed files: {len(self.failed_files)}",
+            f"  jedi goto calls: {goto_calls}, avoided: {goto_avoided} ({avoided_ratio:.1%}), "
+            f"jedi scripts: {self.stats['jedi_scripts']}",
+        ]
+        lines.append(f"  self/cls/super calls: {self.stats['method_calls']}, "
+                     f"resolved through base classes: {self.stats['mro_resolved_calls']}")
+        memo_lookups = self.stats["memo_hits"] + self.stats["memo_misses"]
+        if memo_lookups:
+            lines.append(f"  call memo hits: {self.stats['memo_hits']}/{memo_lookups} "
+                         f"({self.stats['memo_hits'] / memo_lookups:.1%})")
+        if self.symbol_table is not None:
+            lines.append(f"  statically resolved calls: {self.stats['static_resolved']}, "
+                         f"jedi fallbacks: {self.stats['static_fallbacks']}")
+        if self.cache:
+            lines.append(f"  parse cache hits: {self.stats['parse_cache_hits']}, "
+                         f"misses: {self.stats['parse_cache_misses']}")
+        return "\n".join(lines)
+
+    def stream_results(self, max_in_flight: Optional[int] = None) -> Iterator[Tuple[Path, Tuple[Dict, List]]]:
+        """
+        Yield the definitions and calls of every file as soon as they are available,
+        for consumers that ingest files while the rest of the project is parsed.
+
+        Cached results come first, then parsed files in completion order. With a
+        pool of workers, at most `max_in_flight` files (twice the number of jobs by
+        default) are submitted ahead of the consumer, so a slow consumer holds the
+        parsing back instead of letting results pile up. Unlike `build`, the
+        definitions and calls are not kept on the builder.
+
+        Yields:
+            Tuple[Path, Tuple[Dict, List]]: File path and its (definition records, call records).
+        """
+        with jedi_build_settings():
+            yield from self._stream_results(max_in_flight)
+
+    def _stream_results(self, max_in_flight: Optional[int]) -> Iterator[Tuple[Path, Tuple[Dict, List]]]:
+        logger.info(f"PROJECT ROOT: {self.project_root}")
+        file_paths = list(find_python_files(self.project_root))
+        pending_paths = file_paths
+        if self.cache:
+            self._compute_cache_keys(file_paths)
+            pending_paths = []
+            for file_path in file_paths:
+                cached = self.cache.get(self._cache_keys[file_path])
+                if cached is None:
+                    pending_paths.append(file_path)
+                    continue
+                self.stats["parse_cache_hits"] += 1
+                yield file_path, cached
+            self.stats["parse_cache_misses"] += len(pending_paths)
+
+        if self.jobs == 1 or len(pending_paths) <= 1:
+            yield from self._parse_files(pending_paths)
+            return
+
+        max_in_flight = max_in_flight or 2 * self.jobs
+        queued_paths = iter(sorted(pending_paths, key=lambda path: os.path.getsize(path), reverse=True))
+        logger.info(f"Streaming {len(pending_paths)} files from {self.jobs} worker processes.")
+        with ProcessPoolExecutor(max_workers=self.jobs,
+                                 initializer=_init_worker,
+                                 initargs=(str(self.project_root),
+                                           self.project_packages,
+                                           self.symbol_table)) as executor:
+            futures = {}
+            while True:
+                while len(futures) < max_in_flight and (file_path := next(queued_paths, None)) is not None:
+                    futures[executor.submit(_process_file_worker, str(file_path))] = file_path
+                if not futures:
+                    break
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    file_path = futures.pop(future)
+                    try:
+                        defs, calls_list, file_stats = future.result()
+                    except Exception as e:
+                        logger.error(f"Error processing {file_path}: {e}")
+                        self.failed_files.append(str(file_path))
+                        continue
+                    self.stats.update(file_stats)
+                    self._cache_result(file_path, (defs, calls_list))
+                    yield file_path, (defs, calls_list)
+
+    def _compute_cache_keys(self, file_paths: List[Path]) -> None:
+        self._cache_keys = compute_cache_keys(file_paths, self.project_root,
+                                              settings=f"call_resolution={self.call_resolution};"
+                                                       f"call_resolver={self.call_resolver}")
+
+    def _load_cached_results(self, file_paths: List[Path]) -> Dict[Path, Tuple[Dict, List]]:
+        """
+        Compute the cache key of every file and load the results of unchanged files.
+        """
+        self._compute_cache_keys(file_paths)
+
+        results = {}
+        for file_path in file_paths:
+            cached = self.cache.get(self._cache_keys[file_path])
+            if cached is not None:
+                results[file_path] = cached
+
+        self.stats["parse_cache_hits"] += len(results)
+        self.stats["parse_cache_misses"] += len(file_paths) - len(results)
+        logger.info(f"Parse cache: {len(results)} hits, {len(file_paths) - len(results)} misses.")
+        return results
+
+    def _cache_result(self, file_path: Path, result: Tuple[Dict, List]) -> None:
+        # Stored as soon as a file is parsed, so an interrupted build keeps its progress
+        if self.cache:
+            self.cache.put(self._cache_keys[file_path], *result)
+
+    def _parse_files(self, file_paths: List[Path],
+                     should_stop: Optional[Callable[[], bool]] = None) -> Iterator[Tuple[Path, Tuple[Dict, List]]]:
+        """
+        Parse the given files, serially or in a pool of worker processes.
+
+        Results are yielded together with their file path in the order of `file_paths`
+        regardless of the order in which workers finish, so the resulting graph is
+        deterministic. Files that fail to be read or parsed are logged, recorded in
+        `failed_files` and skipped.
+        """
+        if self.jobs == 1 or len(file_paths) <= 1:
+            for parsed, file_path in enumerate(file_paths):
+                # At least one file is parsed per build, so an interrupted build always makes progress
+                if parsed and should_stop is not None and should_stop():
+                    raise BuildInterrupted(parsed, len(file_paths))
+                try:
+                    source, _ = self._read_file(file_path=file_path)
+                    defs, calls_list, file_stats = self._process_file(source, file_path)
+                    self.stats.update(file_stats)
+                    self._cache_result(file_path, (defs, calls_list))
+                    yield file_path, (defs, calls_list)
+                except Exception as e:
+                    logger.error(f"Error processing {file_path}: {e}")
+                    self.failed_files.append(str(file_path))
+            return
+
+        # Largest files first, so long jedi resolutions do not end up last in the queue
+        scheduled_paths = sorted(file_paths, key=lambda path: os.path.getsize(path), reverse=True)
+        results = {}
+
+        logger.info(f"Parsing {len(file_paths)} files with {self.jobs} worker processes.")
+        with ProcessPoolExecutor(max_workers=self.jobs,
+                                 initializer=_init_worker,
+                                 initargs=(str(self.project_root), 
+                                           self.project_packages, 
+                                           self.symbol_table)) as executor:
+            futures = {executor.submit(_process_file_worker, str(file_path)): file_path
+                       for file_path in scheduled_paths}
+
+            for completed, future in enumerate(as_completed(futures), start=1):
+                file_path = futures[future]
+                try:
+                    defs, calls_list, file_stats = future.result()
+                    self.stats.update(file_stats)
+                    results[file_path] = (defs, calls_list)
+                    self._cache_result(file_path, results[file_path])
+                except Exception as e:
+                    logger.error(f"Error processing {file_path}: {e}")
+                    self.failed_files.append(str(file_path))
+                if completed < len(file_paths) and should_stop is not None and should_stop():
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    raise BuildInterrupted(len(results), len(file_paths))
+
+        for file_path in file_paths:
+            if file_path in results:
+                yield file_path, results[file_path]
     
     def _read_file(self, file_path: str) -> Tuple[str, str]:
         """
@@ -62,47 +350,54 @@ class GraphBuilder:
             file_path (str): Path to the file to be read.
 
         Returns:
-            Dict[str, str]: A dictionary with the file path as key and file content as value.
+            Tuple[str, str]: The file content and the file path.
         """
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read(), file_path
-        except Exception as e:
-            logger.error(f"Error reading {file_path}: {e}")
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return f.read(), file_path
         
         
     def _process_file(self, source, file_path) -> Tuple:
         """
-        Process a single file, returning definitions and calls.
+        Process a single file, returning definitions, calls and call resolution stats.
         """
         tree = parse_source(source, str(file_path))
+        stats = Counter()
         defs, calls_list = get_definitions_relationships(
             source=source, 
             tree=tree, 
             file_path=str(file_path), 
-            project=self.project
+            project=self.project,
+            project_packages=self.project_packages,
+            symbol_table=self.symbol_table,
+            stats=stats
         )
-        return defs, calls_list
+        return defs, calls_list, stats
     
    
 
-    def _add_nested_edges(self):
-        for def_id, info in self.definitions.items():
-            parent_id = info.get('parent_id')
-            if parent_id:
-                self.graph.add_edge(def_id, parent_id, relation='nested_in')
+    def _nested_edges(self) -> Iterator[Tuple[str, str, str]]:
+        for def_id, record in self.definitions.items():
+            if record.parent_id:
+                yield def_id, record.parent_id, 'nested_in'
 
-    def _add_call_edges(self):
+    def _call_edges(self) -> Iterator[Tuple[str, str, str]]:
+        hierarchy = ClassHierarchy(self.definitions)
         for call in self.calls:
             caller_id = call.get("caller_id")
             candidate_id = call.get("candidate_id")
-            if caller_id in self.graph.nodes and candidate_id in self.graph.nodes:
-                self.graph.add_edge(caller_id, candidate_id, relation='call')
-
-    def _add_inheritance_edges(self):
-        for def_id, info in self.definitions.items():
-            if info['type'] == 'class' and info['inherits_from']:
-                for base_class in info['inherits_from']:
-                    if base_class in self.graph.nodes:
-                        self.graph.add_edge(def_id, base_class, relation='inherits_from')
+            # self./cls./super() calls are resolved to the class defining the method
+            if call.get("self_class"):
+                method_id = hierarchy.resolve_method(call["self_class"], call["attr"],
+                                                     skip_class=call.get("super", False))
+                if method_id and method_id != candidate_id:
+                    self.stats["mro_resolved_calls"] += 1
+                candidate_id = method_id or candidate_id
+            if caller_id in self.definitions and candidate_id in self.definitions:
+                yield caller_id, candidate_id, 'call'
 
+    def _inheritance_edges(self) -> Iterator[Tuple[str, str, str]]:
+        for def_id, record in self.definitions.items():
+            if record.type == 'class' and record.inherits_from:
+                for base_class in record.inherits_from:
+                    if base_class in self.definitions:
+                        yield def_id, base_class, 'inherits_from'
@@ -0,0 +1,139 @@
+import ast
+import hashlib
+import json
+import os
+import tempfile
+import jedi
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from src.utils.config.logger_config import logger
+from src.utils.code_parsing import DefinitionRecord, get_module_name, get_relative_module_name, find_imported_modules
+
+CACHE_FORMAT_VERSION = 3
+
+
+def _hash_bytes(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def _read_imported_modules(path: Path) -> List[str]:
+    try:
+        tree = ast.parse(path.read_bytes(), filename=str(path))
+    except (SyntaxError, ValueError, OSError):
+        return []
+    return find_imported_modules(tree, get_module_name(path), is_package=path.stem == "__init__")
+
+
+def compute_cache_keys(file_paths: List[Path], project_root: str, settings: str = "") -> Dict[Path, str]:
+    """
+    Compute the parse cache key of each file.
+
+    The key combines the content hash of the file with the content hashes of the
+    transitive closure of the project modules it imports, so a file is re-resolved
+    when itself or any module down its import chain changes, including the names
+    re-exported by packages through their __init__ module.
+
+    Args:
+        file_paths (List[Path]): Files to compute keys for.
+        project_root (str): Root folder of the project.
+        settings (str): Builder settings that affect the parse results.
+
+    Returns:
+        Dict[Path, str]: Cache key of each file.
+    """
+    # Hash every module of the project, including the packages skipped by the parser
+    module_hashes = {}
+    module_paths = {}
+    file_hashes = {}
+    for path in Path(project_root).rglob("*.py"):
+        try:
+            content_hash = _hash_bytes(path.read_bytes())
+        except OSError:
+            continue
+        file_hashes[path] = content_hash
+        for module_name in (get_module_name(path), get_relative_module_name(path, project_root)):
+            module_hashes.setdefault(module_name, content_hash)
+            module_paths.setdefault(module_name, path)
+
+    # Imports of each module, read once however many files depend on it
+    module_imports = {}
+
+    def imports_of(module: str) -> List[str]:
+        if module not in module_imports:
+            module_imports[module] = _read_imported_modules(module_paths[module])
+        return module_imports[module]
+
+    keys = {}
+    for file_path in file_paths:
+        file_path = Path(file_path)
+        content_hash = file_hashes.get(file_path) or _hash_bytes(file_path.read_bytes())
+
+        # Collect the project-internal dependencies down the whole import chain
+        dependencies = set()
+        pending_modules = _read_imported_modules(file_path)
+        while pending_modules:
+            module = pending_modules.pop()
+            if module in dependencies or module not in module_hashes:
+                continue
+            dependencies.add(module)
+            pending_modules.extend(imports_of(module))
+
+        dependency_hashes = [f"{module}:{module_hashes[module]}" for module in sorted(dependencies)]
+        key_parts = [str(CACHE_FORMAT_VERSION), jedi.__version__, settings,
+                     str(file_path), content_hash, *dependency_hashes]
+        keys[file_path] = _hash_bytes("\n".join(key_parts).encode("utf-8"))
+
+    return keys
+
+
+class ParseCache:
+    """
+    Persistent on-disk cache of the definitions and calls extracted from each file.
+
+    Entries are JSON files named after their cache key, so the cache directory can
+    live on any mounted or synced location shared between builds.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, DefinitionRecord], List]]:
+        """
+        Return the cached definitions and calls for a key, or None on a miss.
+        """
+        entry_path = self._entry_path(key)
+        if not entry_path.is_file():
+            return None
+        try:
+            with open(entry_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            definitions = {def_id: DefinitionRecord.from_dict(data)
+                           for def_id, data in entry["definitions"].items()}
+            return definitions, entry["calls"]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable parse cache entry {entry_path}: {e}")
+            return None
+
+    def put(self, key: str, definitions: Dict[str, DefinitionRecord], calls: List) -> None:
+        """
+        Store the definitions and calls of a file under its key.
+        """
+        entry_path = self._entry_path(key)
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = None
+        try:
+            # Write to a temporary file first so concurrent builds never read partial entries
+            with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=entry_path.parent,
+                                             suffix=".tmp", delete=False) as f:
+                temp_path = f.name
+                json.dump({"definitions": {def_id: record.to_dict() for def_id, record in definitions.items()},
+                           "calls": calls}, f)
+            os.replace(temp_path, entry_path)
+        except (OSError, TypeError) as e:
+            logger.warning(f"Could not write parse cache entry {entry_path}: {e}")
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
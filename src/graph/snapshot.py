@@ -0,0 +1,255 @@
+import json
+import mmap
+import os
+import shutil
+import sys
+import tempfile
+from array import array
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple
+from src.utils.config.logger_config import logger
+from src.graph.compact_graph import CompactGraph
+
+SNAPSHOT_FORMAT = "codebase-graph-snapshot"
+SNAPSHOT_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+EMBEDDINGS_FILE = "embeddings.f32"
+
+# Integer columns of CompactGraph and their typecode on disk
+INTEGER_COLUMNS = {"types": "B", "lines": "q", "files": "q", "parents": "q"}
+STRING_COLUMNS = ("names", "file_names", "display_names", "codes", "docstrings")
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot is missing, incomplete or written by an incompatible version."""
+
+
+class StringColumn(Sequence):
+    """
+    Memory-mapped column of strings: a UTF-8 blob and the offsets of each string in it.
+    Strings are only decoded when accessed.
+    """
+
+    def __init__(self, offsets: memoryview, blob: memoryview):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            i += len(self)
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+
+class ListColumn(StringColumn):
+    """Memory-mapped column of string lists, stored as newline-separated strings."""
+
+    def __getitem__(self, i: int) -> List[str]:
+        value = super().__getitem__(i)
+        return value.split("\n") if value else []
+
+
+def _write_array(path: Path, values: Iterable[int], typecode: str) -> None:
+    with open(path, "wb") as f:
+        array(typecode, values).tofile(f)
+
+
+def _write_strings(path: Path, values: Iterable[str]) -> None:
+    offsets = array("q", [0])
+    with open(path.with_suffix(".blob"), "wb") as f:
+        for value in values:
+            encoded = value.encode("utf-8")
+            f.write(encoded)
+            offsets.append(offsets[-1] + len(encoded))
+    _write_array(path.with_suffix(".offsets"), offsets, "q")
+
+
+def _write_manifest(path: Path, manifest: Dict) -> None:
+    # Replaced atomically, the manifest is what marks a snapshot as complete
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=path, suffix=".tmp", delete=False) as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f.name, path / MANIFEST_FILE)
+
+
+def write_snapshot(graph: CompactGraph, path: str) -> None:
+    """
+    Write a CompactGraph to a snapshot directory.
+
+    Every column and adjacency array is written as a raw binary file next to a JSON
+    manifest holding the format version, the sizes and the byte order, so the push
+    and embedding stages can memory-map it instead of rebuilding the graph. The
+    snapshot is written to a temporary directory first and then moved into place,
+    so an interrupted build never leaves a partial snapshot behind.
+
+    Args:
+        graph (CompactGraph): Graph to write.
+        path (str): Snapshot directory, replaced if it exists.
+    """
+    path = Path(path)
+    temp_path = path.with_name(path.name + ".tmp")
+    shutil.rmtree(temp_path, ignore_errors=True)
+    temp_path.mkdir(parents=True)
+
+    for column, typecode in INTEGER_COLUMNS.items():
+        _write_array(temp_path / f"{column}.bin", getattr(graph, column), typecode)
+    for column in STRING_COLUMNS:
+        _write_strings(temp_path / column, getattr(graph, column))
+    _write_strings(temp_path / "inherits_from", ("\n".join(bases) for bases in graph.inherits_from))
+
+    for relation, (offsets, targets) in graph.adjacency.items():
+        _write_array(temp_path / f"edges_{relation}.offsets.bin", offsets, "q")
+        _write_array(temp_path / f"edges_{relation}.targets.bin", targets, "q")
+
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_FORMAT_VERSION,
+        "byteorder": sys.byteorder,
+        "nodes": graph.number_of_nodes(),
+        "edges": graph.number_of_edges(),
+        "relations": list(graph.adjacency),
+        "embeddings": None,
+    }
+    _write_manifest(temp_path, manifest)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(temp_path, path)
+    logger.info(f"Graph snapshot written to {path}: {manifest['nodes']} nodes, {manifest['edges']} edges.")
+
+
+def read_manifest(path: str) -> Dict:
+    """
+    Read and validate the manifest of a snapshot.
+
+    Raises:
+        SnapshotError: If the snapshot does not exist or was written by another format version.
+    """
+    manifest_path = Path(path) / MANIFEST_FILE
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        raise SnapshotError(f"Could not read graph snapshot manifest {manifest_path}: {e}") from e
+
+    if manifest.get("format") != SNAPSHOT_FORMAT or manifest.get("version") != SNAPSHOT_FORMAT_VERSION:
+        raise SnapshotError(f"Unsupported graph snapshot {path}: format {manifest.get('format')} "
+                            f"version {manifest.get('version')}, expected version {SNAPSHOT_FORMAT_VERSION}")
+    if manifest.get("byteorder") != sys.byteorder:
+        raise SnapshotError(f"Graph snapshot {path} was written on a {manifest.get('byteorder')}-endian machine")
+    return manifest
+
+
+def _map_file(path: Path, mappings: List[mmap.mmap]) -> memoryview:
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return memoryview(b"")
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    mappings.append(mapping)
+    return memoryview(mapping)
+
+
+def load_snapshot(path: str) -> CompactGraph:
+    """
+    Load a snapshot as a CompactGraph whose columns and adjacency arrays are memory-mapped.
+
+    Args:
+        path (str): Snapshot directory written by `write_snapshot`.
+
+    Returns:
+        CompactGraph: Read-only graph backed by the snapshot files.
+
+    Raises:
+        SnapshotError: If the snapshot is missing, incomplete or incompatible.
+    """
+    path = Path(path)
+    manifest = read_manifest(path)
+    graph = CompactGraph()
+    # Kept on the graph so the mappings live as long as it does
+    graph.snapshot_mappings = []
+    try:
+        for column, typecode in INTEGER_COLUMNS.items():
+            setattr(graph, column, _map_file(path / f"{column}.bin", graph.snapshot_mappings).cast(typecode))
+        for column in STRING_COLUMNS:
+            setattr(graph, column, StringColumn(_map_file(path / f"{column}.offsets", graph.snapshot_mappings).cast("q"),
+                                                _map_file(path / f"{column}.blob", graph.snapshot_mappings)))
+        graph.inherits_from = ListColumn(_map_file(path / "inherits_from.offsets", graph.snapshot_mappings).cast("q"),
+                                         _map_file(path / "inherits_from.blob", graph.snapshot_mappings))
+        for relation in manifest["relations"]:
+            graph.adjacency[relation] = (
+                _map_file(path / f"edges_{relation}.offsets.bin", graph.snapshot_mappings).cast("q"),
+                _map_file(path / f"edges_{relation}.targets.bin", graph.snapshot_mappings).cast("q"),
+            )
+    except (OSError, ValueError, TypeError) as e:
+        raise SnapshotError(f"Incomplete graph snapshot {path}: {e}") from e
+
+    if len(graph.names) != manifest["nodes"]:
+        raise SnapshotError(f"Incomplete graph snapshot {path}: "
+                            f"{len(graph.names)} nodes found, {manifest['nodes']} expected")
+    # The id intern table is only built if a lookup by id is needed
+    graph._index = None
+    logger.info(f"Graph snapshot loaded from {path}: {manifest['nodes']} nodes, {manifest['edges']} edges.")
+    return graph
+
+
+def write_snapshot_embeddings(path: str, graph: CompactGraph,
+                              embeddings: Iterable[Tuple[str, List[float]]],
+                              embedding_property: str,
+                              model: str) -> int:
+    """
+    Store node embeddings in a snapshot, as a float32 matrix with one row per node.
+    Rows of nodes without an embedding are NaN.
+
+    Args:
+        path (str): Snapshot directory.
+        graph (CompactGraph): Graph of the snapshot.
+        embeddings (Iterable[Tuple[str, List[float]]]): (node id, vector) pairs.
+        embedding_property (str): Node property the vectors belong to.
+        model (str): Embedding provider and model that computed the vectors.
+
+    Returns:
+        int: Number of stored embeddings.
+    """
+    path = Path(path)
+    manifest = read_manifest(path)
+    vectors: Dict[int, List[float]] = {}
+    for node_id, vector in embeddings:
+        node_index = graph.index.get(node_id)
+        if node_index is not None:
+            vectors[node_index] = vector
+    if not vectors:
+        return 0
+
+    dimensions = len(next(iter(vectors.values())))
+    missing = array("f", [float("nan")]) * dimensions
+    with open(path / EMBEDDINGS_FILE, "wb") as f:
+        for node_index in range(graph.number_of_nodes()):
+            vector = vectors.get(node_index)
+            (array("f", vector) if vector is not None and len(vector) == dimensions else missing).tofile(f)
+
+    manifest["embeddings"] = {"property": embedding_property, "model": model, "dimensions": dimensions}
+    _write_manifest(path, manifest)
+    logger.info(f"{len(vectors)} embeddings of {dimensions} dimensions stored in graph snapshot {path}.")
+    return len(vectors)
+
+
+def read_snapshot_embeddings(path: str, graph: CompactGraph,
+                             embedding_property: str, model: str, dimensions: int) -> Iterator[Tuple[str, List[float]]]:
+    """
+    Stream the (node id, vector) pairs stored in a snapshot for an embedding property.
+    Nothing is returned unless the snapshot has embeddings of that property computed
+    by the same model with the same dimension.
+    """
+    manifest = read_manifest(path)
+    stored = manifest.get("embeddings")
+    if not stored or (stored["property"], stored["model"], stored["dimensions"]) != (embedding_property, model, dimensions):
+        return
+
+    mappings = []
+    matrix = _map_file(Path(path) / EMBEDDINGS_FILE, mappings).cast("f")
+    for node_index in range(graph.number_of_nodes()):
+        vector = matrix[node_index * dimensions:(node_index + 1) * dimensions].tolist()
+        # NaN != NaN marks the rows of nodes without an embedding
+        if vector and vector[0] == vector[0]:
+            yield graph.names[node_index], vector
@@ -0,0 +1,238 @@
+import asyncio
+import time
+from itertools import groupby, islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+from neo4j import AsyncGraphDatabase
+from neo4j.exceptions import Neo4jError
+from src.utils.config import logger
+from src.neo4j_integration.neo4j_client import (
+    COMMON_LABEL,
+    RETRY_BACKOFF_SECONDS,
+    RETRYABLE_ERRORS,
+    Neo4jClient,
+    constraint_queries,
+    project_delete_queries
+)
+
+
+def partition_by_id(rows: Iterable[Dict], batch_size: int) -> Iterator[List[Dict]]:
+    """
+    Sort node rows by id and cut them into batches, so the batches written
+    concurrently cover disjoint id ranges of the id constraint index.
+    """
+    rows = iter(sorted(rows, key=lambda row: row["id"]))
+    while batch := list(islice(rows, batch_size)):
+        yield batch
+
+
+def partition_by_source(rows: Iterable[Dict], batch_size: int) -> Iterator[List[Dict]]:
+    """
+    Sort edge rows by (source, target) and cut them into batches of about
+    `batch_size` rows without splitting the edges of a source node.
+
+    Every transaction then holds the lock of each source node alone and takes
+    the node locks in the same order, which avoids most deadlocks between
+    concurrent transactions. The remaining ones, on shared target nodes, are
+    retried like any transient error.
+    """
+    batch = []
+    for _, source_rows in groupby(sorted(rows, key=lambda row: (row["source"], row["target"])),
+                                  key=lambda row: row["source"]):
+        batch.extend(source_rows)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class AsyncNeo4jClient:
+    """
+    Asynchronous counterpart of `Neo4jClient` for the ingestion of a graph, built
+    on `neo4j.AsyncGraphDatabase`.
+
+    Batches are written in up to `concurrency` transactions at the same time, each
+    in its own session of the pooled driver. Node batches are partitioned by id and
+    edge batches sorted by source node, see `partition_by_id` and `partition_by_source`.
+    Queries and rows are the ones of `Neo4jClient`, so both clients load the same graph.
+    """
+
+    def __init__(self, uri: str, user: str, password: str, batch_size: int = 1000,
+                 max_retries: int = 3, concurrency: int = 4, project_id: Optional[str] = None):
+        self.uri = uri
+        self.user = user
+        self.password = password
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.concurrency = max(1, concurrency)
+        self.project_id = project_id
+        self.driver = self._database_connect()
+
+    def _database_connect(self) -> object:
+        # Connections are only opened when the first transactions run
+        return AsyncGraphDatabase.driver(self.uri, auth=(self.user, self.password),
+                                         max_connection_pool_size=max(self.concurrency, 1) + 1)
+
+    async def close(self) -> None:
+        if self.driver:
+            await self.driver.close()
+            logger.debug("Async driver closed successfully.")
+
+    async def __aenter__(self) -> "AsyncNeo4jClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def _write_batch(self, query: str, rows: List[Dict]) -> None:
+        """
+        Run a parameterized `UNWIND $rows` query in its own session and explicit
+        transaction, retrying the batch on transient errors (including deadlocks)
+        with exponential backoff. The client's project is passed as `$project_id`.
+        """
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                async with self.driver.session() as session:
+                    async with await session.begin_transaction() as tx:
+                        result = await tx.run(query, rows=rows, project_id=self.project_id)
+                        await result.consume()
+                        await tx.commit()
+                return
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                wait = RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1)
+                logger.warning(f"Transient error writing batch of {len(rows)} rows (attempt {attempt}): {e}. Retrying in {wait}s.")
+                await asyncio.sleep(wait)
+
+    async def _write_batches(self, query: str, batches: Iterable[List[Dict]], description: str,
+                             skip_batches: int = 0, on_batch: Optional[Callable[[int], None]] = None) -> int:
+        """
+        Write batches with at most `concurrency` transactions in flight and log the throughput.
+        Batches are only materialized when a slot is free. Returns the number of written rows.
+
+        The first `skip_batches` batches are skipped, as already committed by an
+        interrupted run. As batches commit out of order, `on_batch` is called with the
+        number of leading batches committed without a gap whenever it grows. When it
+        raises to stop the write, the transactions in flight are awaited first, so the
+        last call counts every committed batch.
+        """
+        batches = iter(batches)
+        for _ in islice(batches, skip_batches):
+            pass
+        written = 0
+        committed = skip_batches
+        finished = set()
+        in_flight = {}
+        start = time.time()
+
+        def collect(done) -> bool:
+            nonlocal written, committed
+            for task in done:
+                written += task.result()
+                finished.add(in_flight.pop(task))
+            before = committed
+            while committed in finished:
+                finished.remove(committed)
+                committed += 1
+            return committed > before
+
+        async def report() -> None:
+            try:
+                on_batch(committed)
+            except Exception:
+                if in_flight:
+                    collect((await asyncio.wait(list(in_flight)))[0])
+                    on_batch(committed)
+                raise
+
+        try:
+            for index, batch in enumerate(batches, start=skip_batches):
+                if len(in_flight) >= self.concurrency:
+                    done, _ = await asyncio.wait(list(in_flight), return_when=asyncio.FIRST_COMPLETED)
+                    if collect(done) and on_batch is not None:
+                        await report()
+                in_flight[asyncio.ensure_future(self._write_counted(query, batch))] = index
+            while in_flight:
+                done, _ = await asyncio.wait(list(in_flight), return_when=asyncio.FIRST_COMPLETED)
+                if collect(done) and on_batch is not None:
+                    await report()
+        finally:
+            # A failed batch cancels the others instead of leaving them running unobserved
+            for task in in_flight:
+                task.cancel()
+        if not written:
+            return 0
+        elapsed = time.time() - start
+        logger.info(f"{description}: {written} rows in {elapsed:.2f}s ({written / max(elapsed, 1e-9):.0f} rows/s, "
+                    f"{self.concurrency} concurrent transactions)")
+        return written
+
+    async def _write_counted(self, query: str, batch: List[Dict]) -> int:
+        await self._write_batch(query, batch)
+        return len(batch)
+
+    async def create_constraints(self) -> None:
+        """
+        Create the uniqueness constraint on the project and id of code entities, see `Neo4jClient.create_constraints`.
+        """
+        async with self.driver.session() as session:
+            try:
+                for query in constraint_queries():
+                    await (await session.run(query)).consume()
+            except Neo4jError as e:
+                logger.warning(f"Could not create the {COMMON_LABEL} id constraint, edge loading will be slower: {e}")
+
+    async def delete_project_graph(self) -> None:
+        """
+        Delete the code graph of the client's project in batched transactions, see `Neo4jClient.delete_project_graph`.
+        """
+        logger.info(f"Clearing the existing code graph of project {self.project_id} in Neo4j...")
+        async with self.driver.session() as session:
+            for query in project_delete_queries(self.project_id, self.batch_size):
+                await (await session.run(query, project_id=self.project_id)).consume()
+
+    async def push_graph_to_neo4j(self, G: object, delete_previous: bool = False,
+                                  progress: Optional[Dict[str, int]] = None,
+                                  on_batch: Optional[Callable[[str, int], None]] = None) -> Dict[str, int]:
+        """
+        Push the NetworkX graph or `CompactGraph` G to a Neo4j database with concurrent transactions.
+
+        Every node is written before the first edge, as edges match both of their endpoints.
+
+        Args:
+            G (object): Graph to push.
+            delete_previous (bool): Delete the nodes of the project first. Ignored when resuming from `progress`.
+            progress (Optional[Dict[str, int]]): Leading batches already committed per group by an
+                interrupted push of the same graph with this client, which are skipped.
+            on_batch (Optional[Callable[[str, int], None]]): Called with the group and its number
+                of leading committed batches whenever it grows, see `_write_batches`.
+
+        Returns:
+            Dict[str, int]: Number of written rows per group.
+        """
+        progress = progress or {}
+        if delete_previous and not progress:
+            await self.delete_project_graph()
+
+        await self.create_constraints()
+
+        written = {}
+        for label, rows in Neo4jClient._node_rows(G, self.project_id).items():
+            group = f"{label} nodes"
+            written[group] = await self._write_batches(Neo4jClient.node_create_query(label),
+                                                       partition_by_id(rows, self.batch_size),
+                                                       description=f"Created {group}",
+                                                       skip_batches=progress.get(group, 0),
+                                                       on_batch=Neo4jClient._group_callback(group, on_batch))
+
+        for rel_type, rows in Neo4jClient._graph_edge_rows(G).items():
+            group = f"{rel_type} edges"
+            written[group] = await self._write_batches(Neo4jClient.edge_create_query(rel_type, self.project_id),
+                                                       partition_by_source(rows, self.batch_size),
+                                                       description=f"Created {group}",
+                                                       skip_batches=progress.get(group, 0),
+                                                       on_batch=Neo4jClient._group_callback(group, on_batch))
+
+        logger.info("Graph successfully pushed to Neo4j.")
+        return written
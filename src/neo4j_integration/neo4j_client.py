@@ -1,13 +1,103 @@
+import hashlib
+import json
+import time
+from collections import defaultdict
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from neo4j import GraphDatabase
+from neo4j.exceptions import Neo4jError, ServiceUnavailable, SessionExpired, TransientError
 from src.utils.config import logger
+from src.embeddings import EmbeddingCache, EmbeddingProvider, embed_in_batches
+from src.graph.compact_graph import NODE_TYPES, CompactGraph
+
+CODE_LABELS = ["Class", "Function", "Method"]
+COMMON_LABEL = "CodeEntity"
+ID_CONSTRAINT_NAME = "code_entity_project_id"
+LEGACY_ID_CONSTRAINT_NAME = "code_entity_id"
+ID_INDEX_NAME = "code_entity_id_index"
+NODE_PROPERTIES = ('name', 'file', 'line', 'code', 'docstring')
+RETRYABLE_ERRORS = (TransientError, ServiceUnavailable, SessionExpired)
+RETRY_BACKOFF_SECONDS = 0.5
+
+
+def get_node_label(data: Dict) -> str:
+    """
+    Get the Neo4j label of a graph node from its definition type.
+    """
+    return (
+        "Class" if data.get('type') == 'class'
+        else "Method" if data.get('type') == 'method'
+        else "Function"
+    )
+
+
+def compute_node_hash(label: str, data: Dict) -> str:
+    """
+    Hash the label and every property pushed to Neo4j for a node, so changed
+    nodes can be detected without comparing their full properties.
+    """
+    content = [label] + [data.get(key) for key in NODE_PROPERTIES]
+    return hashlib.sha256(json.dumps(content).encode("utf-8")).hexdigest()
+
+
+def project_filter(variable: str, project_id: Optional[str]) -> str:
+    """
+    Cypher condition selecting the nodes of a project through the `$project_id`
+    parameter, or the nodes stored without a project when `project_id` is None.
+    """
+    return f"{variable}.project_id = $project_id" if project_id is not None else f"{variable}.project_id IS NULL"
+
+
+def constraint_queries() -> List[str]:
+    """
+    Queries creating the uniqueness constraint on the (project_id, id) pair of code
+    entities, so that the same qualified name may exist in several projects, and
+    an index on the id alone for the nodes stored without a project. The former
+    constraint on the id alone, which forbids it, is dropped first.
+    """
+    return [
+        f"DROP CONSTRAINT {LEGACY_ID_CONSTRAINT_NAME} IF EXISTS",
+        f"""
+            CREATE CONSTRAINT {ID_CONSTRAINT_NAME} IF NOT EXISTS
+            FOR (n:{COMMON_LABEL}) REQUIRE (n.project_id, n.id) IS UNIQUE
+        """,
+        f"CREATE INDEX {ID_INDEX_NAME} IF NOT EXISTS FOR (n:{COMMON_LABEL}) ON (n.id)",
+    ]
+
+
+def project_delete_queries(project_id: Optional[str], batch_size: int) -> List[str]:
+    """
+    Auto-commit queries deleting the code graph of a project in transactions of
+    `batch_size` rows: its relationships first, so no transaction has to detach a
+    node from an unbounded number of them, then its nodes.
+    """
+    return [
+        f"""
+            MATCH (n:{COMMON_LABEL})-[r]->() WHERE {project_filter('n', project_id)}
+            CALL {{ WITH r DELETE r }} IN TRANSACTIONS OF {batch_size} ROWS
+        """,
+        f"""
+            MATCH (n:{COMMON_LABEL}) WHERE {project_filter('n', project_id)}
+            CALL {{ WITH n DETACH DELETE n }} IN TRANSACTIONS OF {batch_size} ROWS
+        """,
+    ]
 
 
 class Neo4jClient:
 
-    def __init__(self, uri:str, user:str, password: str):
+    def __init__(self, uri:str, user:str, password: str, batch_size: int = 1000, max_retries: int = 3,
+                 project_id: Optional[str] = None):
+        """
+        Args:
+            project_id (Optional[str]): Project stored on every pushed node. Deletions, syncs and
+                embeddings only touch the nodes of this project, or the nodes without one if None.
+        """
         self.uri = uri
         self.user = user
         self.password = password
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.project_id = project_id
         self.driver = self._database_connect()
 
     def _database_connect(self)-> object:
@@ -26,103 +116,511 @@ class Neo4jClient:
             self.driver.close()
             logger.debug("Driver closed successfully.")
 
+    def _write_batch(self, session, query: str, rows: List[Dict]) -> None:
+        """
+        Run a parameterized `UNWIND $rows` query in its own explicit transaction,
+        retrying the batch on transient errors with exponential backoff. The
+        client's project is passed as `$project_id`.
+        """
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                with session.begin_transaction() as tx:
+                    tx.run(query, rows=rows, project_id=self.project_id).consume()
+                    tx.commit()
+                return
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                wait = RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1)
+                logger.warning(f"Transient error writing batch of {len(rows)} rows (attempt {attempt}): {e}. Retrying in {wait}s.")
+                time.sleep(wait)
+
+    def _write_batches(self, session, query: str, rows: Iterable[Dict], description: str,
+                       skip_batches: int = 0, on_batch: Optional[Callable[[int], None]] = None) -> int:
+        """
+        Write rows in transactions of `batch_size` rows and log the throughput.
+        Rows may be a lazy iterable, only one batch is materialized at a time.
+
+        The first `skip_batches` batches are skipped, as already committed by an
+        interrupted run, and `on_batch` is called with the number of committed
+        batches after each one, e.g. to checkpoint progress. Returns the number
+        of written rows.
+        """
+        rows = iter(rows)
+        for _ in range(skip_batches):
+            if not list(islice(rows, self.batch_size)):
+                break
+        written = 0
+        committed = skip_batches
+        start = time.time()
+        while batch := list(islice(rows, self.batch_size)):
+            self._write_batch(session, query, batch)
+            written += len(batch)
+            committed += 1
+            if on_batch is not None:
+                on_batch(committed)
+        if not written:
+            return 0
+        elapsed = time.time() - start
+        logger.info(f"{description}: {written} rows in {elapsed:.2f}s ({written / max(elapsed, 1e-9):.0f} rows/s)")
+        return written
 
-    def push_graph_to_neo4j(self, G: object, delete_previous: bool = False) -> None:
+    def create_constraints(self) -> None:
         """
-        Push the NetworkX graph G to a Neo4j database.
+        Create the uniqueness constraint on the project and id of code entities, see
+        `constraint_queries`. Its backing index lets edges find their endpoints
+        without scanning every node.
         """
         with self.driver.session() as session:
-            logger.info("Clearing existing data in Neo4j...")
-            if delete_previous:
-                session.run("MATCH (n) DETACH DELETE n")
-            for node_id, data in G.nodes(data=True):
-                label = (
-                    "Class" if data.get('type') == 'class'
-                    else "Method" if data.get('type') == 'method'
-                    else "Function"
-                )
+            try:
+                for query in constraint_queries():
+                    session.run(query).consume()
+            except Neo4jError as e:
+                logger.warning(f"Could not create the {COMMON_LABEL} id constraint, edge loading will be slower: {e}")
+
+    @staticmethod
+    def node_create_query(label: str) -> str:
+        """Query creating a batch of `$rows` as nodes with `label` and the common label."""
+        return f"UNWIND $rows AS row CREATE (n:{label}:{COMMON_LABEL}) SET n = row"
+
+    @staticmethod
+    def edge_create_query(rel_type: str, project_id: Optional[str] = None) -> str:
+        """
+        Query creating a batch of {source, target} `$rows` as `rel_type` relationships
+        between the nodes of the `$project_id` project.
+        """
+        return f"""
+            UNWIND $rows AS row
+            MATCH (a:{COMMON_LABEL} {{id: row.source}}) WHERE {project_filter('a', project_id)}
+            MATCH (b:{COMMON_LABEL} {{id: row.target}}) WHERE {project_filter('b', project_id)}
+            CREATE (a)-[:{rel_type}]->(b)
+        """
+
+    @staticmethod
+    def vector_write_query(embedding_property: str, project_id: Optional[str] = None) -> str:
+        """
+        Query storing a batch of {id, vector} `$rows` in the `embedding_property` of
+        the nodes of the `$project_id` project.
+        """
+        return f"""
+            UNWIND $rows AS row
+            MATCH (node:{COMMON_LABEL} {{id: row.id}}) WHERE {project_filter('node', project_id)}
+            CALL db.create.setNodeVectorProperty(node, "{embedding_property}", row.vector)
+        """
+
+    @staticmethod
+    def _compact_node_rows(G: CompactGraph, node_type: str, project_id: Optional[str] = None) -> Iterator[Dict]:
+        label = get_node_label({'type': node_type})
+        for row in G.node_rows(node_type, NODE_PROPERTIES):
+            row['content_hash'] = compute_node_hash(label, row)
+            if project_id is not None:
+                row['project_id'] = project_id
+            yield row
+
+    @classmethod
+    def _node_rows(cls, G: object, project_id: Optional[str] = None) -> Dict[str, Iterable[Dict]]:
+        """
+        Group the node properties of graph G by Neo4j label, with the `project_id`
+        of the nodes if any. The rows of a `CompactGraph` are streamed from its
+        columns instead of being collected.
+        """
+        if isinstance(G, CompactGraph):
+            return {get_node_label({'type': node_type}): cls._compact_node_rows(G, node_type, project_id)
+                    for node_type in NODE_TYPES}
+
+        rows_by_label = defaultdict(list)
+        for node_id, data in G.nodes(data=True):
+            label = get_node_label(data)
+            row = {key: data.get(key) for key in NODE_PROPERTIES}
+            row['id'] = node_id
+            row['content_hash'] = compute_node_hash(label, data)
+            if project_id is not None:
+                row['project_id'] = project_id
+            rows_by_label[label].append(row)
+        return rows_by_label
+
+    @staticmethod
+    def _edge_rows(edges) -> Dict[str, List[Dict]]:
+        """
+        Group (source, relation type, target) edges by relation type.
+        """
+        rows_by_type = defaultdict(list)
+        for source, rel_type, target in edges:
+            rows_by_type[rel_type].append({"source": source, "target": target})
+        return rows_by_type
+
+    @classmethod
+    def _graph_edge_rows(cls, G: object) -> Dict[str, Iterable[Dict]]:
+        """
+        Group the edges of graph G by relation type. The edges of a `CompactGraph`
+        are streamed from its adjacency arrays.
+        """
+        if isinstance(G, CompactGraph):
+            return {relation.upper(): G.edge_rows(relation) for relation in G.adjacency}
+        return cls._edge_rows((source, data.get('relation', 'call').upper(), target)
+                              for source, target, data in G.edges(data=True))
+
+    def push_graph_to_neo4j(self, G: object, delete_previous: bool = False,
+                            progress: Optional[Dict[str, int]] = None,
+                            on_batch: Optional[Callable[[str, int], None]] = None) -> None:
+        """
+        Push the NetworkX graph or `CompactGraph` G to a Neo4j database.
+
+        Nodes are grouped by label and edges by relation type, and every group is
+        sent as `UNWIND` batches of `batch_size` rows instead of one query per row.
+
+        Args:
+            G (object): Graph to push.
+            delete_previous (bool): Delete the nodes of the project first, see `delete_project_graph`.
+                Ignored when resuming from `progress`.
+            progress (Optional[Dict[str, int]]): Batches already committed per group ("Class nodes",
+                "CALL edges"...) by an interrupted push of the same graph, which are skipped.
+            on_batch (Optional[Callable[[str, int], None]]): Called with the group and its number
+                of committed batches after each batch.
+        """
+        progress = progress or {}
+        if delete_previous and not progress:
+            self.delete_project_graph()
+
+        self.create_constraints()
+
+        with self.driver.session() as session:
+            for label, rows in self._node_rows(G, self.project_id).items():
+                group = f"{label} nodes"
+                self._write_batches(session,
+                                    self.node_create_query(label),
+                                    rows,
+                                    description=f"Created {group}",
+                                    skip_batches=progress.get(group, 0),
+                                    on_batch=self._group_callback(group, on_batch))
+
+            for rel_type, rows in self._graph_edge_rows(G).items():
+                group = f"{rel_type} edges"
+                self._write_batches(session,
+                                    self.edge_create_query(rel_type, self.project_id),
+                                    rows,
+                                    description=f"Created {group}",
+                                    skip_batches=progress.get(group, 0),
+                                    on_batch=self._group_callback(group, on_batch))
 
-                session.run(
-                    f"CREATE (n:{label} {{id: $id, name: $name, file: $file, line: $line, code: $code, docstring: $docstring}})",
-                    id=node_id,
-                    name=data.get('name'),
-                    file=data.get('file'),
-                    line=data.get('line'),
-                    code=data.get('code'),
-                    docstring=data.get('docstring')
+        logger.info("Graph successfully pushed to Neo4j.")
+
+    def delete_project_graph(self) -> None:
+        """
+        Delete the code graph of the client's project, leaving the other projects untouched.
+        Deletion runs in transactions of `batch_size` rows, so a large graph neither
+        exhausts the transaction memory nor holds its locks until everything is deleted.
+        """
+        scope = f"project {self.project_id}" if self.project_id is not None else "nodes without a project"
+        logger.info(f"Clearing the existing code graph of {scope} in Neo4j...")
+        start = time.time()
+        with self.driver.session() as session:
+            # CALL ... IN TRANSACTIONS requires auto-commit queries
+            for query in project_delete_queries(self.project_id, self.batch_size):
+                session.run(query, project_id=self.project_id).consume()
+        logger.info(f"Code graph of {scope} deleted in {time.time() - start:.2f}s.")
+
+    @staticmethod
+    def _group_callback(group: str, on_batch: Optional[Callable[[str, int], None]]) -> Optional[Callable[[int], None]]:
+        if on_batch is None:
+            return None
+        return lambda committed: on_batch(group, committed)
+
+    def sync_graph_to_neo4j(self, G: object, embedding_property: str = "code_embedding",
+                            on_batch: Optional[Callable[[str, int], None]] = None) -> Dict[str, int]:
+        """
+        Synchronize the NetworkX graph or `CompactGraph` G with the code graph stored in Neo4j.
+
+        Every node stores a hash of its properties. Instead of wiping and reloading
+        the database, the graph is diffed against the stored hashes and edges, and
+        only created, updated and deleted nodes and edges are written. Updated nodes
+        whose code or docstring changed lose their embedding, so that a subsequent
+        `create_embeddings(..., only_missing=True)` only re-embeds them. As the
+        diff is recomputed on every run, an interrupted sync is resumed by running
+        it again. `on_batch` is called after each batch like in `push_graph_to_neo4j`.
+
+        Returns:
+            Dict[str, int]: Number of created, updated and deleted nodes and edges.
+        """
+        new_nodes = {row['id']: (label, row)
+                     for label, rows in self._node_rows(G, self.project_id).items() for row in rows}
+        new_edges = {(row["source"], rel_type, row["target"])
+                     for rel_type, rows in self._graph_edge_rows(G).items() for row in rows}
+
+        self.create_constraints()
+
+        with self.driver.session() as session:
+            existing_nodes = {
+                record["id"]: (record["label"], record["content_hash"])
+                for record in session.run(
+                    f"""
+                    MATCH (n:{COMMON_LABEL}) WHERE {project_filter('n', self.project_id)}
+                    RETURN n.id AS id, n.content_hash AS content_hash,
+                           [label IN labels(n) WHERE label IN $labels][0] AS label
+                    """,
+                    labels=CODE_LABELS,
+                    project_id=self.project_id
                 )
+            }
+
+            # A node whose label changed (e.g. function turned into method) is recreated
+            deleted_nodes = [node_id for node_id, (label, _) in existing_nodes.items()
+                             if node_id not in new_nodes or new_nodes[node_id][0] != label]
+            created_nodes = [node_id for node_id, (label, _) in new_nodes.items()
+                             if node_id not in existing_nodes or existing_nodes[node_id][0] != label]
+            updated_nodes = [node_id for node_id, (label, row) in new_nodes.items()
+                             if node_id in existing_nodes and existing_nodes[node_id][0] == label
+                             and existing_nodes[node_id][1] != row['content_hash']]
 
-            for source, target, data in G.edges(data=True):
-                rel_type = data.get('relation', 'call').upper()
-                session.run(
-                    f"MATCH (a {{id: $source}}), (b {{id: $target}}) CREATE (a)-[r:{rel_type}]->(b)",
-                    source=source,
-                    target=target
+            # Edges of deleted nodes disappear with them, so they do not need to be diffed
+            deleted_node_set = set(deleted_nodes)
+            existing_edges = {
+                (record["source"], record["type"], record["target"])
+                for record in session.run(
+                    f"""
+                    MATCH (a:{COMMON_LABEL})-[r]->(b:{COMMON_LABEL}) WHERE {project_filter('a', self.project_id)}
+                    RETURN a.id AS source, type(r) AS type, b.id AS target
+                    """,
+                    project_id=self.project_id
                 )
+            }
+            existing_edges = {edge for edge in existing_edges
+                              if edge[0] not in deleted_node_set and edge[2] not in deleted_node_set}
+            deleted_edges = existing_edges - new_edges
+            created_edges = new_edges - existing_edges
 
-        logger.info("Graph successfully pushed to Neo4j.")
+            self._write_batches(session,
+                                f"""
+                                UNWIND $rows AS row
+                                MATCH (n:{COMMON_LABEL} {{id: row.id}}) WHERE {project_filter('n', self.project_id)}
+                                DETACH DELETE n
+                                """,
+                                [{"id": node_id} for node_id in deleted_nodes],
+                                description="Deleted nodes",
+                                on_batch=self._group_callback("Deleted nodes", on_batch))
+
+            for rel_type, rows in self._edge_rows(deleted_edges).items():
+                self._write_batches(session,
+                                    f"""
+                                    UNWIND $rows AS row
+                                    MATCH (a:{COMMON_LABEL} {{id: row.source}})-[r:{rel_type}]->(b:{COMMON_LABEL} {{id: row.target}})
+                                    WHERE {project_filter('a', self.project_id)}
+                                    DELETE r
+                                    """,
+                                    rows,
+                                    description=f"Deleted {rel_type} edges",
+                                    on_batch=self._group_callback(f"Deleted {rel_type} edges", on_batch))
+
+            created_rows, updated_rows = defaultdict(list), defaultdict(list)
+            for node_id in created_nodes:
+                label, row = new_nodes[node_id]
+                created_rows[label].append(row)
+            for node_id in updated_nodes:
+                label, row = new_nodes[node_id]
+                updated_rows[label].append(row)
+
+            for label, rows in created_rows.items():
+                self._write_batches(session,
+                                    self.node_create_query(label),
+                                    rows,
+                                    description=f"Created {label} nodes",
+                                    on_batch=self._group_callback(f"Created {label} nodes", on_batch))
+
+            for label, rows in updated_rows.items():
+                self._write_batches(session,
+                                    f"""
+                                    UNWIND $rows AS row
+                                    MATCH (n:{COMMON_LABEL} {{id: row.id}}) WHERE {project_filter('n', self.project_id)}
+                                    WITH n, row, coalesce(n.code, "") <> coalesce(row.code, "")
+                                            OR coalesce(n.docstring, "") <> coalesce(row.docstring, "") AS text_changed
+                                    SET n += row
+                                    WITH n, text_changed WHERE text_changed
+                                    REMOVE n.{embedding_property}
+                                    """,
+                                    rows,
+                                    description=f"Updated {label} nodes",
+                                    on_batch=self._group_callback(f"Updated {label} nodes", on_batch))
+
+            for rel_type, rows in self._edge_rows(created_edges).items():
+                self._write_batches(session,
+                                    self.edge_create_query(rel_type, self.project_id),
+                                    rows,
+                                    description=f"Created {rel_type} edges",
+                                    on_batch=self._group_callback(f"Created {rel_type} edges", on_batch))
+
+        changes = {
+            "created_nodes": len(created_nodes),
+            "updated_nodes": len(updated_nodes),
+            "deleted_nodes": len(deleted_nodes),
+            "created_edges": len(created_edges),
+            "deleted_edges": len(deleted_edges),
+        }
+        logger.info(f"Graph synchronized with Neo4j: {changes}")
+        return changes
         
 
 
-    def add_common_label(self,target_labels, common_label):
+    def list_projects(self) -> List[str]:
         """
-        Adds a common label to nodes that have any of the specified target labels.
-
-        :param driver: Neo4j driver instance.
-        :param target_labels: List of target labels to match.
-        :param common_label: The common label to add to matching nodes.
+        Return the projects whose code graph is stored in the database.
         """
-        # Construct the Cypher query
         query = f"""
-        WITH $target_labels AS targetLabels
-        MATCH (n)
-        WHERE ANY(label IN labels(n) WHERE label IN targetLabels)
-        SET n:{common_label}
+            MATCH (n:{COMMON_LABEL}) WHERE n.project_id IS NOT NULL
+            RETURN DISTINCT n.project_id AS project_id ORDER BY project_id
         """
         with self.driver.session() as session:
-            session.run(query, 
-                        target_labels=target_labels)
+            return [record["project_id"] for record in session.run(query)]
 
+    def get_vector_index_dimensions(self, index_name: str) -> Optional[int]:
+        """
+        Return the dimension of an existing vector index, or None if it does not exist.
+        """
+        query = """
+            SHOW VECTOR INDEXES YIELD name, options
+            WHERE name = $index_name
+            RETURN options.indexConfig['vector.dimensions'] AS dimensions
+        """
+        with self.driver.session() as session:
+            record = session.run(query, index_name=index_name).single()
+        if record is None or record["dimensions"] is None:
+            return None
+        return int(record["dimensions"])
 
     def create_vector_index(self,  
                             index_name:str, 
                             node_label: str,
                             on_node_property: str = "code_embedding", 
                             embedding_dimensions: int= 1536, 
-                            similarity_function: str = "cosine") -> None:
+                            similarity_function: str = "cosine") -> bool:
+        """
+        Create the vector index, rebuilding it if it exists with another dimension.
 
-        query = f"""
-            CREATE VECTOR INDEX `{index_name}` IF NOT EXISTS 
-            FOR (node:{node_label}) ON (node.{on_node_property}) 
-            OPTIONS {{ indexConfig: {{
-                `vector.dimensions`: {embedding_dimensions},
-                `vector.similarity_function`: '{similarity_function}'    
-            }} }}
+        When the dimension changes (e.g. another embedding model or a reduced
+        `EMBEDDING_DIMENSIONS`), the index is dropped and the stored vectors of the
+        client's project are removed so that the following embedding pass recomputes
+        all of them. The index is shared by every project in the database, so it is
+        only rebuilt when no other project holds vectors of the old dimension.
+
+        Returns:
+            bool: True if an existing index was dropped and the embeddings cleared.
+
+        Raises:
+            RuntimeError: If other projects still hold vectors of the old dimension.
         """
+        rebuilt = False
+        existing_dimensions = self.get_vector_index_dimensions(index_name)
         with self.driver.session() as session:
+            if existing_dimensions is not None and existing_dimensions != embedding_dimensions:
+                # Their vectors would no longer be searchable and they are not re-embedded here
+                other_projects = [record["project_id"] for record in session.run(f"""
+                    MATCH (node:{node_label})
+                    WHERE node.{on_node_property} IS NOT NULL AND NOT coalesce({project_filter('node', self.project_id)}, false)
+                    RETURN DISTINCT node.project_id AS project_id LIMIT 10
+                """, project_id=self.project_id)]
+                if other_projects:
+                    raise RuntimeError(f"Vector index {index_name} has {existing_dimensions} dimensions and is shared "
+                                       f"with projects {other_projects} embedded with them. Keep {existing_dimensions} dimensions, "
+                                       f"or delete the graphs of the other projects first.")
+
+                logger.info(f"Vector index {index_name} has {existing_dimensions} dimensions, "
+                            f"rebuilding it with {embedding_dimensions}")
+                session.run(f"DROP INDEX `{index_name}` IF EXISTS")
+                # Auto-commit query, required by CALL ... IN TRANSACTIONS
+                session.run(f"""
+                    MATCH (node:{node_label})
+                    WHERE node.{on_node_property} IS NOT NULL AND {project_filter('node', self.project_id)}
+                    CALL {{ WITH node REMOVE node.{on_node_property} }} IN TRANSACTIONS OF {self.batch_size} ROWS
+                """, project_id=self.project_id)
+                rebuilt = True
+
+            query = f"""
+                CREATE VECTOR INDEX `{index_name}` IF NOT EXISTS 
+                FOR (node:{node_label}) ON (node.{on_node_property}) 
+                OPTIONS {{ indexConfig: {{
+                    `vector.dimensions`: {embedding_dimensions},
+                    `vector.similarity_function`: '{similarity_function}'    
+                }} }}
+            """
             session.run(query)
+        return rebuilt
 
     def create_embeddings(self, 
                           node_label: str,
-                          openai_api_key: str,
+                          provider: EmbeddingProvider,
                           on_node_property: str = "code", 
                           embedding_property: str = "code_embedding",
-                          endpoint: str = "https://api.openai.com/v1/embeddings",
-                          model: str = None
-                          ):
-        if model:
-            endpoint += f"?model={model}"
+                          only_missing: bool = False,
+                          batch_size: int = 100,
+                          max_concurrency: int = 4,
+                          cache: Optional[EmbeddingCache] = None,
+                          on_batch: Optional[Callable[[int], None]] = None
+                          ) -> int:
+        """
+        Embed the `on_node_property` text of the nodes with `node_label` on the client side.
+
+        (id, text) pairs are streamed out of the graph and sent to the embedding provider
+        in multi-input batches with bounded concurrency, and the vectors are written back
+        with batched `db.create.setNodeVectorProperty` calls.
+
+        Args:
+            node_label (str): Label of the nodes to embed.
+            provider (EmbeddingProvider): Embedding provider.
+            on_node_property (str): Node property holding the text to embed.
+            embedding_property (str): Node property where the vector is stored.
+            only_missing (bool): Skip nodes that already have an embedding, e.g. the ones left untouched by a sync.
+            batch_size (int): Number of texts per embedding request.
+            max_concurrency (int): Maximum number of embedding requests in flight.
+            cache (Optional[EmbeddingCache]): Persistent embedding cache consulted before the provider.
+            on_batch (Optional[Callable[[int], None]]): Called with the number of embedded nodes after
+                each written batch, e.g. to checkpoint progress.
 
+        Returns:
+            int: Number of embedded nodes.
+        """
+        missing_filter = f"AND node.{embedding_property} IS NULL" if only_missing else ""
+        read_query = f"""
+            MATCH (node:{node_label}) WHERE node.{on_node_property} IS NOT NULL AND node.{on_node_property} <> "" {missing_filter}
+                AND {project_filter('node', self.project_id)}
+            RETURN node.id AS id, node.{on_node_property} AS text
+        """
+        write_query = self.vector_write_query(embedding_property, self.project_id)
+
+        embedded = 0
+        with self.driver.session() as read_session, self.driver.session() as write_session:
+            pairs = ((record["id"], record["text"]) for record in read_session.run(read_query, project_id=self.project_id))
+            for batch in embed_in_batches(pairs, provider, batch_size=batch_size, 
+                                          max_concurrency=max_concurrency, cache=cache):
+                self._write_batch(write_session, write_query, 
+                                  [{"id": node_id, "vector": vector} for node_id, vector in batch])
+                embedded += len(batch)
+                if on_batch is not None:
+                    on_batch(embedded)
+
+        logger.info(f"Embedded {embedded} {node_label} nodes.")
+        return embedded
+
+    def read_embeddings(self, embedding_property: str = "code_embedding") -> Iterator[Tuple[str, List[float]]]:
+        """
+        Stream the (id, vector) pairs of every code entity of the project with an embedding.
+        """
         query = f"""
-            MATCH (node:{node_label}) WHERE node.{on_node_property} IS NOT NULL AND node.{on_node_property} <> ""
-            WITH node, genai.vector.encode(
-                node.{on_node_property}, 
-                "OpenAI", 
-                {{
-                token: "{openai_api_key}",
-                endpoint: "{endpoint}"
-            }}) AS vector
-            CALL db.create.setNodeVectorProperty(node, "{embedding_property}", vector)"""
+            MATCH (node:{COMMON_LABEL}) WHERE node.{embedding_property} IS NOT NULL
+                AND {project_filter('node', self.project_id)}
+            RETURN node.id AS id, node.{embedding_property} AS vector
+        """
+        with self.driver.session() as session:
+            for record in session.run(query, project_id=self.project_id):
+                yield record["id"], list(record["vector"])
 
+    def write_embeddings(self, embeddings: Iterable[Tuple[str, List[float]]],
+                         embedding_property: str = "code_embedding") -> int:
+        """
+        Write precomputed (id, vector) pairs, e.g. the ones stored in a graph snapshot, in batches.
+
+        Returns:
+            int: Number of written vectors.
+        """
+        query = self.vector_write_query(embedding_property, self.project_id)
+        rows = ({"id": node_id, "vector": vector} for node_id, vector in embeddings)
         with self.driver.session() as session:
-            session.run(query)
\ No newline at end of file
+            return self._write_batches(session, query, rows, description="Restored embeddings")
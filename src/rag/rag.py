@@ -3,7 +3,6 @@ from langchain.prompts.prompt import PromptTemplate
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.output_parsers import StrOutputParser
 from langchain_openai import ChatOpenAI
-from langchain_openai import OpenAIEmbeddings
 from langchain_core.documents import Document
 from langchain_neo4j import Neo4jGraph, GraphCypherQAChain
 from langchain.chains.router.base import RouterChain, Route
@@ -15,6 +14,7 @@ from openai import RateLimitError
 # -----
 from langchain_community.vectorstores import Neo4jVector
 from src.utils.config import config, logger
+from src.embeddings import EmbeddingProvider, get_embedding_provider
 
 
 
@@ -41,6 +41,9 @@ class RouterChat:
         conversational_qa_system_prompt: str,
         model_name: str = "gpt-4o",
         memory_model_name: str = "gpt-3.5-turbo",
+        embedding_provider: Optional[EmbeddingProvider] = None,
+        project_id: Optional[str] = None,
+        cypher_project_scope_template: Optional[str] = None,
     ):
         """
         Initialize the router with necessary components.
@@ -52,6 +55,14 @@ class RouterChat:
             neo4j_password: Password for Neo4j authentication (optional)
             openai_api_key: API key for OpenAI services (defaults to environment variable)
             model_name: Name of the OpenAI model to use
+            embedding_provider: Provider used to embed queries. It must be the one used to
+                index the graph, so it defaults to the provider selected in the configuration.
+            project_id: Project whose code graph is queried when several share the database.
+                Vector retrieval only returns its nodes and generated Cypher is instructed to
+                filter on it. None queries the whole database.
+            cypher_project_scope_template: Instruction filled with the project_id and inserted
+                in the `{project_scope}` of the Cypher generation template, defaults to the
+                configured CYPHER_PROJECT_SCOPE.
         """
         # OpenAI API Key
         self.OPENAI_API_KEY = openai_api_key
@@ -66,10 +77,19 @@ class RouterChat:
         self.NEO4J_INDEX_NAME = neo4j_index_name
         self.VECTOR_CODE_PROPERTY = vector_code_property
         self.CYPHER_AUGMENTATION_QUERY = cypher_augmentation_query
+        self.project_id = project_id
+        self.embedding_provider = embedding_provider or get_embedding_provider(
+            provider=config.get("EMBEDDING_PROVIDER"),
+            api_key=self.OPENAI_API_KEY,
+            model=config.get("EMBEDDING_MODEL"),
+            endpoint=config.get("EMBEDDING_ENDPOINT"),
+            dimensions=config.get("EMBEDDING_DIMENSIONS")
+        )
 
         # Prompts
         self.VECTOR_QA_SYSTEM_PROMPT = vector_qa_system_prompt
         self.CYPHER_GENERATION_TEMPLATE = cypher_prompt_template
+        self.CYPHER_PROJECT_SCOPE = cypher_project_scope_template or config.get("CYPHER_PROJECT_SCOPE", "")
         self.GRAPH_QA_GENERATION_TEMPLATE = graph_qa_prompt_template
         self.CONVERSATIONAL_QA_SYSTEM_PROMPT = conversational_qa_system_prompt
         
@@ -107,7 +127,7 @@ class RouterChat:
         try:
             logger.info(self.NEO4J_URI)
             self.vector_store = Neo4jVector.from_existing_index(
-                OpenAIEmbeddings(),
+                self.embedding_provider,
                 url=self.NEO4J_URI,
                 username=self.NEO4J_USERNAME,
                 password=self.NEO4J_PASSWORD,
@@ -116,9 +136,13 @@ class RouterChat:
                 text_node_property=self.VECTOR_CODE_PROPERTY,
                 retrieval_query=self.CYPHER_AUGMENTATION_QUERY,
             )
+            search_kwargs = {"k": 3}
+            if self.project_id is not None:
+                # Metadata filter on the node properties, only the project's nodes are ranked
+                search_kwargs["filter"] = {"project_id": self.project_id}
             self.retriever = self.vector_store.as_retriever(
                 search_type="similarity",
-                search_kwargs={"k": 3}
+                search_kwargs=search_kwargs
             )
 
             logger.info("Vector store initialized successfully")
@@ -138,6 +162,8 @@ class RouterChat:
                 input_variables=["schema", "question","chat_history"], 
                 template=self.CYPHER_GENERATION_TEMPLATE
             )
+            if "{project_scope}" in self.CYPHER_GENERATION_TEMPLATE:
+                CYPHER_GENERATION_PROMPT = CYPHER_GENERATION_PROMPT.partial(project_scope=self._project_scope())
 
             QA_GENERATION_PROMPT = PromptTemplate(
                 input_variables=["question", "context", "chat_history"],
@@ -163,6 +189,14 @@ class RouterChat:
             logger.error(f"Error initializing Neo4j graph: {e}")
 
     
+    def _project_scope(self) -> str:
+        """Project scoping instruction of the Cypher generation prompt, empty without a project."""
+        if self.project_id is None or not self.CYPHER_PROJECT_SCOPE:
+            return ""
+        # Escaped for the Cypher string literal of the instruction
+        project_id = self.project_id.replace("\\", "\\\\").replace("'", "\\'")
+        return self.CYPHER_PROJECT_SCOPE.format(project_id=project_id)
+
     def _create_router_chain(self, router_prompt_template: str) -> RouterChain:
         """Create the router chain that determines which destination to use."""
          
@@ -315,6 +349,7 @@ if __name__ == "__main__":
         cypher_prompt_template = config.get("CYPHER_GENERATION_TEMPLATE", None), 
         graph_qa_prompt_template = config.get("GRAPH_QA_GENERATION_TEMPLATE", None),
         conversational_qa_system_prompt = config.get("CONVERSATIONAL_QA_SYSTEM_PROMPT", None),
+        project_id = config.get("PROJECT_ID"),
     )
     
     queries = [
@@ -0,0 +1,666 @@
+import ast
+import bisect
+import builtins
+import jedi
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, FrozenSet, Iterator, List, Optional, Tuple
+
+BUILTIN_NAMES = frozenset(dir(builtins))
+
+# Dynamic parameter inference searches the other modules of the project for the calls
+# of a function to infer its arguments, which parses and keeps in parso's cache most
+# of the project (e.g. every test file calling a method) for a few goto fallbacks.
+# Resolved calls do not depend on it, as arguments are never resolved to a definition
+JEDI_BUILD_SETTINGS = {
+    "dynamic_params": False,
+    "dynamic_params_for_other_modules": False,
+}
+
+# Name bindings recorded by the scope analysis:
+#   ("def", full_name)      function or class defined in the scope
+#   ("import", dotted_name) absolute name of the imported module or object
+#   ("other",)              any other binding (assignment, argument, loop target...)
+#   ("ambiguous",)          several different bindings, or declared global/nonlocal
+Binding = Tuple[str, ...]
+OTHER_BINDING = ("other",)
+AMBIGUOUS_BINDING = ("ambiguous",)
+
+# Maximum number of import aliases followed while resolving a single name
+MAX_RESOLUTION_DEPTH = 16
+
+
+def apply_jedi_build_settings() -> Dict[str, object]:
+    """
+    Apply `JEDI_BUILD_SETTINGS` to the global jedi settings and return the previous values.
+    """
+    previous = {name: getattr(jedi.settings, name) for name in JEDI_BUILD_SETTINGS}
+    for name, value in JEDI_BUILD_SETTINGS.items():
+        setattr(jedi.settings, name, value)
+    return previous
+
+
+@contextmanager
+def jedi_build_settings() -> Iterator[None]:
+    """
+    Apply `JEDI_BUILD_SETTINGS` for the duration of a graph build, and restore the
+    previous jedi settings afterwards for the other users of jedi in the process.
+    """
+    previous = apply_jedi_build_settings()
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(jedi.settings, name, value)
+
+
+def is_self_call(call_node: ast.Call) -> bool:
+    """Check whether a call node is a `self.method(...)` call."""
+    return (
+        isinstance(call_node.func, ast.Attribute)
+        and isinstance(call_node.func.value, ast.Name)
+        and call_node.func.value.id == 'self'
+    )
+
+def get_method_call(call_node: ast.Call) -> Optional[Tuple[str, str]]:
+    """
+    Get the receiver ("self", "cls" or "super") and the method name of a
+    `self.method(...)`, `cls.method(...)` or `super().method(...)` call.
+    """
+    func = call_node.func
+    if not isinstance(func, ast.Attribute):
+        return None
+    if isinstance(func.value, ast.Name) and func.value.id in ('self', 'cls'):
+        return func.value.id, func.attr
+    if (isinstance(func.value, ast.Call) and isinstance(func.value.func, ast.Name)
+            and func.value.func.id == 'super'):
+        return 'super', func.attr
+    return None
+
+def get_class_context(script, lineno, col_offset):
+    """Get the class context for a given position in the source code."""
+    # Get the context at the given position
+    context = script.get_context(lineno, col_offset)
+
+    # Walk up all the context hierarchy to find the class
+    while context:
+        if context.type == 'class':
+            return context
+        context = context.parent()
+    return None
+
+def get_full_name_of_call(script, call_node, definition_index=None):
+    """
+    Get the full name of a call node, handling `self`.
+    The class of `self` is looked up in `definition_index` when given, and with jedi otherwise.
+    """
+
+    # Handle self method calls
+    if is_self_call(call_node):
+
+        if definition_index is not None:
+            class_context = definition_index.get_enclosing_class(call_node.lineno, call_node.col_offset)
+        else:
+            class_context = get_class_context(script, call_node.lineno, call_node.col_offset)
+
+        if class_context:
+            # Construct the full name of the method
+            class_name = class_context.full_name
+            method_name = call_node.func.attr
+            return f"{class_name}.{method_name}"
+        else:
+            return None
+
+    # normal calls
+    else:
+        definitions = script.goto(call_node.lineno, call_node.col_offset, follow_imports=True)
+
+        if definitions:
+            return definitions[0].full_name
+
+    return None
+
+
+def get_leftmost_name(expression: ast.AST) -> Optional[ast.Name]:
+    """
+    Get the leftmost name of a chain of attributes, calls and subscripts,
+    e.g. `pd` for `pd.Timestamp.today().strftime`.
+    """
+    while isinstance(expression, (ast.Attribute, ast.Call, ast.Subscript)):
+        expression = expression.func if isinstance(expression, ast.Call) else expression.value
+    return expression if isinstance(expression, ast.Name) else None
+
+
+def resolve_base_class_names(script, base_class_names, lineno, col_offset):
+    """Resolve the full names of base classes using Jedi."""
+    resolved_base_classes = []
+
+    for base_class_name in base_class_names:
+        definitions = script.goto(lineno, col_offset, follow_imports=True)
+
+        for definition in definitions:
+            if definition.name == base_class_name:
+                resolved_base_classes.append(definition.full_name)
+                break
+
+    return resolved_base_classes
+
+
+class LazyScript:
+    """
+    Proxy of the jedi Script of a file, created on first use so files whose
+    calls are all resolved statically never pay for jedi's parse.
+    """
+
+    def __init__(self, source: str, path: str, project):
+        self.source = source
+        self.path = path
+        self.project = project
+        self._script = None
+
+    @property
+    def created(self) -> bool:
+        return self._script is not None
+
+    def __getattr__(self, name: str):
+        if self._script is None:
+            self._script = jedi.Script(self.source, path=self.path, project=self.project)
+        return getattr(self._script, name)
+
+    def fresh(self) -> jedi.Script:
+        """
+        Create a separate jedi Script of the file, with an inference state of its own.
+        """
+        return jedi.Script(self.source, path=self.path, project=self.project)
+
+
+class Scope:
+    """
+    Lexical scope of a module, class or function with the names bound in it.
+    """
+
+    __slots__ = ("kind", "qualname", "parent", "bindings", "binding_positions", "star_imports")
+
+    def __init__(self, kind: str, qualname: str, parent: Optional["Scope"] = None):
+        self.kind = kind
+        self.qualname = qualname
+        self.parent = parent
+        self.bindings: Dict[str, Binding] = {}
+        self.binding_positions: Dict[str, List[Tuple[int, int]]] = {}
+        self.star_imports: List[str] = []
+
+    def bind(self, name: str, binding: Binding, node: Optional[ast.AST] = None) -> None:
+        # Names bound more than once in different ways cannot be decided statically
+        previous = self.bindings.get(name)
+        self.bindings[name] = binding if previous in (None, binding) else AMBIGUOUS_BINDING
+        if node is not None:
+            bisect.insort(self.binding_positions.setdefault(name, []), (node.lineno, node.col_offset))
+
+    def binding_version(self, name: Optional[str], node: ast.AST) -> int:
+        """
+        Number of bindings of a name in this scope located before the given node.
+        """
+        positions = self.binding_positions.get(name)
+        return bisect.bisect_left(positions, (node.lineno, node.col_offset)) if positions else 0
+
+
+class ScopeAnalyzer(ast.NodeVisitor):
+    """
+    Single pass over a module AST recording the bindings of every scope and the
+    innermost scope of every call node.
+    """
+
+    def __init__(self, module_name: str, is_package: bool = False):
+        self.module_name = module_name
+        self.package_parts = module_name.split(".") if is_package else module_name.split(".")[:-1]
+        self.module_scope = Scope("module", module_name)
+        self.scope = self.module_scope
+        self.class_scopes: Dict[str, Scope] = {}
+        self.class_base_scopes: Dict[str, Scope] = {}
+        self.call_scopes: Dict[int, Scope] = {}
+
+    def analyze(self, tree: ast.AST) -> "ScopeAnalyzer":
+        self.visit(tree)
+        return self
+
+    def _resolve_import_base(self, node: ast.ImportFrom) -> str:
+        if not node.level:
+            return node.module or ""
+        base_parts = self.package_parts[:len(self.package_parts) - (node.level - 1)]
+        if node.module:
+            base_parts = base_parts + node.module.split(".")
+        return ".".join(base_parts)
+
+    def _visit_in_scope(self, scope: Scope, nodes: List[ast.AST]) -> None:
+        parent_scope = self.scope
+        self.scope = scope
+        for node in nodes:
+            self.visit(node)
+        self.scope = parent_scope
+
+    def _bind_arguments(self, scope: Scope, arguments: ast.arguments) -> None:
+        for arg in [*arguments.posonlyargs, *arguments.args, *arguments.kwonlyargs,
+                    arguments.vararg, arguments.kwarg]:
+            if arg is not None:
+                scope.bind(arg.arg, OTHER_BINDING, arg)
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
+        qualname = f"{self.scope.qualname}.{node.name}"
+        self.scope.bind(node.name, ("def", qualname), node)
+        # Decorators, defaults and annotations are evaluated in the enclosing scope
+        for child in [*node.decorator_list, *node.args.defaults, *node.args.kw_defaults, node.returns]:
+            if child is not None:
+                self.visit(child)
+
+        function_scope = Scope("function", qualname, self.scope)
+        self._bind_arguments(function_scope, node.args)
+        self._visit_in_scope(function_scope, node.body)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Lambda(self, node: ast.Lambda) -> None:
+        for child in [*node.args.defaults, *node.args.kw_defaults]:
+            if child is not None:
+                self.visit(child)
+        lambda_scope = Scope("function", self.scope.qualname, self.scope)
+        self._bind_arguments(lambda_scope, node.args)
+        self._visit_in_scope(lambda_scope, [node.body])
+
+    def visit_ListComp(self, node: ast.AST) -> None:
+        comprehension_scope = Scope("comprehension", self.scope.qualname, self.scope)
+        self._visit_in_scope(comprehension_scope, list(ast.iter_child_nodes(node)))
+
+    visit_SetComp = visit_GeneratorExp = visit_DictComp = visit_ListComp
+
+    def visit_NamedExpr(self, node: ast.NamedExpr) -> None:
+        # Assignment expressions bind in the enclosing non-comprehension scope
+        scope = self.scope
+        while scope.kind == "comprehension":
+            scope = scope.parent
+        scope.bind(node.target.id, OTHER_BINDING, node)
+        self.visit(node.value)
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        qualname = f"{self.scope.qualname}.{node.name}"
+        self.scope.bind(node.name, ("def", qualname), node)
+        for child in [*node.decorator_list, *node.bases, *node.keywords]:
+            self.visit(child)
+
+        class_scope = Scope("class", qualname, self.scope)
+        self.class_scopes[qualname] = class_scope
+        self.class_base_scopes[qualname] = self.scope
+        self._visit_in_scope(class_scope, node.body)
+
+    def visit_Import(self, node: ast.Import) -> None:
+        for alias in node.names:
+            if alias.asname:
+                self.scope.bind(alias.asname, ("import", alias.name), node)
+            else:
+                root_name = alias.name.split(".")[0]
+                self.scope.bind(root_name, ("import", root_name), node)
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        base = self._resolve_import_base(node)
+        for alias in node.names:
+            if alias.name == "*":
+                self.scope.star_imports.append(base)
+            else:
+                target = f"{base}.{alias.name}" if base else alias.name
+                self.scope.bind(alias.asname or alias.name, ("import", target), node)
+
+    def visit_Name(self, node: ast.Name) -> None:
+        if not isinstance(node.ctx, ast.Load):
+            self.scope.bind(node.id, OTHER_BINDING, node)
+
+    def visit_Global(self, node: ast.Global) -> None:
+        for name in node.names:
+            self.scope.bind(name, AMBIGUOUS_BINDING, node)
+
+    visit_Nonlocal = visit_Global
+
+    def visit_ExceptHandler(self, node: ast.ExceptHandler) -> None:
+        if node.name:
+            self.scope.bind(node.name, OTHER_BINDING, node)
+        self.generic_visit(node)
+
+    def visit_MatchAs(self, node: ast.MatchAs) -> None:
+        if node.name:
+            self.scope.bind(node.name, OTHER_BINDING, node)
+        self.generic_visit(node)
+
+    visit_MatchStar = visit_MatchAs
+
+    def visit_MatchMapping(self, node: ast.MatchMapping) -> None:
+        if node.rest:
+            self.scope.bind(node.rest, OTHER_BINDING, node)
+        self.generic_visit(node)
+
+    def visit_Call(self, node: ast.Call) -> None:
+        self.call_scopes[id(node)] = self.scope
+        self.generic_visit(node)
+
+
+class ProjectSymbolTable:
+    """
+    Project-wide table of the names bound at module level and in class bodies.
+
+    It is built once from the AST of every project module and resolves dotted
+    names through import aliases, package re-exports and star imports with plain
+    dictionary lookups. The table only holds builtin types, so it can be sent
+    to the parsing worker processes.
+    """
+
+    def __init__(self, project_packages: FrozenSet[str]):
+        self.project_packages = project_packages
+        self.modules: Dict[str, Dict[str, Binding]] = {}
+        self.star_imports: Dict[str, List[str]] = {}
+        self.classes: Dict[str, Dict[str, Binding]] = {}
+
+    def add_module(self, module_name: str, tree: ast.AST, is_package: bool = False) -> None:
+        """
+        Record the module-level and class-level bindings of a module.
+        """
+        analyzer = ScopeAnalyzer(module_name, is_package=is_package).analyze(tree)
+        self.modules[module_name] = analyzer.module_scope.bindings
+        self.star_imports[module_name] = analyzer.module_scope.star_imports
+        for qualname, class_scope in analyzer.class_scopes.items():
+            self.classes[qualname] = class_scope.bindings
+
+    def lookup(self, module_name: str, name: str, depth: int = 0) -> Optional[Binding]:
+        """
+        Look up a name bound at the top level of a module, following its star imports.
+        """
+        binding = self.modules[module_name].get(name)
+        if binding is not None or name.startswith("_") or depth > MAX_RESOLUTION_DEPTH:
+            return binding
+        for star_module in self.star_imports.get(module_name, []):
+            if star_module not in self.modules:
+                return None
+            binding = self.lookup(star_module, name, depth + 1)
+            if binding is not None:
+                return binding
+        return None
+
+    def resolve(self, dotted_name: str, depth: int = 0) -> Optional[str]:
+        """
+        Resolve a dotted name to the full name of its definition.
+
+        Names outside the project are returned unchanged. None is returned when the
+        name cannot be decided statically, e.g. it is bound by an assignment.
+        """
+        if depth > MAX_RESOLUTION_DEPTH:
+            return None
+
+        # Longest dotted prefix that is a project module
+        parts = dotted_name.split(".")
+        for i in range(len(parts), 0, -1):
+            module_name = ".".join(parts[:i])
+            if module_name in self.modules:
+                break
+        else:
+            return None if parts[0] in self.project_packages else dotted_name
+
+        attributes = parts[i:]
+        if not attributes:
+            return module_name
+
+        binding = self.lookup(module_name, attributes[0])
+        if binding is None:
+            return None
+        return self.resolve_binding(binding, attributes[1:], depth)
+
+    def resolve_binding(self, binding: Binding, attributes: List[str], depth: int = 0) -> Optional[str]:
+        """
+        Resolve the attributes accessed on a bound name to the full name of their definition.
+        """
+        if binding[0] == "import":
+            return self.resolve(".".join([binding[1], *attributes]), depth + 1)
+        if binding[0] != "def":
+            return None
+
+        full_name = binding[1]
+        for attribute in attributes:
+            # Only members defined in the class body itself are decided, not inherited ones
+            member = self.classes.get(full_name, {}).get(attribute)
+            if member is None or member[0] != "def":
+                return None
+            full_name = member[1]
+        return full_name
+
+
+class CallResolver:
+    """
+    Resolves the full name of the definition targeted by each call of a file.
+    """
+
+    name = ""
+
+    def resolve(self, call_node: ast.Call, stats: Counter) -> Optional[str]:
+        raise NotImplementedError
+
+    def resolve_base(self, class_id: str, base: ast.AST, stats: Counter) -> List[str]:
+        """
+        Resolve the full name of a base class expression (`Name` or `Attribute`) of a class.
+        """
+        raise NotImplementedError
+
+
+class JediCallResolver(CallResolver):
+    """
+    Resolves every call with jedi, one `goto` per call site. The class of
+    `self.method(...)` calls is looked up in the definition interval index of
+    the file (see `SourceIndex`) when given, or with jedi otherwise.
+    """
+
+    name = "jedi"
+
+    def __init__(self, script, definition_index=None):
+        self.script = script
+        self.definition_index = definition_index
+
+    def resolve(self, call_node: ast.Call, stats: Counter) -> Optional[str]:
+        if not is_self_call(call_node):
+            stats["goto_calls"] += 1
+        return get_full_name_of_call(self.script, call_node, self.definition_index)
+
+    def resolve_base(self, class_id: str, base: ast.AST, stats: Counter) -> List[str]:
+        stats["goto_calls"] += 1
+        base_class_name = base.id if isinstance(base, ast.Name) else base.attr
+        return resolve_base_class_names(self.script, [base_class_name], base.lineno, base.col_offset)
+
+    def resolve_attribute(self, call_node: ast.Call, stats: Counter) -> Optional[str]:
+        """
+        Resolve a `receiver.attribute(...)` call at the position of the attribute, so
+        that jedi infers the type of the receiver instead of going to its definition.
+        """
+        stats["goto_calls"] += 1
+        func = call_node.func
+        # Inferring an attribute of `self` or `cls` infers the attributes of the whole class,
+        # and jedi memoizes partial results when it hits its inference limits, in an order
+        # that depends on string hashing. A separate inference state keeps the result stable
+        receiver = get_leftmost_name(func)
+        script = self.script.fresh() if receiver is not None and receiver.id in ("self", "cls") else self.script
+        definitions = script.goto(func.end_lineno, func.end_col_offset - len(func.attr), follow_imports=True)
+        return definitions[0].full_name if definitions else None
+
+
+class StaticCallResolver(CallResolver):
+    """
+    Resolves `name(...)`, `module.name(...)`, `Class(...)` and `self.method(...)`
+    calls through the scopes of the file and the project symbol table, and falls
+    back to jedi for the calls it cannot decide: ambiguous or unknown names, names
+    the symbol table cannot follow, calls chained after the leftmost one and calls
+    of the attributes of a local variable or argument, such as `forecaster.fit(...)`,
+    which jedi resolves by inferring the type of the variable. Calls of the variable
+    itself are decided without a target.
+    """
+
+    name = "static"
+
+    def __init__(self, script, scopes: ScopeAnalyzer, symbol_table: ProjectSymbolTable, definition_index=None):
+        self.symbol_table = symbol_table
+        self.fallback = JediCallResolver(script, definition_index=definition_index)
+        self.call_scopes = scopes.call_scopes
+        self.class_base_scopes = scopes.class_base_scopes
+
+    def resolve(self, call_node: ast.Call, stats: Counter) -> Optional[str]:
+        scope = self.call_scopes.get(id(call_node))
+        resolved, full_name = self._resolve_static(call_node, scope) if scope else (False, None)
+        if resolved:
+            stats["static_resolved"] += 1
+            return full_name
+        stats["static_fallbacks"] += 1
+        if scope and self._has_local_receiver(call_node, scope):
+            return self.fallback.resolve_attribute(call_node, stats)
+        return self.fallback.resolve(call_node, stats)
+
+    def resolve_base(self, class_id: str, base: ast.AST, stats: Counter) -> List[str]:
+        scope = self.class_base_scopes.get(class_id)
+        resolved, full_name = (self._resolve_expression(base, scope, (base.lineno, base.col_offset))
+                               if scope else (False, None))
+        if resolved:
+            stats["static_resolved"] += 1
+            return [full_name] if full_name else []
+        stats["static_fallbacks"] += 1
+        return self.fallback.resolve_base(class_id, base, stats)
+
+    def _resolve_static(self, call_node: ast.Call, scope: Scope) -> Tuple[bool, Optional[str]]:
+        """
+        Return whether the call could be decided, and the full name of its target.
+        """
+        # Same convention as the jedi resolver: the method of the innermost enclosing class
+        if is_self_call(call_node):
+            while scope and scope.kind != "class":
+                scope = scope.parent
+            return True, f"{scope.qualname}.{call_node.func.attr}" if scope else None
+
+        return self._resolve_expression(call_node.func, scope, (call_node.lineno, call_node.col_offset))
+
+    def _has_local_receiver(self, call_node: ast.Call, scope: Scope) -> bool:
+        """
+        Whether the call is an attribute call whose leftmost name is a local variable or argument.
+        """
+        receiver = get_leftmost_name(call_node.func) if isinstance(call_node.func, ast.Attribute) else None
+        return receiver is not None and self._lookup_name(receiver.id, scope) == OTHER_BINDING
+
+    def _resolve_expression(self, expression: ast.AST, scope: Scope,
+                            position: Tuple[int, int]) -> Tuple[bool, Optional[str]]:
+        """
+        Return whether an expression evaluated in `scope` could be decided, and the
+        full name of the definition it refers to.
+        """
+        # Walk down to the leftmost name of the expression
+        attributes = []
+        only_attributes = True
+        func = expression
+        while isinstance(func, (ast.Attribute, ast.Call, ast.Subscript)):
+            if isinstance(func, ast.Attribute):
+                attributes.insert(0, func.attr)
+                func = func.value
+            else:
+                only_attributes = False
+                func = func.func if isinstance(func, ast.Call) else func.value
+        if not isinstance(func, ast.Name):
+            return False, None
+
+        binding = self._lookup_name(func.id, scope)
+        if binding is None:
+            if func.id not in BUILTIN_NAMES:
+                return False, None
+            return True, ".".join(["builtins", func.id, *attributes]) if only_attributes else None
+        if binding == AMBIGUOUS_BINDING:
+            return False, None
+        # Local variables and arguments never resolve to a definition, but the type of
+        # the object they hold may, which jedi infers for calls of its attributes
+        if binding == OTHER_BINDING:
+            return not attributes, None
+
+        if only_attributes:
+            full_name = self.symbol_table.resolve_binding(binding, attributes)
+            return full_name is not None, full_name
+
+        # The jedi resolver resolves the name at the call position, i.e. the leftmost
+        # name of chained calls such as `Forecaster(...).fit(...)`
+        if (func.lineno, func.col_offset) != position:
+            return False, None
+        full_name = self.symbol_table.resolve_binding(binding, [])
+        return full_name is not None, full_name
+
+    def _lookup_name(self, name: str, scope: Scope) -> Optional[Binding]:
+        """
+        Look up a name following the Python scoping rules: class bodies are only
+        visible from the class body itself, not from the functions nested in it.
+        """
+        innermost = True
+        while scope is not None:
+            if scope.kind != "class" or innermost:
+                binding = scope.bindings.get(name)
+                if binding is not None:
+                    return binding
+            if scope.kind == "module" and scope.star_imports:
+                # Names that may come from a star import are only decided through the table
+                for star_module in scope.star_imports:
+                    if star_module not in self.symbol_table.modules:
+                        return OTHER_BINDING
+                    binding = self.symbol_table.lookup(star_module, name)
+                    if binding is not None:
+                        return binding
+            innermost = False
+            scope = scope.parent
+        return None
+
+
+class MemoizedCallResolver(CallResolver):
+    """
+    Memoizes the results of another resolver for the duration of a file.
+
+    Results are keyed by the source text of the callee and the scope binding its
+    leftmost name, so calls of a module-level function from different methods
+    share one entry. Names bound in the scope of the call itself are also keyed
+    by the number of their bindings before the call, so a local rebinding starts
+    a new entry, and `self.method(...)` calls are keyed by their class.
+    """
+
+    def __init__(self, resolver: CallResolver, scopes: ScopeAnalyzer):
+        self.resolver = resolver
+        self.name = resolver.name
+        self.call_scopes = scopes.call_scopes
+        self.memo: Dict[Tuple[int, str, int], Optional[str]] = {}
+
+    def _memo_key(self, call_node: ast.Call, scope: Scope) -> Tuple[int, str, int]:
+        callee = ast.unparse(call_node.func)
+        if is_self_call(call_node):
+            while scope.parent is not None and scope.kind != "class":
+                scope = scope.parent
+            return id(scope), callee, -1
+
+        root = get_leftmost_name(call_node.func)
+        if root is None:
+            return id(scope), callee, scope.binding_version(None, call_node)
+        # Module-level calls, including default arguments, have no enclosing scope to walk up to
+        if root.id in scope.bindings or scope.parent is None:
+            return id(scope), callee, scope.binding_version(root.id, call_node)
+
+        # Bindings of enclosing scopes do not depend on the position of the call
+        binding_scope = scope.parent
+        while binding_scope.parent is not None and (binding_scope.kind == "class" 
+                                                    or root.id not in binding_scope.bindings):
+            binding_scope = binding_scope.parent
+        return id(binding_scope), callee, -1
+
+    def resolve(self, call_node: ast.Call, stats: Counter) -> Optional[str]:
+        scope = self.call_scopes.get(id(call_node))
+        if scope is None:
+            return self.resolver.resolve(call_node, stats)
+
+        key = self._memo_key(call_node, scope)
+        if key in self.memo:
+            stats["memo_hits"] += 1
+            return self.memo[key]
+
+        stats["memo_misses"] += 1
+        full_name = self.memo[key] = self.resolver.resolve(call_node, stats)
+        return full_name
+
+    def resolve_base(self, class_id: str, base: ast.AST, stats: Counter) -> List[str]:
+        return self.resolver.resolve_base(class_id, base, stats)
@@ -1,10 +1,35 @@
 
 import ast
+import bisect
 import os
-import jedi      
+import re
+import sys
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
 from src.utils.config import logger
-from typing import List
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Set, Tuple
+from src.utils.call_resolvers import (
+    BUILTIN_NAMES,
+    CallResolver,
+    JediCallResolver,
+    LazyScript,
+    MemoizedCallResolver,
+    ProjectSymbolTable,
+    ScopeAnalyzer,
+    StaticCallResolver,
+    get_method_call
+)
+
+DEFINITION_NODE_TYPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+_LINE_BREAK_PATTERN = re.compile(rb"\r\n|\r|\n")
+
+# "all" resolves every call with jedi, "internal" skips the calls that can only
+# resolve to the standard library, site-packages or builtins
+CALL_RESOLUTION_MODES = ("all", "internal")
+# Backends resolving the target of each call, see src/utils/call_resolvers.py
+CALL_RESOLVERS = ("jedi", "static")
 
 
 def find_python_files(root: str):
@@ -22,6 +47,161 @@ def find_python_files(root: str):
         yield path
 
 
+@lru_cache(maxsize=None)
+def _is_package_dir(directory: Path) -> bool:
+    return (directory / "__init__.py").is_file()
+
+
+def get_module_name(path: Path) -> str:
+    """
+    Get the dotted module name of a Python file, walking up the parent
+    directories as long as they are packages (contain an __init__.py).
+    """
+    path = Path(path)
+    parts = [] if path.stem == "__init__" else [path.stem]
+    directory = path.parent
+    while _is_package_dir(directory) and directory != directory.parent:
+        parts.insert(0, directory.name)
+        directory = directory.parent
+    return ".".join(parts)
+
+
+def get_relative_module_name(path: Path, root: str) -> str:
+    """
+    Get the dotted module name of a Python file relative to a root folder, the
+    naming jedi uses for the definitions of a project.
+    """
+    parts = Path(os.path.abspath(path)).relative_to(os.path.abspath(root)).with_suffix("").parts
+    if parts and parts[-1] == "__init__":
+        parts = parts[:-1]
+    return ".".join(parts)
+
+
+def find_imported_modules(tree: ast.AST, module_name: str, is_package: bool = False) -> List[str]:
+    """
+    List the absolute names of every module a file may import, including the parent
+    packages of imported modules and `from` imported names that may be submodules.
+    Relative imports are resolved against `module_name`.
+    """
+    package_parts = module_name.split(".") if is_package else module_name.split(".")[:-1]
+    imported = set()
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            candidates = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                base_parts = package_parts[:len(package_parts) - (node.level - 1)]
+                if node.module:
+                    base_parts = base_parts + node.module.split(".")
+                base = ".".join(base_parts)
+            else:
+                base = node.module or ""
+            candidates = [base] if base else []
+            candidates.extend(f"{base}.{alias.name}" if base else alias.name
+                              for alias in node.names if alias.name != "*")
+        else:
+            continue
+
+        for candidate in candidates:
+            parts = candidate.split(".")
+            imported.update(".".join(parts[:i]) for i in range(1, len(parts) + 1))
+
+    return sorted(imported)
+
+
+def find_project_packages(project_root: str) -> FrozenSet[str]:
+    """
+    Get the top-level module names under which the project files can be imported,
+    both as packages (see `get_module_name`) and relative to the project root.
+    """
+    root_path = Path(project_root)
+    packages = set()
+    for path in root_path.rglob("*.py"):
+        packages.add(get_module_name(path).split(".")[0])
+        packages.add(path.relative_to(root_path).parts[0].removesuffix(".py"))
+    packages.discard("")
+    return frozenset(packages)
+
+
+def find_external_names(tree: ast.AST, project_packages: FrozenSet[str]) -> Set[str]:
+    """
+    Find the names of a module whose calls can only resolve outside the project.
+
+    These are the names imported from modules outside `project_packages` and the
+    builtins, as long as the module does not bind them anywhere else (assignment,
+    definition, argument or project import). Relative imports are always internal.
+    """
+    external = set()
+    bound = set()
+    has_internal_star_import = False
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                is_external = alias.name.split(".")[0] not in project_packages
+                (external if is_external else bound).add(alias.asname or alias.name.split(".")[0])
+        elif isinstance(node, ast.ImportFrom):
+            is_external = not node.level and (node.module or "").split(".")[0] not in project_packages
+            for alias in node.names:
+                if alias.name == "*":
+                    has_internal_star_import |= not is_external
+                    continue
+                (external if is_external else bound).add(alias.asname or alias.name)
+        elif isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+            bound.add(node.id)
+        elif isinstance(node, DEFINITION_NODE_TYPES):
+            bound.add(node.name)
+        elif isinstance(node, ast.arg):
+            bound.add(node.arg)
+        elif isinstance(node, (ast.ExceptHandler, ast.MatchAs, ast.MatchStar)) and node.name:
+            bound.add(node.name)
+        elif isinstance(node, ast.MatchMapping) and node.rest:
+            bound.add(node.rest)
+
+    # A star import from the project may shadow any builtin
+    if not has_internal_star_import:
+        external |= BUILTIN_NAMES
+    return external - bound
+
+
+def build_symbol_table(project_root: str, project_packages: Optional[FrozenSet[str]] = None) -> ProjectSymbolTable:
+    """
+    Build the symbol table of every module under the project root, packages included.
+
+    Modules are registered under their name relative to the project root, which
+    prefixes the definition ids, and under their package-derived name.
+    """
+    symbol_table = ProjectSymbolTable(project_packages or find_project_packages(project_root))
+    for path in Path(project_root).rglob("*.py"):
+        module_name = get_relative_module_name(path, project_root)
+        if not module_name or module_name in symbol_table.modules:
+            continue
+        try:
+            tree = ast.parse(path.read_bytes(), filename=str(path))
+        except (SyntaxError, ValueError, OSError) as e:
+            logger.warning(f"Skipping {path} in the symbol table: {e}")
+            continue
+        symbol_table.add_module(module_name, tree, is_package=path.stem == "__init__")
+
+        package_module_name = get_module_name(path)
+        if package_module_name and package_module_name not in symbol_table.modules:
+            symbol_table.modules[package_module_name] = symbol_table.modules[module_name]
+            symbol_table.star_imports[package_module_name] = symbol_table.star_imports[module_name]
+
+    return symbol_table
+
+
+def get_call_root_name(call_node: ast.Call) -> Optional[str]:
+    """
+    Get the root name of the called expression, e.g. `np` for `np.linalg.norm(x)`.
+    """
+    func = call_node.func
+    while isinstance(func, ast.Attribute):
+        func = func.value
+    return func.id if isinstance(func, ast.Name) else None
+
+
 def parse_source(source: str, filename: str):
     """
     Parse Python source code into an AST.
@@ -32,69 +212,166 @@ def parse_source(source: str, filename: str):
         logger.error(f"Syntax error in {filename}: {e}")
         raise
 
-def get_parent_id(definition):
-    try:
-        parent = definition.parent()
-        if parent is not None and parent.type in ('function', 'class'):
-            parent_id = parent.full_name
-        else:
-            parent_id = None
-    except Exception as e:
-        print(f"Error getting parent for {definition.name}: {e}")
-        parent_id = None
-    finally:
-        return parent, parent_id
-
-def get_definitions_info(defs,tree, source, file_path):
+@dataclass(slots=True)
+class DefinitionRecord:
+    """
+    Definition of a function, method or class as stored by the graph builder.
+
+    Records keep no reference to jedi or to the AST, so the parse trees of a file
+    can be freed once it is processed. Identifiers and file paths are interned, as
+    they are repeated in the records of every definition of a file and in the
+    `parent_id` and `inherits_from` of other records.
+    """
+    id: str
+    name: str
+    type: str
+    file: str
+    line: int
+    code: str = ""
+    docstring: str = ""
+    inherits_from: List[str] = field(default_factory=list)
+    parent_id: Optional[str] = None
+
+    def __post_init__(self):
+        self.id = sys.intern(self.id)
+        self.name = sys.intern(self.name)
+        self.type = sys.intern(self.type)
+        self.file = sys.intern(self.file)
+        self.inherits_from = [sys.intern(base) for base in self.inherits_from]
+        if self.parent_id is not None:
+            self.parent_id = sys.intern(self.parent_id)
+
+    def to_dict(self) -> Dict:
+        """Return the record as a dictionary, as used for graph node attributes and the parse cache."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "DefinitionRecord":
+        return cls(**data)
+
+
+class DefinitionRange(NamedTuple):
+    """Source range of a function or class definition in the interval index."""
+    full_name: str
+    type: str
+    start: Tuple[int, int]
+    end: Tuple[int, int]
+    parent: int
+    node: ast.AST
+
+
+class SourceIndex:
+    """
+    Index of a parsed module built in a single pass over the AST.
+
+    Maps every function, method and class definition to its AST node by
+    `(name, lineno)` and keeps a line-offset table of the source, so code
+    segments can be sliced without re-splitting the whole source per lookup.
+
+    It also keeps an interval index of the definition ranges sorted by start
+    position, each with the index of its parent definition, so the innermost
+    definition enclosing a position is found with a binary search followed by
+    a walk up the (short) parent chain, without querying jedi.
+    """
+
+    def __init__(self, tree: Optional[ast.AST], source: str, module_name: str = ""):
+        self.definition_nodes: Dict[Tuple[str, int], ast.AST] = {}
+        self.definition_ranges: List[DefinitionRange] = []
+        if tree is not None:
+            self._index_definitions(tree, module_name, parent=-1)
+        self._range_starts = [definition_range.start for definition_range in self.definition_ranges]
+
+        # AST column offsets are UTF-8 byte offsets, so offsets are kept in bytes
+        self._source_bytes = source.encode("utf-8")
+        self._line_offsets = [0]
+        self._line_offsets.extend(match.end() for match in _LINE_BREAK_PATTERN.finditer(self._source_bytes))
+
+    def _index_definitions(self, node: ast.AST, qualname: str, parent: int) -> None:
+        # Children are visited in source order, so ranges are appended sorted by start
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, DEFINITION_NODE_TYPES):
+                self.definition_nodes.setdefault((child.name, child.lineno), child)
+                child_qualname = f"{qualname}.{child.name}" if qualname else child.name
+                self.definition_ranges.append(DefinitionRange(
+                    full_name=child_qualname,
+                    type="class" if isinstance(child, ast.ClassDef) else "function",
+                    start=(child.lineno, child.col_offset),
+                    end=(child.end_lineno, child.end_col_offset),
+                    parent=parent,
+                    node=child
+                ))
+                self._index_definitions(child, child_qualname, len(self.definition_ranges) - 1)
+            else:
+                self._index_definitions(child, qualname, parent)
+
+    def get_definition_node(self, name: str, lineno: int) -> Optional[ast.AST]:
+        """Return the function or class node defined with `name` at `lineno`, if any."""
+        return self.definition_nodes.get((name, lineno))
+
+    def get_enclosing_definition(self, lineno: int, col_offset: int) -> Optional[DefinitionRange]:
+        """Return the innermost function or class definition enclosing a position, if any."""
+        position = (lineno, col_offset)
+        i = bisect.bisect_right(self._range_starts, position) - 1
+        while i >= 0:
+            definition_range = self.definition_ranges[i]
+            if position < definition_range.end:
+                return definition_range
+            i = definition_range.parent
+        return None
+
+    def get_enclosing_class(self, lineno: int, col_offset: int) -> Optional[DefinitionRange]:
+        """Return the innermost class definition enclosing a position, if any."""
+        definition_range = self.get_enclosing_definition(lineno, col_offset)
+        while definition_range is not None and definition_range.type != "class":
+            definition_range = (self.definition_ranges[definition_range.parent]
+                                if definition_range.parent >= 0 else None)
+        return definition_range
+
+    def get_source_segment(self, node: ast.AST) -> Optional[str]:
+        """Equivalent of `ast.get_source_segment` using the precomputed line offsets."""
+        try:
+            if node.end_lineno is None or node.end_col_offset is None:
+                return None
+            start = self._line_offsets[node.lineno - 1] + node.col_offset
+            end = self._line_offsets[node.end_lineno - 1] + node.end_col_offset
+        except (AttributeError, IndexError):
+            return None
+        return self._source_bytes[start:end].decode("utf-8")
+
+
+def get_definitions_info(index: SourceIndex, file_path: str) -> Dict[str, DefinitionRecord]:
+    """
+    Build the definition records of a file from the definitions of its source index.
+    Definitions redefined with the same qualified name keep the last one, like jedi.
+    """
     definitions = {}
 
-    for d in defs:
-        # Consider only functions, methods and classes
-        if d.type in ('function', 'class') and d.full_name:
-
-            # Get parent id for nested relationships
-            parent, parent_id = get_parent_id(d)
-
-            # Determine if the function is actually a method
-            node_type = ("method" if ((d.type == "function") and (parent.type == "class"))
-                         else d.type)
-
-            # Extract source code of the definition
-            code_segment = ""
-            docstring = ""
-            inherits_from = []
-            # Walk tree until definition is found with ast
-            if tree is not None:
-                for node in ast.walk(tree):
-                    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)) and node.name == d.name and node.lineno == d.line:
-                        code_segment = ast.get_source_segment(source, node)
-                        docstring = d.docstring()
-
-                        # Capture inheritance information for classes
-                        add_node_inheritance(node=node, 
-                                            inheritance_list=inherits_from)
-                        
-                        break
-            
-            # For methods, include class name in its name
-            # node_name = ".".join(d.full_name.split(".")[-2]) if node_type == "method" else d.name
-            node_name = d.name
-            if node_type == "method":
-                node_name = ".".join([parent.name, d.name])
-            
-            # Save the extracted information in the dictionary
-            definitions[d.full_name] = {
-                'id': d.full_name,
-                'name': node_name,
-                'type': node_type,
-                'file': file_path,
-                'line': d.line,
-                'code': code_segment,
-                'docstring': docstring,
-                'definition': d,
-                'inherits_from': inherits_from,
-                'parent_id': parent_id
-            }
+    for definition_range in index.definition_ranges:
+        node = definition_range.node
+        parent = index.definition_ranges[definition_range.parent] if definition_range.parent >= 0 else None
+
+        # Determine if the function is actually a method
+        node_type = ("method" if definition_range.type == "function" and parent and parent.type == "class"
+                     else definition_range.type)
+
+        # Capture inheritance information for classes
+        inherits_from = []
+        add_node_inheritance(node=node, inheritance_list=inherits_from)
+
+        # For methods, include class name in its name
+        node_name = f"{parent.node.name}.{node.name}" if node_type == "method" else node.name
+
+        definitions[definition_range.full_name] = DefinitionRecord(
+            id=definition_range.full_name,
+            name=node_name,
+            type=node_type,
+            file=file_path,
+            line=node.lineno,
+            code=index.get_source_segment(node) or "",
+            docstring=ast.get_docstring(node) or "",
+            inherits_from=inherits_from,
+            parent_id=parent.full_name if parent else None
+        )
 
     return definitions
 
@@ -107,22 +384,6 @@ def add_node_inheritance(node: ast.ClassDef, inheritance_list: List) -> None:
                 inheritance_list.append(base.attr)
 
 
-def resolve_base_class_names(script, base_class_names, lineno, col_offset):
-    """Resolve the full names of base classes using Jedi."""
-    resolved_base_classes = []
-
-    for base_class_name in base_class_names:
-        definitions = script.goto(lineno, col_offset, follow_imports=True)
-
-        for definition in definitions:
-            if definition.name == base_class_name:
-                resolved_base_classes.append(definition.full_name)
-                break
-
-    return resolved_base_classes
-
-
-
 def find_call_nodes(tree):
     """Find all call nodes in the AST."""
     call_nodes = []
@@ -133,47 +394,6 @@ def find_call_nodes(tree):
 
     return call_nodes
 
-def get_class_context(script, lineno, col_offset):
-    """Get the class context for a given position in the source code."""
-    # Get the context at the given position
-    context = script.get_context(lineno, col_offset)
-    
-    # Walk up all the context hierarchy to find the class
-    while context:
-        if context.type == 'class':
-            return context
-        context = context.parent()
-    return None
-
-def get_full_name_of_call(script, call_node):
-    """Get the full name of a call node, handling `self`."""
-
-    # Handle self method calls
-    if (
-        isinstance(call_node.func, ast.Attribute)
-        and isinstance(call_node.func.value, ast.Name)
-        and call_node.func.value.id == 'self'
-    ):
-
-        class_context = get_class_context(script, call_node.lineno, call_node.col_offset) 
-
-        if class_context:
-            # Construct the full name of the method
-            class_name = class_context.full_name
-            method_name = call_node.func.attr
-            return f"{class_name}.{method_name}"
-        else:
-            return None
-        
-    # normal calls
-    else:
-        definitions = script.goto(call_node.lineno, call_node.col_offset, follow_imports=True)
-
-        if definitions:
-            return definitions[0].full_name
-
-    return None
-
 def get_enclosing_definition(script, lineno, col_offset):
     """
     Use Jedi to determine the innermost definition (function or class)
@@ -189,25 +409,70 @@ def get_enclosing_definition(script, lineno, col_offset):
         return None
     return None
 
-def get_call_pair_id(call_nodes_list, script):
+def get_call_pair_id(call_nodes_list, script, resolver: Optional[CallResolver] = None,
+                     external_names: Optional[Set[str]] = None, stats: Optional[Counter] = None,
+                     index: Optional[SourceIndex] = None):
+    """
+    Resolve the caller and callee of each call node.
+
+    Callers are looked up in the interval index of `index` when given, and with jedi
+    otherwise. Callees are resolved by `resolver`, jedi by default. Calls whose root
+    name is in `external_names` cannot target a project definition, so they are skipped.
+
+    With an index, `self.`, `cls.` and `super()` calls are recorded with the enclosing
+    class (`self_class`) and the method name (`attr`) instead, so they can be resolved
+    through the class hierarchy once every definition of the project is known.
+    """
     call_pairs_list = []
+    resolver = resolver or JediCallResolver(script, definition_index=index)
+    external_names = external_names or set()
+    stats = stats if stats is not None else Counter()
 
     for call_node in call_nodes_list:
-        caller_context = get_enclosing_definition(script, call_node.lineno, call_node.col_offset) # Context calling the function
+        if get_call_root_name(call_node) in external_names:
+            stats["goto_avoided"] += 1
+            continue
+
+        # Context calling the function
+        if index is not None:
+            caller_context = index.get_enclosing_definition(call_node.lineno, call_node.col_offset)
+        else:
+            caller_context = get_enclosing_definition(script, call_node.lineno, call_node.col_offset)
         if not caller_context:
             continue
 
-        called_function_id = get_full_name_of_call(script, call_node)
+        method_call = get_method_call(call_node) if index is not None else None
+        if method_call:
+            receiver, attribute = method_call
+            class_context = index.get_enclosing_class(call_node.lineno, call_node.col_offset)
+            if class_context:
+                stats["method_calls"] += 1
+                # The enclosing class is kept as candidate for methods not found in the hierarchy
+                call_pairs_list.append({
+                    "caller_id": caller_context.full_name,
+                    "candidate_id": f"{class_context.full_name}.{attribute}" if receiver != "super" else None,
+                    "self_class": class_context.full_name,
+                    "attr": attribute,
+                    "super": receiver == "super"
+                })
+                continue
+
+        called_function_id = resolver.resolve(call_node, stats)
 
         call_pairs_list.append({"caller_id":caller_context.full_name, "candidate_id":called_function_id})
     
     return call_pairs_list
 
 
-def get_definitions_relationships(source, tree, file_path, project):
+def get_definitions_relationships(source, tree, file_path, project,
+                                  project_packages: Optional[FrozenSet[str]] = None,
+                                  symbol_table: Optional[ProjectSymbolTable] = None,
+                                  stats: Optional[Counter] = None):
     """
-    Extract definitions (functions, classes, and methods) and relationships (nested in, calls, and inheritance) from a file using Jedi.
-    Returns a dictionary mapping a unique ID to another dictionary containing:
+    Extract definitions (functions, classes, and methods) and relationships (nested in, calls, and inheritance) from a file.
+    When `project_packages` is given, only calls that may resolve inside the project are resolved.
+    When `symbol_table` is given, calls are resolved statically and jedi is only used as a fallback.
+    Returns a dictionary mapping a unique ID to a `DefinitionRecord` containing:
       - id: Unique identifier for the definition
       - name: The name of the function, class, or method
       - type: Type ('class', 'function', or 'method')
@@ -215,40 +480,36 @@ def get_definitions_relationships(source, tree, file_path, project):
       - line: Line number of the definition
       - code: Source code segment for the definition
     """
-    definitions = {}
-
-    # Use Jedi to extract all definitions in the source code
-    script = jedi.Script(source, path=file_path, project=project)
-    defs = script.get_names(all_scopes=True, definitions=True, references=False)
-    
-    definitions = get_definitions_info(defs=defs, tree=tree, source=source, file_path=file_path)
+    stats = stats if stats is not None else Counter()
+    # Definitions come from a single pass over the AST, jedi is only parsed if a
+    # call or base class cannot be resolved statically
+    script = LazyScript(source, path=file_path, project=project)
+    module_name = get_relative_module_name(Path(file_path), project.path)
+    index = SourceIndex(tree, source, module_name)
+    definitions = get_definitions_info(index=index, file_path=file_path)
+
+    scopes = ScopeAnalyzer(module_name).analyze(tree)
+    if symbol_table is not None:
+        resolver = StaticCallResolver(script, scopes, symbol_table, definition_index=index)
+    else:
+        resolver = JediCallResolver(script, definition_index=index)
+    resolver = MemoizedCallResolver(resolver, scopes)
 
     # Resolve inheritance relationships
-    for def_id, info in definitions.items():
-        if info['type'] == 'class' and info['inherits_from']:
-            # Find the AST node for the class definition
-            for node in ast.walk(tree):
-                if isinstance(node, ast.ClassDef) and node.name == info['name'] and node.lineno == info['line']:
-                    # Extract the correct lineno and col_offset for the base class
-                    for base in node.bases:
-                        if isinstance(base, ast.Name):
-                            base_class_name = base.id
-                            lineno = base.lineno
-                            col_offset = base.col_offset
-                        elif isinstance(base, ast.Attribute):
-                            base_class_name = base.attr
-                            lineno = base.lineno
-                            col_offset = base.col_offset
-                        else:
-                            continue
-
-                        # Resolve the base class name
-                        resolved_base_classes = resolve_base_class_names(script, [base_class_name], lineno, col_offset)
-                        info['inherits_from'].extend(resolved_base_classes)
-                    break
+    for def_id, record in definitions.items():
+        if record.type == 'class' and record.inherits_from:
+            node = index.get_definition_node(record.name, record.line)
+            for base in node.bases:
+                if isinstance(base, (ast.Name, ast.Attribute)):
+                    record.inherits_from.extend(sys.intern(base_class)
+                                                for base_class in resolver.resolve_base(def_id, base, stats))
 
     call_ast_nodes = find_call_nodes(tree)
 
-    call_pairs_list = get_call_pair_id(call_ast_nodes, script)   
+    external_names = find_external_names(tree, project_packages) if project_packages is not None else None
+    call_pairs_list = get_call_pair_id(call_ast_nodes, script, resolver=resolver,
+                                       external_names=external_names, stats=stats, index=index)
+    if script.created:
+        stats["jedi_scripts"] += 1
 
     return definitions, call_pairs_list
\ No newline at end of file
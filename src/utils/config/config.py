@@ -28,14 +28,46 @@ config = {
     "VECTOR_SOURCE_PROPERTY_DOCS": "docstring",
     "VECTOR_EMBEDDING_PROPERTY": "code_embedding",
 
+    # Embeddings: "openai" or the offline "hashing" provider, used both for indexing and querying
+    "EMBEDDING_PROVIDER": os.getenv("EMBEDDING_PROVIDER", "openai"),
+    "EMBEDDING_MODEL": os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002"),
+    "EMBEDDING_ENDPOINT": os.getenv("EMBEDDING_ENDPOINT", "https://api.openai.com/v1"),
+    "EMBEDDING_DIMENSIONS": int(os.getenv("EMBEDDING_DIMENSIONS")) if os.getenv("EMBEDDING_DIMENSIONS") else None,
+    "EMBEDDING_BATCH_SIZE": int(os.getenv("EMBEDDING_BATCH_SIZE", 100)),
+    "EMBEDDING_CONCURRENCY": int(os.getenv("EMBEDDING_CONCURRENCY", 4)),
+    "EMBEDDING_CACHE_PATH": os.getenv("EMBEDDING_CACHE_PATH") or (Path("/tmp/cache/embeddings.sqlite") if os.getenv("AWS_EXECUTION_ENV") else Path(os.getenv("PROJECT_ROOT_FOLDER", str(BASE_DIR.parent.parent.parent.parent))) / "tmp" / "embeddings.sqlite"),
+
     # Retrieval prompts
     "ROUTER_PROMPT": prompts.get("ROUTER_PROMPT", ""),
     "GRAPH_AUGMENTED_SIMILARITY_QUERY": prompts.get("GRAPH_AUGMENTED_SIMILARITY_QUERY", ""),
     "VECTOR_QA_SYSTEM_PROMPT": prompts.get("VECTOR_QA_SYSTEM_PROMPT", ""),
     "CYPHER_GENERATION_TEMPLATE": prompts.get("CYPHER_GENERATION_TEMPLATE",""),
+    "CYPHER_PROJECT_SCOPE": prompts.get("CYPHER_PROJECT_SCOPE",""),
     "GRAPH_QA_GENERATION_TEMPLATE": prompts.get("GRAPH_QA_GENERATION_TEMPLATE",""),
     "CONVERSATIONAL_QA_SYSTEM_PROMPT": prompts.get("CONVERSATIONAL_QA_SYSTEM_PROMPT",""),
 
+    # Graph building
+    "GRAPH_BUILD_JOBS": int(os.getenv("GRAPH_BUILD_JOBS", 1)),
+    "PARSE_CACHE_DIR": os.getenv("PARSE_CACHE_DIR", None),
+    "CALL_RESOLUTION": os.getenv("CALL_RESOLUTION", "internal"),
+    "CALL_RESOLVER": os.getenv("CALL_RESOLVER", "static"),
+    "GRAPH_FORMAT": os.getenv("GRAPH_FORMAT", "networkx"),
+    "GRAPH_SNAPSHOT_PATH": os.getenv("GRAPH_SNAPSHOT_PATH", None),
+    "STREAMING_PIPELINE": os.getenv("STREAMING_PIPELINE", "false").lower() == "true",
+    "STREAMING_QUEUE_SIZE": int(os.getenv("STREAMING_QUEUE_SIZE", 64)),
+    "PIPELINE_STATE_DIR": os.getenv("PIPELINE_STATE_DIR", "/tmp/codebase-rag"),
+    "PIPELINE_SAFETY_MARGIN": float(os.getenv("PIPELINE_SAFETY_MARGIN", 60)),
+    # Self-invocation needs durable state, PIPELINE_STATE_BUCKET, to resume on a new container
+    "PIPELINE_SELF_INVOKE": os.getenv("PIPELINE_SELF_INVOKE", "false").lower() == "true",
+    "PIPELINE_STATE_BUCKET": os.getenv("PIPELINE_STATE_BUCKET", None),
+    "PIPELINE_STATE_PREFIX": os.getenv("PIPELINE_STATE_PREFIX", "pipeline-state"),
+    "PIPELINE_MAX_INVOCATIONS": int(os.getenv("PIPELINE_MAX_INVOCATIONS", 20)),
+    "NEO4J_SYNC_MODE": os.getenv("NEO4J_SYNC_MODE", "false").lower() == "true",
+    "NEO4J_BATCH_SIZE": int(os.getenv("NEO4J_BATCH_SIZE", 1000)),
+    "PROJECT_ID": os.getenv("PROJECT_ID", None),
+    "NEO4J_ASYNC_INGESTION": os.getenv("NEO4J_ASYNC_INGESTION", "false").lower() == "true",
+    "NEO4J_WRITE_CONCURRENCY": int(os.getenv("NEO4J_WRITE_CONCURRENCY", 4)),
+
     # Logging configuration
     "LOG_LEVEL": "INFO",
     "LOG_LEVEL_CONSOLE": "ERROR",
@@ -1,6 +1,6 @@
 import logging
 import boto3
-from botocore.exceptions import ClientError
+from botocore.exceptions import BotoCoreError, ClientError
 
 
 def get_log_level(level_str):
@@ -20,7 +20,7 @@ def get_ssm_parameter(name, region_name = "eu-west-1", decription = True):
     try:
         response = ssm.get_parameter(Name=name, WithDecryption=decription)
         return response['Parameter']['Value']
-    except ClientError as e:
+    except (ClientError, BotoCoreError) as e:
         print(f"Error retrieving parameter: {e}")
         return None
 
@@ -1,6 +1,7 @@
 import streamlit as st
 import os
 import dotenv
+from pathlib import Path
 
 # check if it's linux so it works on Streamlit Cloud
 if os.name == 'posix':
@@ -12,6 +13,7 @@ from src.utils.config import config, logger
 from streamlit_helpers import unzip_project
 from src.database.graph_database_builder import build_graph, process_graph
 from src.rag import RouterChat
+from src.neo4j_integration.neo4j_client import Neo4jClient
 
 dotenv.load_dotenv()
 
@@ -21,6 +23,18 @@ MODELS = [
         "openai/gpt-4"
 ]
 
+INITIAL_MESSAGE = {"role": "assistant", "content": "Hi there! How can I assist you today?"}
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def list_projects(uri: str, user: str, password: str) -> list:
+    """List the projects whose code graph is stored in the Neo4j database."""
+    client = Neo4jClient(uri=uri, user=user, password=password)
+    try:
+        return client.list_projects()
+    finally:
+        client.close()
+
 
 st.set_page_config(
     page_title="Codebase RAG", 
@@ -37,13 +51,18 @@ if "extracted_path" not in st.session_state:
 if "knowledge_graph" not in st.session_state:
     st.session_state.knowledge_graph = False
 
+# Project whose code graph is queried, several projects share the Neo4j database
+if "project_id" not in st.session_state:
+    st.session_state.project_id = None
+
+if "built_projects" not in st.session_state:
+    st.session_state.built_projects = set()
+
 if "chat_model" not in st.session_state:
     logger.debug("Chat model not in session state.")
     st.session_state.chat_model = None
 if "messages" not in st.session_state:
-    st.session_state.messages = [
-        {"role": "assistant", "content": "Hi there! How can I assist you today?"}
-]
+    st.session_state.messages = [INITIAL_MESSAGE]
     
 
 # --- Header ---
@@ -125,6 +144,25 @@ else:
         if use_neo4j:
             st.info("Using Neo4j credentials to connect to pre-existing knowledge graph.")
 
+            try:
+                projects = list_projects(keys.get("NEO4J_URI"), keys.get("NEO4J_USER"), keys.get("NEO4J_PASSWORD"))
+            except Exception as e:
+                logger.error(f"Error listing the Neo4j projects: {e}")
+                projects = []
+
+            if projects:
+                # Switching projects only rescopes the chat model, stored graphs are not rebuilt
+                project_choice = st.selectbox(
+                    "📂 Select a project",
+                    options=projects,
+                    index=projects.index(st.session_state.project_id) if st.session_state.project_id in projects else 0,
+                    key="project_choice",
+                )
+                st.session_state.project_id = project_choice
+                st.session_state.knowledge_graph = True
+            else:
+                st.warning("⚠️ No codebase project found in the Neo4j database.")
+
         else:
             st.markdown("If you haven't already, upload your codebase as a ZIP file:")
             
@@ -136,20 +174,26 @@ else:
             )
 
             if uploaded_file:
-                unzip_project()
+                project_id = Path(uploaded_file.name).stem
 
                 # Create knowledge graph from the zip file with progress spinner
                 processing_placeholder = st.empty()
 
-                if st.session_state.extracted_path and not st.session_state.knowledge_graph:
+                if project_id in st.session_state.built_projects:
+                    st.session_state.project_id = project_id
+
+                elif unzip_project() and st.session_state.extracted_path:
                     with processing_placeholder.container():
                         with st.spinner('Building Knowledge Graph, pushing to Neo4j and creating embeddings from your code... This may take a few minutes.'):
                             try:
                                 logger.debug("Building knowledge_graph.")
                                 graph = build_graph(st.session_state.extracted_path)
                                 st.success("Knowledge Graph successfully built. Pushing to Neo4j and creating embeddings...")
-                                process_graph(graph=graph)
+                                process_graph(graph=graph, project_id=project_id)
+                                st.session_state.built_projects.add(project_id)
+                                st.session_state.project_id = project_id
                                 st.session_state.knowledge_graph = True
+                                list_projects.clear()
 
                                 st.success("✅ Knowledge Graph successfully built and uploaded to Neo4j!")
                             except Exception as e:
@@ -167,9 +211,13 @@ else:
         )
         model_choice = st.session_state.model.split("/")[0]
 
-        # Instantiate the chat model
-        if not st.session_state.chat_model and st.session_state.knowledge_graph:
-            logger.debug("Instantiated new chat model")
+        # Instantiate the chat model, scoped to the selected project
+        chat_model = st.session_state.chat_model
+        if st.session_state.knowledge_graph and (not chat_model or chat_model.project_id != st.session_state.project_id):
+            if chat_model:
+                chat_model.close()
+                st.session_state.messages = [INITIAL_MESSAGE]
+            logger.debug(f"Instantiated new chat model for project {st.session_state.project_id}")
             st.session_state.chat_model = RouterChat(
             openai_api_key = keys.get("OPENAI_API_KEY"),
             neo4j_uri = keys.get("NEO4J_URI"),
@@ -184,7 +232,8 @@ else:
             cypher_prompt_template = config.get("CYPHER_GENERATION_TEMPLATE", None), 
             graph_qa_prompt_template = config.get("GRAPH_QA_GENERATION_TEMPLATE", None),
             conversational_qa_system_prompt = config.get("CONVERSATIONAL_QA_SYSTEM_PROMPT", None),
-            model_name=model_choice
+            model_name=model_choice,
+            project_id=st.session_state.project_id
         )
 
 
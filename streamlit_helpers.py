@@ -14,7 +14,8 @@ def unzip_project():
     uploaded_file = st.session_state.codebase_project
     
     if uploaded_file is not None:
-        extract_path = Path("./extracted_files")
+        # One folder per project, so that several uploaded projects do not mix
+        extract_path = Path("./extracted_files") / Path(uploaded_file.name).stem
         
         extract_path.mkdir(parents=True, exist_ok=True)
         
@@ -0,0 +1,187 @@
+import ast
+import tempfile
+import textwrap
+import unittest
+from collections import Counter
+from pathlib import Path
+import jedi
+from src.utils.call_resolvers import (
+    CallResolver,
+    MemoizedCallResolver,
+    ProjectSymbolTable,
+    ScopeAnalyzer,
+    StaticCallResolver
+)
+
+
+class RecordingResolver(CallResolver):
+    """Resolves every call to its callee source text and records the resolved calls."""
+
+    name = "recording"
+
+    def __init__(self):
+        self.calls = []
+
+    def resolve(self, call_node, stats):
+        self.calls.append(call_node.lineno)
+        return ast.unparse(call_node.func)
+
+
+class MemoizedCallResolverTest(unittest.TestCase):
+
+    def resolve_calls(self, source: str):
+        tree = ast.parse(textwrap.dedent(source))
+        inner = RecordingResolver()
+        resolver = MemoizedCallResolver(inner, ScopeAnalyzer("pkg.main").analyze(tree))
+        stats = Counter()
+        calls = sorted((node for node in ast.walk(tree) if isinstance(node, ast.Call)),
+                       key=lambda node: (node.lineno, node.col_offset))
+        return [resolver.resolve(node, stats) for node in calls], inner.calls
+
+    def test_module_level_and_default_argument_calls(self):
+        results, _ = self.resolve_calls("""
+            from pkg.helpers import helper
+
+            CACHE = dict()
+            VALUE = helper()
+
+            def f(x=dict(), y=helper()):
+                return helper()
+        """)
+        self.assertEqual(results, ["dict", "helper", "dict", "helper", "helper"])
+
+    def test_module_level_rebinding_starts_a_new_entry(self):
+        _, resolved_lines = self.resolve_calls("""
+            from pkg.helpers import helper
+            helper()
+            helper = make_helper()
+            helper()
+        """)
+        self.assertIn(5, resolved_lines)
+
+
+class StaticCallResolverTest(unittest.TestCase):
+
+    def resolve_calls(self, files: dict, module: str):
+        """
+        Write the project files to a temporary directory and resolve the calls of
+        `module`, returning the resolved full name of each callee source text.
+        """
+        with tempfile.TemporaryDirectory() as root:
+            symbol_table = ProjectSymbolTable(frozenset(["pkg"]))
+            trees = {}
+            for relative_path, source in files.items():
+                path = Path(root, relative_path)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text(textwrap.dedent(source), encoding="utf-8")
+                module_name = ".".join(Path(relative_path).with_suffix("").parts)
+                is_package = module_name.endswith(".__init__")
+                module_name = module_name.removesuffix(".__init__")
+                trees[module_name] = ast.parse(path.read_text(encoding="utf-8"))
+                symbol_table.add_module(module_name, trees[module_name], is_package=is_package)
+
+            path = Path(root, *module.split(".")).with_suffix(".py")
+            script = jedi.Script(path=str(path), project=jedi.Project(root))
+            tree = trees[module]
+            resolver = StaticCallResolver(script, ScopeAnalyzer(module).analyze(tree), symbol_table)
+            stats = Counter()
+            return {ast.unparse(node.func): resolver.resolve(node, stats)
+                    for node in ast.walk(tree) if isinstance(node, ast.Call)}
+
+    def test_imported_names_and_modules(self):
+        resolved = self.resolve_calls({
+            "pkg/__init__.py": "",
+            "pkg/models.py": """
+                class Forecaster:
+                    pass
+
+                def make_forecaster():
+                    return Forecaster()
+            """,
+            "pkg/main.py": """
+                import pkg.models
+                import pkg.models as models
+                from pkg.models import make_forecaster as make
+
+                def train():
+                    make()
+                    models.Forecaster()
+                    pkg.models.make_forecaster()
+                    return len([])
+            """
+        }, "pkg.main")
+        self.assertEqual(resolved["make"], "pkg.models.make_forecaster")
+        self.assertEqual(resolved["models.Forecaster"], "pkg.models.Forecaster")
+        self.assertEqual(resolved["pkg.models.make_forecaster"], "pkg.models.make_forecaster")
+        self.assertEqual(resolved["len"], "builtins.len")
+
+    def test_names_re_exported_by_packages(self):
+        resolved = self.resolve_calls({
+            "pkg/__init__.py": "from .models import Forecaster\nfrom pkg.utils import *\n",
+            "pkg/models.py": """
+                class Forecaster:
+                    pass
+            """,
+            "pkg/utils.py": """
+                def check_input():
+                    pass
+            """,
+            "pkg/main.py": """
+                import pkg
+                from pkg import Forecaster, check_input
+
+                def train():
+                    check_input()
+                    pkg.Forecaster()
+                    return Forecaster()
+            """
+        }, "pkg.main")
+        self.assertEqual(resolved["Forecaster"], "pkg.models.Forecaster")
+        self.assertEqual(resolved["pkg.Forecaster"], "pkg.models.Forecaster")
+        self.assertEqual(resolved["check_input"], "pkg.utils.check_input")
+
+    def test_self_calls_resolve_to_the_enclosing_class(self):
+        resolved = self.resolve_calls({
+            "pkg/__init__.py": "",
+            "pkg/main.py": """
+                class Forecaster:
+                    def fit(self):
+                        def callback():
+                            return self.predict()
+                        return callback()
+
+                    def predict(self):
+                        pass
+            """
+        }, "pkg.main")
+        self.assertEqual(resolved["self.predict"], "pkg.main.Forecaster.predict")
+        self.assertEqual(resolved["callback"], "pkg.main.Forecaster.fit.callback")
+
+    def test_attribute_calls_on_local_variables_and_arguments_are_inferred(self):
+        resolved = self.resolve_calls({
+            "pkg/__init__.py": "",
+            "pkg/models.py": """
+                class Forecaster:
+                    def fit(self):
+                        return self
+            """,
+            "pkg/main.py": """
+                from pkg.models import Forecaster
+
+                def train():
+                    forecaster = Forecaster()
+                    return forecaster.fit()
+
+                def train_given(model: Forecaster, callback):
+                    callback()
+                    return model.fit()
+            """
+        }, "pkg.main")
+        self.assertEqual(resolved["Forecaster"], "pkg.models.Forecaster")
+        self.assertEqual(resolved["forecaster.fit"], "pkg.models.Forecaster.fit")
+        self.assertEqual(resolved["model.fit"], "pkg.models.Forecaster.fit")
+        self.assertIsNone(resolved["callback"])
+
+
+if __name__ == "__main__":
+    unittest.main()
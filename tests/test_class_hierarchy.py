@@ -0,0 +1,121 @@
+import tempfile
+import textwrap
+import unittest
+from pathlib import Path
+from src.graph.class_hierarchy import ClassHierarchy
+from src.graph.graph_builder import GraphBuilder
+from src.utils.code_parsing import DefinitionRecord
+from src.utils.config.logger_config import logger
+
+
+def make_definitions(bases: dict, methods: dict = None) -> dict:
+    """Class records of `pkg.m` inheriting from the given bases, and their method records."""
+    definitions = {}
+    for name, class_bases in bases.items():
+        class_id = f"pkg.m.{name}"
+        definitions[class_id] = DefinitionRecord(id=class_id, name=name, type="class", file="pkg/m.py", line=1,
+                                                 inherits_from=[f"pkg.m.{base}" for base in class_bases])
+    for name, class_methods in (methods or {}).items():
+        for method in class_methods:
+            method_id = f"pkg.m.{name}.{method}"
+            definitions[method_id] = DefinitionRecord(id=method_id, name=method, type="method", file="pkg/m.py",
+                                                      line=1, parent_id=f"pkg.m.{name}")
+    return definitions
+
+
+def short_names(class_ids: list) -> list:
+    return [class_id.rsplit(".", 1)[1] for class_id in class_ids]
+
+
+class ClassHierarchyTest(unittest.TestCase):
+
+    def test_diamond_follows_the_c3_linearization(self):
+        hierarchy = ClassHierarchy(make_definitions({"A": [], "B": ["A"], "C": ["A"], "D": ["B", "C"]}))
+        self.assertEqual(short_names(hierarchy.mro("pkg.m.D")), ["D", "B", "C", "A"])
+
+    def test_inconsistent_hierarchy_falls_back_to_depth_first_order(self):
+        hierarchy = ClassHierarchy(make_definitions({"A": [], "B": [], "X": ["A", "B"], "Y": ["B", "A"],
+                                                     "Z": ["X", "Y"]}))
+        with self.assertLogs(logger, level="WARNING"):
+            mro = hierarchy.mro("pkg.m.Z")
+        self.assertEqual(short_names(mro), ["Z", "X", "Y", "A", "B"])
+
+    def test_inheritance_cycle_ends_the_mro(self):
+        hierarchy = ClassHierarchy(make_definitions({"A": ["B"], "B": ["A"]}))
+        with self.assertLogs(logger, level="WARNING"):
+            mro = hierarchy.mro("pkg.m.A")
+        self.assertEqual(short_names(mro), ["A", "B"])
+
+    def test_bases_outside_the_project_end_the_mro(self):
+        definitions = make_definitions({"A": []})
+        definitions["pkg.m.A"].inherits_from.append("sklearn.base.BaseEstimator")
+        self.assertEqual(ClassHierarchy(definitions).mro("pkg.m.A"), ["pkg.m.A"])
+
+    def test_methods_are_resolved_along_the_mro(self):
+        hierarchy = ClassHierarchy(make_definitions({"A": [], "B": ["A"], "C": ["A"], "D": ["B", "C"]},
+                                                    {"A": ["fit"], "C": ["fit", "predict"], "D": ["fit"]}))
+        self.assertEqual(hierarchy.resolve_method("pkg.m.D", "fit"), "pkg.m.D.fit")
+        self.assertEqual(hierarchy.resolve_method("pkg.m.D", "fit", skip_class=True), "pkg.m.C.fit")
+        self.assertEqual(hierarchy.resolve_method("pkg.m.B", "fit"), "pkg.m.A.fit")
+        self.assertEqual(hierarchy.resolve_method("pkg.m.D", "predict"), "pkg.m.C.predict")
+        self.assertIsNone(hierarchy.resolve_method("pkg.m.B", "predict"))
+
+    def test_methods_are_looked_up_in_the_defined_ids(self):
+        definitions = make_definitions({"A": [], "B": ["A"]})
+        hierarchy = ClassHierarchy(definitions, defined_ids={"pkg.m.A.fit"})
+        self.assertEqual(hierarchy.resolve_method("pkg.m.B", "fit"), "pkg.m.A.fit")
+
+
+class MethodCallResolutionTest(unittest.TestCase):
+
+    def test_self_cls_and_super_calls_follow_the_class_hierarchy(self):
+        files = {
+            "pkg/__init__.py": "",
+            "pkg/base.py": """
+                class Base:
+                    def fit(self):
+                        return self
+
+                    @classmethod
+                    def create(cls):
+                        return cls()
+
+
+                class Mixin:
+                    def fit(self):
+                        return self
+            """,
+            "pkg/child.py": """
+                from pkg.base import Base, Mixin
+
+
+                class Child(Mixin, Base):
+                    def fit(self):
+                        return super().fit()
+
+                    def run(self):
+                        return self.fit()
+
+                    @classmethod
+                    def make(cls):
+                        return cls.create()
+            """
+        }
+        with tempfile.TemporaryDirectory() as root:
+            for relative_path, source in files.items():
+                path = Path(root, relative_path)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text(textwrap.dedent(source), encoding="utf-8")
+            graph = GraphBuilder(root).build()
+
+        calls = {(source, target) for source, target, relation in graph.edges(data="relation")
+                 if relation == "call"}
+        self.assertEqual(calls, {
+            ("pkg.child.Child.fit", "pkg.base.Mixin.fit"),
+            ("pkg.child.Child.run", "pkg.child.Child.fit"),
+            ("pkg.child.Child.make", "pkg.base.Base.create"),
+        })
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import unittest
+from unittest import mock
+import networkx as nx
+from src.neo4j_integration.neo4j_client import Neo4jClient, compute_node_hash
+
+
+class RecordingTransaction:
+
+    def __init__(self, session):
+        self.run = session.run
+
+    def commit(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class RecordingSession:
+    """Session of `RecordingDriver`, answering the reads and recording the written rows."""
+
+    def __init__(self, driver):
+        self.driver = driver
+
+    def run(self, query, **parameters):
+        if "AS content_hash" in query:
+            return [{"id": node_id, "label": label, "content_hash": content_hash}
+                    for node_id, (label, content_hash) in self.driver.nodes.items()]
+        if "type(r) AS type" in query:
+            return [{"source": source, "type": rel_type, "target": target}
+                    for source, rel_type, target in self.driver.edges]
+        self.driver.writes.append((" ".join(query.split()), parameters.get("rows")))
+        return mock.Mock()
+
+    def begin_transaction(self):
+        return RecordingTransaction(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class RecordingDriver:
+    """Neo4j driver holding the stored nodes and edges of a project in memory."""
+
+    def __init__(self, nodes: dict, edges: set):
+        self.nodes = nodes
+        self.edges = edges
+        self.writes = []
+
+    def session(self):
+        return RecordingSession(self)
+
+    def close(self):
+        pass
+
+    def written_rows(self, query_part: str) -> list:
+        return [row for query, rows in self.writes if query_part in query for row in rows or []]
+
+
+def add_definition(graph: nx.DiGraph, node_id: str, definition_type: str, code: str) -> dict:
+    graph.add_node(node_id, name=node_id.rsplit(".", 1)[1], type=definition_type, file="pkg/a.py", line=1,
+                   code=code, docstring="")
+    return graph.nodes[node_id]
+
+
+class SyncGraphTest(unittest.TestCase):
+
+    def test_only_the_differences_with_the_stored_graph_are_written(self):
+        graph = nx.DiGraph()
+        kept = add_definition(graph, "pkg.a.kept", "function", "def kept(): ...")
+        add_definition(graph, "pkg.a.changed", "function", "def changed(): return 2")
+        add_definition(graph, "pkg.a.relabeled", "method", "def relabeled(self): ...")
+        add_definition(graph, "pkg.a.added", "function", "def added(): ...")
+        graph.add_edge("pkg.a.kept", "pkg.a.changed", relation="call")
+        graph.add_edge("pkg.a.added", "pkg.a.kept", relation="call")
+
+        driver = RecordingDriver(
+            nodes={
+                "pkg.a.kept": ("Function", compute_node_hash("Function", kept)),
+                "pkg.a.changed": ("Function", "hash of the former code"),
+                "pkg.a.relabeled": ("Function", "hash of the function"),
+                "pkg.a.removed": ("Function", "hash of the removed function"),
+            },
+            edges={
+                ("pkg.a.kept", "CALL", "pkg.a.changed"),
+                ("pkg.a.changed", "CALL", "pkg.a.kept"),
+                ("pkg.a.kept", "CALL", "pkg.a.removed"),
+            })
+        with mock.patch.object(Neo4jClient, "_database_connect", return_value=driver):
+            client = Neo4jClient(uri="bolt://localhost:7687", user="neo4j", password="", project_id="pkg")
+        changes = client.sync_graph_to_neo4j(graph, embedding_property="embedding")
+
+        # The edges of deleted nodes disappear with them, a relabeled node is recreated
+        self.assertEqual(changes, {"created_nodes": 2, "updated_nodes": 1, "deleted_nodes": 2,
+                                   "created_edges": 1, "deleted_edges": 1})
+        self.assertEqual({row["id"] for row in driver.written_rows("DETACH DELETE n")},
+                         {"pkg.a.relabeled", "pkg.a.removed"})
+        self.assertEqual(driver.written_rows("DELETE r"), [{"source": "pkg.a.changed", "target": "pkg.a.kept"}])
+        self.assertEqual([row["id"] for row in driver.written_rows("CREATE (n:Function:CodeEntity)")],
+                         ["pkg.a.added"])
+        self.assertEqual([row["id"] for row in driver.written_rows("CREATE (n:Method:CodeEntity)")],
+                         ["pkg.a.relabeled"])
+        updated = driver.written_rows("SET n += row")
+        self.assertEqual([(row["id"], row["project_id"]) for row in updated], [("pkg.a.changed", "pkg")])
+        self.assertEqual(driver.written_rows("CREATE (a)-[:CALL]->(b)"),
+                         [{"source": "pkg.a.added", "target": "pkg.a.kept"}])
+
+    def test_a_second_sync_of_the_same_graph_writes_nothing(self):
+        graph = nx.DiGraph()
+        data = add_definition(graph, "pkg.a.kept", "function", "def kept(): ...")
+        graph.add_edge("pkg.a.kept", "pkg.a.kept", relation="call")
+        driver = RecordingDriver(nodes={"pkg.a.kept": ("Function", compute_node_hash("Function", data))},
+                                 edges={("pkg.a.kept", "CALL", "pkg.a.kept")})
+        with mock.patch.object(Neo4jClient, "_database_connect", return_value=driver):
+            client = Neo4jClient(uri="bolt://localhost:7687", user="neo4j", password="")
+        changes = client.sync_graph_to_neo4j(graph)
+
+        self.assertEqual(set(changes.values()), {0})
+        self.assertEqual([rows for _, rows in driver.writes if rows is not None], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import tempfile
+import textwrap
+import unittest
+from pathlib import Path
+from src.graph.parse_cache import ParseCache, compute_cache_keys
+from src.utils.code_parsing import DefinitionRecord
+
+
+class ComputeCacheKeysTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = Path(self.directory.name)
+        self.write("pkg/__init__.py", "from pkg.api import fit\n")
+        self.write("pkg/api.py", "from pkg.core import check\n\ndef fit():\n    return check()\n")
+        self.write("pkg/core.py", "from pkg.utils import validate\n\ndef check():\n    return validate()\n")
+        self.write("pkg/utils.py", "def validate():\n    pass\n")
+        self.write("pkg/main.py", "from pkg import fit\n\nfit()\n")
+        self.write("pkg/other.py", "def unrelated():\n    pass\n")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, relative_path: str, source: str) -> None:
+        path = self.root / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(textwrap.dedent(source), encoding="utf-8")
+
+    def keys(self, settings: str = "") -> dict:
+        paths = sorted(self.root.rglob("*.py"))
+        return {path.relative_to(self.root).as_posix(): key
+                for path, key in compute_cache_keys(paths, str(self.root), settings=settings).items()}
+
+    def changed_files(self, before: dict, after: dict) -> set:
+        return {path for path in before if before[path] != after[path]}
+
+    def test_keys_are_stable(self):
+        self.assertEqual(self.keys(), self.keys())
+
+    def test_changing_a_file_invalidates_its_importers_down_the_whole_chain(self):
+        before = self.keys()
+        self.write("pkg/utils.py", "def validate():\n    return True\n")
+        self.assertEqual(self.changed_files(before, self.keys()),
+                         {"pkg/__init__.py", "pkg/api.py", "pkg/core.py", "pkg/utils.py", "pkg/main.py"})
+
+    def test_changing_a_module_only_invalidates_its_importers(self):
+        before = self.keys()
+        self.write("pkg/other.py", "def unrelated():\n    return 1\n")
+        self.assertEqual(self.changed_files(before, self.keys()), {"pkg/other.py"})
+
+    def test_changing_a_package_re_export_invalidates_its_importers(self):
+        before = self.keys()
+        self.write("pkg/__init__.py", "from pkg.api import fit\nfrom pkg.other import unrelated\n")
+        # Importing a submodule runs the __init__ module of its package first
+        self.assertEqual(self.changed_files(before, self.keys()),
+                         {"pkg/__init__.py", "pkg/api.py", "pkg/core.py", "pkg/main.py"})
+
+    def test_changing_the_builder_settings_invalidates_every_file(self):
+        before = self.keys(settings="internal:static")
+        after = self.keys(settings="all:static")
+        self.assertEqual(self.changed_files(before, after), set(before))
+
+
+class ParseCacheTest(unittest.TestCase):
+
+    def test_entries_round_trip_and_misses_return_none(self):
+        definitions = {"pkg.api.fit": DefinitionRecord(id="pkg.api.fit", name="fit", type="function",
+                                                       file="pkg/api.py", line=3, code="def fit(): ...")}
+        calls = [{"caller_id": "pkg.api.fit", "candidate_id": "pkg.core.check"}]
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = ParseCache(cache_dir)
+            cache.put("ab" * 32, definitions, calls)
+            self.assertEqual(cache.get("ab" * 32), (definitions, calls))
+            self.assertIsNone(cache.get("cd" * 32))
+
+    def test_unreadable_entries_are_ignored(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = ParseCache(cache_dir)
+            entry_path = cache._entry_path("ab" * 32)
+            entry_path.parent.mkdir(parents=True)
+            entry_path.write_text("{not json", encoding="utf-8")
+            with self.assertLogs(level="WARNING"):
+                self.assertIsNone(cache.get("ab" * 32))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Tuple
+from unittest import mock
+from src.database.pipeline import CHECKPOINT_FILE, Pipeline, PipelineCheckpoint
+
+PUSH_BATCHES = 4
+
+
+class RecordingClient:
+    """Neo4j client pushing `PUSH_BATCHES` node batches, resuming from the given progress."""
+
+    def __init__(self):
+        self.pushes = []
+
+    def push_graph_to_neo4j(self, G, delete_previous=False, progress=None, on_batch=None):
+        self.pushes.append({"nodes": G.number_of_nodes(), "progress": dict(progress or {})})
+        for committed in range((progress or {}).get("Created Function nodes", 0) + 1, PUSH_BATCHES + 1):
+            on_batch("Created Function nodes", committed)
+
+    def close(self):
+        pass
+
+
+class PipelineResumeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        root = Path(self.directory.name)
+        self.project_root = root / "project"
+        (self.project_root / "pkg").mkdir(parents=True)
+        (self.project_root / "pkg" / "__init__.py").write_text("", encoding="utf-8")
+        (self.project_root / "pkg" / "api.py").write_text("def check():\n    pass\n\n\ndef fit():\n    check()\n",
+                                                          encoding="utf-8")
+        self.state_dir = root / "state"
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_pipeline(self, run_id: str = "run") -> Tuple[Pipeline, RecordingClient]:
+        pipeline = Pipeline(str(self.state_dir), project_root=str(self.project_root), run_id=run_id,
+                            async_ingestion=False)
+        client = RecordingClient()
+        pipeline._client = client
+        return pipeline, client
+
+    def test_an_interrupted_push_resumes_from_the_last_committed_batch(self):
+        pipeline, client = self.make_pipeline()
+        # The time budget runs out once the second batch is committed
+        pipeline.should_stop = lambda: pipeline.checkpoint.progress.get("push", {}).get("Created Function nodes", 0) >= 2
+        self.assertFalse(pipeline.run(["build", "push"]))
+
+        saved = json.loads((self.state_dir / CHECKPOINT_FILE).read_text(encoding="utf-8"))
+        self.assertEqual(saved["completed_stages"], ["build"])
+        self.assertEqual(saved["progress"]["push"], {"Created Function nodes": 2})
+        self.assertEqual(saved["progress"]["build"]["nodes"], 2)
+
+        pipeline, client = self.make_pipeline()
+        with mock.patch.object(Pipeline, "_run_build", side_effect=AssertionError("build ran again")):
+            self.assertTrue(pipeline.run(["build", "push"]))
+        self.assertEqual(client.pushes, [{"nodes": 2, "progress": {"Created Function nodes": 2}}])
+        self.assertEqual(PipelineCheckpoint(self.state_dir, "run").completed_stages, ["build", "push"])
+
+    def test_the_checkpoint_of_another_run_is_discarded(self):
+        pipeline, _ = self.make_pipeline()
+        self.assertTrue(pipeline.run(["build", "push"]))
+
+        pipeline, client = self.make_pipeline(run_id="other run")
+        self.assertEqual(pipeline.checkpoint.completed_stages, [])
+        self.assertTrue(pipeline.run(["build", "push"]))
+        self.assertEqual(client.pushes, [{"nodes": 2, "progress": {}}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from src.graph.compact_graph import CompactGraph
+from src.graph.snapshot import (
+    MANIFEST_FILE,
+    SnapshotError,
+    load_snapshot,
+    read_snapshot_embeddings,
+    write_snapshot,
+    write_snapshot_embeddings
+)
+from src.utils.code_parsing import DefinitionRecord
+
+
+def make_graph() -> CompactGraph:
+    definitions = {
+        "pkg.models.Base": DefinitionRecord(id="pkg.models.Base", name="Base", type="class",
+                                            file="pkg/models.py", line=1, code="class Base: ...",
+                                            docstring="Base forecaster."),
+        "pkg.models.Forecaster": DefinitionRecord(id="pkg.models.Forecaster", name="Forecaster", type="class",
+                                                  file="pkg/models.py", line=5, code="class Forecaster(Base): ...",
+                                                  inherits_from=["pkg.models.Base", "sklearn.base.BaseEstimator"]),
+        "pkg.models.Forecaster.fit": DefinitionRecord(id="pkg.models.Forecaster.fit", name="fit", type="method",
+                                                      file="pkg/models.py", line=6, code="def fit(self): ...",
+                                                      docstring="Fit with ünïcode.",
+                                                      parent_id="pkg.models.Forecaster"),
+        "pkg.utils.check": DefinitionRecord(id="pkg.utils.check", name="check", type="function",
+                                            file="pkg/utils.py", line=1, code=""),
+    }
+    edges = [
+        ("pkg.models.Forecaster.fit", "pkg.models.Forecaster", "nested_in"),
+        ("pkg.models.Forecaster.fit", "pkg.models.Forecaster", "call"),
+        ("pkg.models.Forecaster.fit", "pkg.utils.check", "call"),
+        ("pkg.models.Forecaster", "pkg.models.Base", "inherits_from"),
+    ]
+    return CompactGraph.from_records(definitions, edges)
+
+
+class SnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = str(Path(self.directory.name, "graph.snapshot"))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip_keeps_nodes_attributes_and_edges(self):
+        graph = make_graph()
+        write_snapshot(graph, self.path)
+        loaded = load_snapshot(self.path)
+
+        self.assertEqual(list(loaded.names), graph.names)
+        for node_index in range(graph.number_of_nodes()):
+            self.assertEqual(loaded.node_attributes(node_index), graph.node_attributes(node_index))
+        self.assertEqual(list(loaded.edges()), list(graph.edges()))
+        self.assertEqual(loaded.number_of_edges("call"), 2)
+        self.assertEqual(loaded.successors("pkg.models.Forecaster.fit", "call"),
+                         ["pkg.models.Forecaster", "pkg.utils.check"])
+        self.assertEqual(list(loaded.node_rows("method", ["name", "file", "docstring"])),
+                         list(graph.node_rows("method", ["name", "file", "docstring"])))
+
+    def test_rewriting_a_snapshot_replaces_it(self):
+        write_snapshot(make_graph(), self.path)
+        write_snapshot(CompactGraph.from_records({}, []), self.path)
+        self.assertEqual(load_snapshot(self.path).number_of_nodes(), 0)
+        self.assertFalse(Path(self.path + ".tmp").exists())
+
+    def test_embeddings_are_only_read_for_the_same_property_model_and_dimensions(self):
+        graph = make_graph()
+        write_snapshot(graph, self.path)
+        vectors = [("pkg.models.Base", [0.5, 1.0]), ("pkg.utils.check", [-1.0, 2.0]), ("pkg.removed", [3.0, 3.0])]
+        self.assertEqual(write_snapshot_embeddings(self.path, graph, vectors, embedding_property="embedding",
+                                                   model="openai:small"), 2)
+
+        loaded = load_snapshot(self.path)
+        self.assertEqual(list(read_snapshot_embeddings(self.path, loaded, embedding_property="embedding",
+                                                       model="openai:small", dimensions=2)),
+                         vectors[:2])
+        for model, dimensions in (("openai:large", 2), ("openai:small", 3)):
+            self.assertEqual(list(read_snapshot_embeddings(self.path, loaded, embedding_property="embedding",
+                                                           model=model, dimensions=dimensions)), [])
+
+    def test_missing_or_incompatible_snapshots_are_rejected(self):
+        with self.assertRaises(SnapshotError):
+            load_snapshot(self.path)
+
+        write_snapshot(make_graph(), self.path)
+        manifest_path = Path(self.path, MANIFEST_FILE)
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        manifest["version"] += 1
+        manifest_path.write_text(json.dumps(manifest), encoding="utf-8")
+        with self.assertRaises(SnapshotError):
+            load_snapshot(self.path)
+
+    def test_incomplete_snapshots_are_rejected(self):
+        write_snapshot(make_graph(), self.path)
+        Path(self.path, "names.blob").unlink()
+        with self.assertRaises(SnapshotError):
+            load_snapshot(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()